@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import json
 import os
 import sys
@@ -9,10 +8,14 @@ import plotly.express as px
 
 # --- PATH FIX: Allow importing local modules ---
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "src"))
 try:
     from sector_map import SECTOR_MAP
+    from sector_index import SectorIndex
 except ImportError:
     SECTOR_MAP = {} # Fallback if file missing
+    SectorIndex = None
+from market_data import get_ohlcv, get_prices
 
 # --- PAGE CONFIGURATION ---
 st.set_page_config(
@@ -73,9 +76,8 @@ def load_portfolio():
 # --- CHARTING HELPERS ---
 def get_candlestick_chart(ticker, name):
     try:
-        df = yf.download(ticker, period="3mo", interval="1d", progress=False)
+        df = get_ohlcv(ticker, period="3mo", interval="1d")
         if df.empty: return None
-        if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
         
         fig = go.Figure(data=[go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'], increasing_line_color='#00FF7F', decreasing_line_color='#FF4B4B')])
         fig.update_layout(title=name, template="plotly_dark", height=300, margin=dict(l=0, r=0, t=40, b=0), xaxis_rangeslider_visible=False, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
@@ -84,9 +86,8 @@ def get_candlestick_chart(ticker, name):
 
 def plot_mini_line(ticker):
     try:
-        df = yf.download(ticker, period="3mo", progress=False)
+        df = get_ohlcv(ticker, period="3mo")
         if df.empty: return None
-        if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
         
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=df.index, y=df['Close'], mode='lines', line=dict(color='#00FF7F', width=2), fill='tozeroy', fillcolor='rgba(0, 255, 127, 0.1)'))
@@ -94,6 +95,15 @@ def plot_mini_line(ticker):
         return fig
     except: return None
 
+def get_sector_heatmap(tickers, sessions=20):
+    """Equal-weight daily sector returns (%) for the last `sessions` sessions, sector x day."""
+    closes = get_prices(list(tickers), period="3mo")
+    if closes.empty or SectorIndex is None: return pd.DataFrame()
+    returns = closes.pct_change().iloc[-sessions:]
+    heat = SectorIndex(list(closes.columns), SECTOR_MAP).returns(returns).T * 100
+    heat.columns = [d.strftime('%d %b') for d in heat.columns]
+    return heat.dropna(how='all')
+
 # --- MAIN APP ---
 df = load_data()
 portfolio = load_portfolio()
@@ -151,7 +161,7 @@ with tabs[0]:
                     st.caption(f"Qty: {qty} | Avg: INR {avg_cost:,.2f}")
                 with cols[1]:
                     try:
-                        df_tick = yf.download(ticker, period="1d", progress=False)
+                        df_tick = get_ohlcv(ticker, period="5d")
                         curr_price = float(df_tick['Close'].values[-1]) if not df_tick.empty else avg_cost
                         pnl_val = (curr_price - avg_cost) * qty
                         pnl_pct = (pnl_val / (avg_cost * qty)) * 100
@@ -192,6 +202,13 @@ with tabs[1]:
                 hide_index=True
             )
 
+        st.caption("Sector Returns, Last 20 Sessions (Equal-Weight, %)")
+        heat = get_sector_heatmap(latest_df['Ticker'].unique())
+        if not heat.empty:
+            fig_heat = px.imshow(heat, color_continuous_scale='RdYlGn', color_continuous_midpoint=0, aspect='auto')
+            fig_heat.update_layout(template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+            st.plotly_chart(fig_heat, use_container_width=True)
+
 # === TAB 3: MARKET UNIVERSE (ALL STOCKS) ===
 with tabs[2]:
     st.subheader("Full Market Scan")
@@ -1,8 +1,8 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from pypfopt import risk_models, BlackLittermanModel, EfficientFrontier
-from sector_map import SECTOR_MAP
+from sector_index import SectorIndex
+from market_data import get_prices
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -12,7 +12,11 @@ MAX_SECTOR_WEIGHT = 0.25
 CORRELATION_THRESHOLD = 0.85 # Slight adjustment to allow distinct alpha
 RISK_FREE_RATE = 0.072       # KEPT AT 7.2% (Your Requirement)
 
-def run_black_litterman_allocation(buy_recommendations):
+def run_black_litterman_allocation(buy_recommendations, prices=None, sector_map=None):
+    """
+    Black-Litterman weights for the BUY list.
+    `prices` (date x symbol closes incl. ^NSEI) and `sector_map` skip the download / default sectors.
+    """
     print("\n🧠 LAYER 3: EXECUTING INSTITUTIONAL ALLOCATOR...")
     
     if buy_recommendations.empty:
@@ -25,7 +29,10 @@ def run_black_litterman_allocation(buy_recommendations):
     
     # ... [Data Fetching block remains same] ...
     print(f"   📉 Fetching and aligning history for {len(all_assets)} assets...")
-    raw_data = yf.download(all_assets, period="1y", interval="1d", progress=False, auto_adjust=True)['Close']
+    if prices is None:
+        raw_data = get_prices(all_assets, period="1y", interval="1d")
+    else:
+        raw_data = prices[[a for a in all_assets if a in prices.columns]]
     data = raw_data.dropna(axis=1, how='all').ffill().dropna()
 
     if data.empty or len(data) < 30:
@@ -74,7 +81,8 @@ def run_black_litterman_allocation(buy_recommendations):
     # 4. OPTIMIZATION
     ef = EfficientFrontier(bl.bl_returns(), bl.bl_cov())
     
-    sector_mapper = {t: SECTOR_MAP.get(t, "MARKET_INDEX") for t in final_universe}
+    sector_index = SectorIndex(final_universe, sector_map)
+    sector_mapper = sector_index.mapper(default="MARKET_INDEX")
     sectors = set(sector_mapper.values())
     s_upper = {s: MAX_SECTOR_WEIGHT for s in sectors}
     s_upper["MARKET_INDEX"] = 1.0 
@@ -84,7 +92,11 @@ def run_black_litterman_allocation(buy_recommendations):
         # Maximize Sharpe with your strict 7.2% hurdle
         weights = ef.max_sharpe(risk_free_rate=RISK_FREE_RATE)
         print("   ✅ Posterior Weights Calculated.")
-        return ef.clean_weights()
+        cleaned = ef.clean_weights()
+        exposure = sector_index.aggregate(pd.Series(cleaned), how="sum")
+        for sector, w in exposure[exposure > 0.001].sort_values(ascending=False).items():
+            print(f"      🏭 {sector:<20} {w:.1%}")
+        return cleaned
     except Exception as e:
         print(f"   ⚠️  Solver fail: {e}. Reverting to Index Equilibrium.")
         return {benchmark: 1.0}
\ No newline at end of file
@@ -1,7 +1,8 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from sector_map import SECTOR_MAP
+from market_data import get_prices
+from indicators import SMA, batch
 import warnings
 
 warnings.filterwarnings("ignore")
@@ -11,20 +12,9 @@ END_DATE = "2024-12-31"
 INITIAL_CAPITAL = 100000
 
 def get_historical_data(tickers):
-    # (Same chunking logic as before...)
-    print(f"   ⏳ Downloading history for {len(tickers)} stocks...")
-    chunk_size = 50
-    all_data = []
-    for i in range(0, len(tickers), chunk_size):
-        chunk = tickers[i:i+chunk_size]
-        try:
-            df = yf.download(chunk, start=START_DATE, end=END_DATE, interval="1d", progress=False, auto_adjust=True, threads=False)['Close']
-            if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
-            all_data.append(df)
-            print(f"      Batch {i//chunk_size + 1} downloaded...", end="\r")
-        except: continue
-    if not all_data: return pd.DataFrame()
-    return pd.concat(all_data, axis=1)
+    # Shared provider: cache/DB first, chunked Yahoo only for missing ranges
+    print(f"   ⏳ Loading history for {len(tickers)} stocks...")
+    return get_prices(tickers, start=START_DATE, end=END_DATE, interval="1d")
 
 def calculate_monthly_scores(date, data):
     # (Same logic as your previous successful backtest)
@@ -35,7 +25,7 @@ def calculate_monthly_scores(date, data):
     if '^NSEI' not in data.columns: return []
     nifty = past_data['^NSEI'].dropna()
     regime = "BULLISH"
-    if nifty.iloc[-1] < nifty.rolling(200).mean().iloc[-1]: regime = "BEARISH"
+    if nifty.iloc[-1] < batch(SMA, nifty, window=200).iloc[-1]: regime = "BEARISH"
         
     for ticker in data.columns:
         if ticker == "^NSEI": continue
@@ -73,10 +63,12 @@ def calculate_sharpe_ratio(returns):
     if returns.std() == 0: return 0
     return (returns.mean() / returns.std()) * np.sqrt(12) # Annualized for monthly data
 
-def run_backtest():
+def run_backtest(data=None):
+    """Monthly top-10 rebalance. `data` (date x symbol closes) skips the download."""
     print("\n🚀 STARTING INSTITUTIONAL VALIDATION BACKTEST...")
-    tickers = list(SECTOR_MAP.keys()) + ["^NSEI"]
-    data = get_historical_data(tickers)
+    if data is None:
+        tickers = list(SECTOR_MAP.keys()) + ["^NSEI"]
+        data = get_historical_data(tickers)
     
     if data.empty: return
     
@@ -0,0 +1,321 @@
+import argparse
+import contextlib
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+warnings.filterwarnings("ignore")
+
+# --- CONFIG ---
+# Every stage runs on the same seeded synthetic market, so numbers from two
+# commits are comparable. Each (stage, size) gets a fresh process so peak RSS
+# belongs to that stage alone.
+SIZES = (50, 500, 2000)
+HOURLY_BARS = 2000           # Feature / training stages (market_data is hourly)
+DAILY_BARS = 500             # Backtest / optimiser stages (~2 trading years)
+BENCH_END = "2024-12-31"     # Fixed clock: same timestamps on every run
+SEED = 42
+RESULTS_DIR = "bench_results"
+REGRESSION_THRESHOLD = 0.10  # --compare flags stages >10% slower
+STAGE_TIMEOUT = 1800         # Seconds per (stage, size) before it is killed
+
+# Sharded scan: each shard audits its slice of the universe against replayed Yahoo
+# answers with a budget of its own (one egress per shard), so wall time should
+# fall ~1/N. The budget is scaled up from the live one to keep runs short.
+SHARD_COUNTS = (1, 2, 4)
+SCAN_REQUESTS_PER_SECOND = 50   # Per egress
+SCAN_LATENCY = 0.05             # Seconds per replayed Yahoo answer
+
+# --- SYNTHETIC INPUTS ---
+def _market(size, interval):
+    from synthetic_market import generate_market
+    n_bars = HOURLY_BARS if interval == "1h" else DAILY_BARS
+    return generate_market(size, n_bars, interval, seed=SEED, end=pd.Timestamp(BENCH_END, tz="UTC"))
+
+def _daily_closes(size):
+    # The provider hands out float64 frames, so the daily stages get the same
+    return _market(size, "1d").panel.frame('close').astype('float64')
+
+def _f_scores(market):
+    return dict(zip(market.fundamentals['symbol'], market.fundamentals['F_Score']))
+
+# --- STAGES ---
+# Each stage: setup(size) -> inputs (not timed), run(inputs) -> rows processed (timed)
+def setup_features(size):
+    market = _market(size, "1h")
+    return market.panel, _f_scores(market), market.sector_map
+
+def run_features(inputs):
+    from feature_engineering import build_master_dataset
+    panel, f_scores, sector_map = inputs
+    build_master_dataset(panel=panel, f_scores=f_scores, sector_map=sector_map)
+    return len(panel.times) * (len(panel.symbols) - 1)
+
+def setup_train(size):
+    from feature_engineering import build_master_dataset
+    panel, f_scores, sector_map = setup_features(size)
+    return build_master_dataset(panel=panel, f_scores=f_scores, sector_map=sector_map)
+
+def run_train(dataset):
+    from train_model import train_ai_model
+    train_ai_model(return_model=True, dataset=dataset)
+    return len(dataset)
+
+def run_monthly_scores(data):
+    from backtest_strategy import calculate_monthly_scores
+    calculate_monthly_scores(data.index[-1], data)
+    return data.size
+
+def run_backtest(data):
+    from backtest_strategy import run_backtest
+    run_backtest(data)
+    return data.size
+
+def setup_golden(size):
+    from find_golden_weights import build_factors
+    data = _daily_closes(size)
+    # Same shape as the real run: one year of warm-up, the rest is the test window
+    return build_factors(data, test_start=data.index[252])
+
+def run_golden(inputs):
+    from find_golden_weights import backtest_weights
+    prices, regime, factors = inputs
+    for target in ("BULL", "BEAR"):
+        backtest_weights((0.4, 0.4, 0.2), factors, prices, regime, target)
+    return sum(len(f) for f in factors.values())
+
+def setup_solve(size):
+    from optimize_weights import calculate_factors_and_slice
+    data = _daily_closes(size)
+    nifty = data['^NSEI']
+    regime = pd.DataFrame({'Regime_Tag': np.where(nifty > nifty.rolling(200).mean(), 'BULL', 'BEAR')}, index=data.index)
+    dataset = []
+    for symbol in data.columns.drop('^NSEI'):
+        df = calculate_factors_and_slice(data[[symbol]].rename(columns={symbol: 'Close'}), regime)
+        dataset.append(df[df['Regime_Tag'] == 'BULL'])
+    return dataset
+
+def run_solve(dataset):
+    from optimize_weights import solve_formula
+    solve_formula(dataset, "BENCH")
+    return sum(len(d) for d in dataset)
+
+def setup_allocator(size):
+    market = _market(size, "1d")
+    closes = market.panel.frame('close').astype('float64').iloc[-252:]
+    # The allocator sees the BUY list, not the universe: one name in ten
+    rng = np.random.default_rng(SEED)
+    symbols = list(rng.choice(market.panel.symbols[:-1], size=max(5, size // 10), replace=False))
+    recs = pd.DataFrame({'symbol': symbols, 'Confidence': rng.uniform(0.5, 0.7, len(symbols))})
+    return recs, closes, market.sector_map
+
+def run_allocator(inputs):
+    from allocator_logic import run_black_litterman_allocation
+    recs, closes, sector_map = inputs
+    run_black_litterman_allocation(recs, prices=closes, sector_map=sector_map)
+    return len(recs) * len(closes)
+
+def setup_costs(size):
+    closes = _daily_closes(size).iloc[-1].drop('^NSEI')
+    return {s: 1.0 / size for s in closes.index}, closes
+
+def run_costs(inputs):
+    from reality_simulator import IndiaTradingCostModel
+    allocations, last_close = inputs
+    model = IndiaTradingCostModel(capital=10_000_000)
+    model.calculate_friction(allocations)
+    for symbol, price in last_close.items():
+        qty = int(model.capital * allocations[symbol] // price)
+        model.calculate_trade_cost(price, qty, "BUY")
+        model.calculate_trade_cost(price, qty, "SELL")
+    return len(allocations)
+
+def setup_shards(size):
+    # Replay fixtures for every symbol; set before yahoo_client is imported (shard workers inherit it)
+    os.environ.update({'ORACLE_YF_MODE': 'replay', 'ORACLE_FIXTURE_DIR': tempfile.mkdtemp(prefix="bench_yahoo_"),
+                       'ORACLE_REPLAY_LATENCY': str(SCAN_LATENCY)})
+    from synthetic_market import to_fixtures
+    from predict_daily import price_stage
+    market = _market(size, "1d")
+    to_fixtures(market)
+    closes = market.panel.frame('close').astype('float64')
+    tickers = list(closes.columns.drop('^NSEI'))
+    return price_stage(closes[tickers], tickers), tempfile.mkdtemp(prefix="bench_checkpoints_")
+
+def _audit_shard(k, n_shards, prices, checkpoint_dir):
+    """Worker: one shard's audit with its own TokenBucket (its own egress)."""
+    from predict_daily import BURST, shard_of, audit_universe
+    from rate_limit import TokenBucket
+    from scan_checkpoint import ScanCheckpoint
+    from sentiment_engine import NewsSentimentEngine
+    tickers = [t for t in prices.index if shard_of(t, n_shards) == k]
+    checkpoint = ScanCheckpoint(os.path.join(checkpoint_dir, f"{k}-of-{n_shards}.jsonl"), fresh=True)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        rows = audit_universe(tickers, prices, NewsSentimentEngine(),
+                              limiter=TokenBucket(SCAN_REQUESTS_PER_SECOND, BURST), checkpoint=checkpoint)
+    return len(rows)
+
+def run_shards(inputs, n_shards):
+    prices, checkpoint_dir = inputs
+    with ProcessPoolExecutor(max_workers=n_shards, mp_context=mp.get_context("spawn")) as executor:
+        futures = [executor.submit(_audit_shard, k, n_shards, prices, checkpoint_dir) for k in range(n_shards)]
+        return sum(f.result() for f in futures)
+
+STAGES = {
+    "feature_engineering.build_master_dataset": (setup_features, run_features),
+    "train_model.train_ai_model": (setup_train, run_train),
+    "backtest_strategy.calculate_monthly_scores": (_daily_closes, run_monthly_scores),
+    "backtest_strategy.run_backtest": (_daily_closes, run_backtest),
+    "find_golden_weights.backtest_weights": (setup_golden, run_golden),
+    "optimize_weights.solve_formula": (setup_solve, run_solve),
+    "allocator_logic.run_black_litterman_allocation": (setup_allocator, run_allocator),
+    "reality_simulator.IndiaTradingCostModel": (setup_costs, run_costs),
+}
+for n in SHARD_COUNTS:
+    STAGES[f"predict_daily.run_sharded ({n} egress)"] = (setup_shards, lambda inputs, n=n: run_shards(inputs, n))
+
+# --- RUNNER ---
+def _peak_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def _child(stage, size, repeat, queue):
+    """Runs one (stage, size) in isolation and reports back through the queue."""
+    record = {'stage': stage, 'size': size, 'status': 'OK'}
+    setup, run = STAGES[stage]
+    try:
+        # The stages print their own reports; keep the benchmark output readable
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            inputs = setup(size)
+            record['setup_rss_mb'] = round(_peak_rss_mb(), 1)
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                rows = run(inputs)
+                timings.append(time.perf_counter() - t0)
+        record['wall_s'] = round(min(timings), 4)
+        record['rows'] = int(rows)
+        record['rows_per_s'] = round(rows / record['wall_s'], 1) if record['wall_s'] > 0 else None
+        record['peak_rss_mb'] = round(_peak_rss_mb(), 1)
+    except ImportError as e:
+        record['status'] = f"SKIPPED: {e}"
+    except Exception as e:
+        record['status'] = f"ERROR: {str(e)[:80]}"
+        record['traceback'] = traceback.format_exc(limit=5)
+    queue.put(record)
+
+def run_isolated(stage, size, repeat=1, timeout=STAGE_TIMEOUT):
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_child, args=(stage, size, repeat, queue))
+    proc.start()
+    try:
+        record = queue.get(timeout=timeout)
+    except Exception:
+        proc.terminate()
+        record = {'stage': stage, 'size': size, 'status': f"TIMEOUT ({timeout}s)"}
+    proc.join()
+    return record
+
+def git_revision():
+    try:
+        sha = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+        dirty = subprocess.check_output(["git", "status", "--porcelain", "--untracked-files=no"], text=True).strip()
+        return f"{sha}-dirty" if dirty else sha
+    except Exception:
+        return "unknown"
+
+def run_suite(stages, sizes, repeat=1, timeout=STAGE_TIMEOUT):
+    results = []
+    print(f"⏱️  Benchmarking {len(stages)} stages x sizes {list(sizes)} (best of {repeat})...")
+    print("-" * 100)
+    print(f"{'STAGE':<48} | {'SIZE':>5} | {'WALL (s)':>9} | {'ROWS/s':>12} | {'PEAK RSS (MB)':>13}")
+    print("-" * 100)
+    for stage in stages:
+        for size in sizes:
+            r = run_isolated(stage, size, repeat, timeout)
+            results.append(r)
+            if r['status'] == 'OK':
+                print(f"{stage:<48} | {size:>5} | {r['wall_s']:>9.3f} | {r['rows_per_s'] or 0:>12,.0f} | {r['peak_rss_mb']:>13.1f}")
+            else:
+                print(f"{stage:<48} | {size:>5} | {r['status'][:45]}")
+    print("-" * 100)
+    return results
+
+def save_results(results, path=None):
+    revision = git_revision()
+    path = path or os.path.join(RESULTS_DIR, f"{revision}.json")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    report = {
+        'revision': revision,
+        'created': pd.Timestamp.now(tz="UTC").isoformat(),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()} ({os.cpu_count()} cpus)",
+        'config': {'hourly_bars': HOURLY_BARS, 'daily_bars': DAILY_BARS, 'end': BENCH_END, 'seed': SEED},
+        'results': results,
+    }
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results saved to {path}")
+    return path
+
+def compare(base_path, head_path):
+    """Side-by-side wall time and RSS of two result files; flags regressions."""
+    with open(base_path) as f: base = json.load(f)
+    with open(head_path) as f: head = json.load(f)
+    before = {(r['stage'], r['size']): r for r in base['results'] if r['status'] == 'OK'}
+
+    print(f"\n📊 {base['revision']} -> {head['revision']}")
+    print("-" * 100)
+    print(f"{'STAGE':<48} | {'SIZE':>5} | {'WALL':>17} | {'SPEEDUP':>7} | {'PEAK RSS (MB)':>15}")
+    print("-" * 100)
+    regressions = []
+    for r in head['results']:
+        old = before.get((r['stage'], r['size']))
+        if r['status'] != 'OK' or old is None:
+            continue
+        speedup = old['wall_s'] / r['wall_s'] if r['wall_s'] > 0 else float('inf')
+        flag = ""
+        if r['wall_s'] > old['wall_s'] * (1 + REGRESSION_THRESHOLD):
+            flag = " 🔻"
+            regressions.append((r['stage'], r['size']))
+        elif speedup > 1 + REGRESSION_THRESHOLD:
+            flag = " 🚀"
+        print(f"{r['stage']:<48} | {r['size']:>5} | {old['wall_s']:>7.3f} -> {r['wall_s']:<7.3f} | "
+              f"{speedup:>6.2f}x | {old['peak_rss_mb']:>6.0f} -> {r['peak_rss_mb']:<6.0f}{flag}")
+    print("-" * 100)
+    if regressions:
+        print(f"❌ {len(regressions)} stage/size pairs slower by more than {REGRESSION_THRESHOLD:.0%}.")
+    else:
+        print("✅ No regressions.")
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stage-level benchmarks on synthetic markets")
+    parser.add_argument("--stages", nargs="*", default=None, help="Substring filter, e.g. backtest solve_formula")
+    parser.add_argument("--sizes", nargs="*", type=int, default=list(SIZES))
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage; the fastest is kept")
+    parser.add_argument("--timeout", type=int, default=STAGE_TIMEOUT)
+    parser.add_argument("--out", default=None, help=f"Result file (default {RESULTS_DIR}/<git sha>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "HEAD"), help="Compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(*args.compare) else 0)
+
+    stages = [s for s in STAGES if not args.stages or any(f in s for f in args.stages)]
+    results = run_suite(stages, args.sizes, args.repeat, args.timeout)
+    save_results(results, args.out)
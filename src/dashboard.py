@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import yfinance as yf
 import json
 import os
 import sys
@@ -12,8 +11,11 @@ import numpy as np
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 try:
     from sector_map import SECTOR_MAP
+    from sector_index import SectorIndex
 except ImportError:
     SECTOR_MAP = {}
+    SectorIndex = None
+from market_data import get_ohlcv, get_prices
 
 # --- PAGE CONFIG ---
 st.set_page_config(
@@ -72,9 +74,8 @@ def load_portfolio():
 def get_candlestick_chart(ticker, name):
     try:
         if not ticker: return None
-        df = yf.download(ticker, period="3mo", interval="1d", progress=False)
+        df = get_ohlcv(ticker, period="3mo", interval="1d")
         if df.empty: return None
-        if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
         
         fig = go.Figure(data=[go.Candlestick(x=df.index, open=df['Open'], high=df['High'], low=df['Low'], close=df['Close'], increasing_line_color='#00FF7F', decreasing_line_color='#FF4B4B')])
         fig.update_layout(title=name, template="plotly_dark", height=300, margin=dict(l=0, r=0, t=40, b=0), xaxis_rangeslider_visible=False, paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
@@ -83,9 +84,8 @@ def get_candlestick_chart(ticker, name):
 
 def plot_mini_line(ticker):
     try:
-        df = yf.download(ticker, period="3mo", progress=False)
+        df = get_ohlcv(ticker, period="3mo")
         if df.empty: return None
-        if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
         fig = go.Figure()
         fig.add_trace(go.Scatter(x=df.index, y=df['Close'], mode='lines', line=dict(color='#00FF7F', width=2), fill='tozeroy', fillcolor='rgba(0, 255, 127, 0.1)'))
         fig.update_layout(margin=dict(l=0, r=0, t=0, b=0), height=80, template="plotly_dark", xaxis=dict(showgrid=False, showticklabels=False), yaxis=dict(showgrid=False, showticklabels=False), paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
@@ -98,29 +98,40 @@ def get_bond_analysis(risk_tolerance):
     if risk_tolerance > 33: target_risk = 2
     if risk_tolerance > 66: target_risk = 3
     
-    for ticker, info in BOND_ETFS.items():
-        if info['Risk'] == target_risk or (target_risk == 3 and info['Risk'] == 4):
-            try:
-                df = yf.download(ticker, period="1y", progress=False)
-                if df.empty: continue
-                if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
-                
-                curr = float(df['Close'].iloc[-1])
-                prev = float(df['Close'].iloc[0])
-                ytd_ret = ((curr - prev) / prev) * 100
-                vol = df['Close'].pct_change().std() * np.sqrt(252) * 100
-                
-                results.append({
-                    "Ticker": ticker,
-                    "Asset Name": info['Name'],
-                    "Type": info['Type'],
-                    "Price": curr,
-                    "1Y Return": ytd_ret,
-                    "Risk (Vol)": vol
-                })
-            except: continue
+    picks = {t: info for t, info in BOND_ETFS.items() if info['Risk'] == target_risk or (target_risk == 3 and info['Risk'] == 4)}
+    closes = get_prices(list(picks), period="1y")
+    
+    for ticker, info in picks.items():
+        try:
+            if ticker not in closes.columns: continue
+            close = closes[ticker].dropna()
+            if close.empty: continue
+            
+            curr = float(close.iloc[-1])
+            prev = float(close.iloc[0])
+            ytd_ret = ((curr - prev) / prev) * 100
+            vol = close.pct_change().std() * np.sqrt(252) * 100
+            
+            results.append({
+                "Ticker": ticker,
+                "Asset Name": info['Name'],
+                "Type": info['Type'],
+                "Price": curr,
+                "1Y Return": ytd_ret,
+                "Risk (Vol)": vol
+            })
+        except: continue
     return pd.DataFrame(results)
 
+def get_sector_heatmap(tickers, sessions=20):
+    """Equal-weight daily sector returns (%) for the last `sessions` sessions, sector x day."""
+    closes = get_prices(list(tickers), period="3mo")
+    if closes.empty or SectorIndex is None: return pd.DataFrame()
+    returns = closes.pct_change().iloc[-sessions:]
+    heat = SectorIndex(list(closes.columns), SECTOR_MAP).returns(returns).T * 100
+    heat.columns = [d.strftime('%d %b') for d in heat.columns]
+    return heat.dropna(how='all')
+
 # --- MAIN APP ---
 df = load_data()
 portfolio = load_portfolio()
@@ -186,7 +197,7 @@ with tabs[0]:
                     st.caption(f"Qty: {qty} | Avg: INR {avg_cost:,.2f}")
                 with cols[1]:
                     try:
-                        df_tick = yf.download(ticker, period="1d", progress=False)
+                        df_tick = get_ohlcv(ticker, period="5d")
                         curr_price = float(df_tick['Close'].values[-1]) if not df_tick.empty else avg_cost
                         pnl_val = (curr_price - avg_cost) * qty
                         pnl_pct = (pnl_val / (avg_cost * qty)) * 100
@@ -212,6 +223,13 @@ with tabs[1]:
         with c2:
             st.dataframe(sector_stats, column_config={"Oracle_Score": st.column_config.NumberColumn("Score", format="%.1f"), "Projected_Upside": st.column_config.NumberColumn("Upside", format="%.1f%%")}, hide_index=True, use_container_width=True)
 
+        st.caption("Sector Returns, Last 20 Sessions (Equal-Weight, %)")
+        heat = get_sector_heatmap(latest_df['Ticker'].unique())
+        if not heat.empty:
+            fig_heat = px.imshow(heat, color_continuous_scale='RdYlGn', color_continuous_midpoint=0, aspect='auto')
+            fig_heat.update_layout(template="plotly_dark", paper_bgcolor='rgba(0,0,0,0)', plot_bgcolor='rgba(0,0,0,0)')
+            st.plotly_chart(fig_heat, use_container_width=True)
+
 # === TAB 3: MARKET UNIVERSE ===
 with tabs[2]:
     st.subheader("Full Market Scan")
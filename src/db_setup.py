@@ -1,4 +1,5 @@
 import psycopg2
+from sector_map import SECTOR_MAP
 
 DB_CONFIG = {
     "dbname": "postgres",
@@ -8,49 +9,168 @@ DB_CONFIG = {
     "port": "5432"
 }
 
+# --- STORAGE POLICIES ---
+COMPRESS_AFTER = "30 days"   # Chunks older than this are compressed (segmented by symbol)
+RETAIN_FOR = "3 years"       # Raw hourly candles older than this are dropped
+# The aggregates only re-materialise recent buckets, so daily/weekly history
+# survives after the raw candles under it have been dropped by retention.
+CONTINUOUS_AGGREGATES = {
+    "market_data_daily":  {"bucket": "1 day",  "start_offset": "7 days",   "end_offset": "1 hour", "schedule": "1 hour"},
+    "market_data_weekly": {"bucket": "1 week", "start_offset": "1 month",  "end_offset": "1 day",  "schedule": "1 day"},
+}
+
+def create_market_data(cur):
+    # Non-destructive: existing candles are never dropped
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS market_data (
+            time            TIMESTAMPTZ NOT NULL,
+            symbol          TEXT NOT NULL,
+            open            DOUBLE PRECISION,
+            high            DOUBLE PRECISION,
+            low             DOUBLE PRECISION,
+            close           DOUBLE PRECISION,
+            volume          DOUBLE PRECISION,
+            is_adjusted     BOOLEAN DEFAULT FALSE,
+            
+            -- THE SECURITY GUARD: No duplicate (time + symbol) allowed
+            UNIQUE (time, symbol)
+        );
+    """)
+    cur.execute("SELECT create_hypertable('market_data', 'time', if_not_exists => TRUE);")
+    print("✅ 'market_data' Hypertable ready.")
+
+def create_indexes(cur):
+    # Timescale rejects CREATE INDEX CONCURRENTLY on hypertables; building one
+    # chunk per transaction gives the same "no long table lock" behaviour.
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS market_data_symbol_time_idx
+        ON market_data (symbol, time DESC)
+        WITH (timescaledb.transaction_per_chunk);
+    """)
+    print("✅ (symbol, time DESC) index ready.")
+
+def create_symbols_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS symbols (
+            symbol      TEXT PRIMARY KEY,
+            sector      TEXT,
+            first_seen  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    # Plain table, so a concurrent build is allowed here
+    cur.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS symbols_sector_idx ON symbols (sector);")
+    print("✅ 'symbols' dimension table ready.")
+
+def enable_compression(cur):
+    # Re-running ALTER ... SET on a table with compressed chunks fails, so check first
+    cur.execute("""
+        SELECT compression_enabled FROM timescaledb_information.hypertables
+        WHERE hypertable_name = 'market_data';
+    """)
+    row = cur.fetchone()
+    if not (row and row[0]):
+        cur.execute("""
+            ALTER TABLE market_data SET (
+                timescaledb.compress,
+                timescaledb.compress_segmentby = 'symbol',
+                timescaledb.compress_orderby = 'time DESC'
+            );
+        """)
+    cur.execute("SELECT add_compression_policy('market_data', INTERVAL %s, if_not_exists => TRUE);", (COMPRESS_AFTER,))
+    print(f"✅ Compression policy: chunks older than {COMPRESS_AFTER}.")
+
+def create_continuous_aggregates(cur):
+    for view, cfg in CONTINUOUS_AGGREGATES.items():
+        # materialized_only = false: queries also see the not-yet-materialised latest bars
+        cur.execute(f"""
+            CREATE MATERIALIZED VIEW IF NOT EXISTS {view}
+            WITH (timescaledb.continuous, timescaledb.materialized_only = false) AS
+            SELECT time_bucket(INTERVAL '{cfg['bucket']}', time) AS bucket,
+                   symbol,
+                   first(open, time) AS open,
+                   max(high)         AS high,
+                   min(low)          AS low,
+                   last(close, time) AS close,
+                   sum(volume)       AS volume
+            FROM market_data
+            GROUP BY bucket, symbol
+            WITH NO DATA;
+        """)
+        cur.execute(
+            "SELECT add_continuous_aggregate_policy(%s, start_offset => INTERVAL %s, end_offset => INTERVAL %s, "
+            "schedule_interval => INTERVAL %s, if_not_exists => TRUE);",
+            (view, cfg['start_offset'], cfg['end_offset'], cfg['schedule'])
+        )
+        # Backfill the new view from whatever history is already stored
+        cur.execute("CALL refresh_continuous_aggregate(%s, NULL, NULL);", (view,))
+        print(f"✅ Continuous aggregate '{view}' ({cfg['bucket']} OHLCV).")
+
+def add_retention(cur):
+    cur.execute("SELECT add_retention_policy('market_data', INTERVAL %s, if_not_exists => TRUE);", (RETAIN_FOR,))
+    print(f"✅ Retention policy: raw candles kept for {RETAIN_FOR}.")
+
+# --- MIGRATIONS ---
+# Append-only. Every step must be idempotent, so a crash between running a
+# step and recording it is harmless on the next run. Never edit a shipped step.
+MIGRATIONS = [
+    (1, "market_data hypertable", create_market_data),
+    (2, "(symbol, time DESC) index", create_indexes),
+    (3, "symbols dimension table", create_symbols_table),
+    (4, "native compression", enable_compression),
+    (5, "daily/weekly continuous aggregates", create_continuous_aggregates),
+    (6, "retention policy", add_retention),
+]
+
+def get_schema_version(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version     INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+    """)
+    cur.execute("SELECT COALESCE(max(version), 0) FROM schema_migrations;")
+    return cur.fetchone()[0]
+
+def sync_symbols(cur):
+    """Keeps the symbols dimension in step with SECTOR_MAP (runs every time)."""
+    rows = [(s, sector) for s, sector in SECTOR_MAP.items()] + [("^NSEI", "MARKET_INDEX")]
+    cur.executemany("""
+        INSERT INTO symbols (symbol, sector) VALUES (%s, %s)
+        ON CONFLICT (symbol) DO UPDATE SET sector = EXCLUDED.sector;
+    """, rows)
+
+def run_migrations(cur):
+    current = get_schema_version(cur)
+    pending = [m for m in MIGRATIONS if m[0] > current]
+    print(f"📜 Schema version {current}. {len(pending)} migration(s) pending.")
+
+    for version, description, step in pending:
+        print(f"🛠  [{version}] {description}...")
+        step(cur)
+        cur.execute(
+            "INSERT INTO schema_migrations (version, description) VALUES (%s, %s) ON CONFLICT DO NOTHING;",
+            (version, description)
+        )
+    return max([current] + [m[0] for m in MIGRATIONS])
+
 def create_schema():
     try:
         print("🔌 Connecting to Database...")
         conn = psycopg2.connect(**DB_CONFIG)
+        # Autocommit: CONCURRENTLY builds and continuous aggregates can't run inside a transaction
         conn.autocommit = True
         cur = conn.cursor()
-        
-        # 1. DROP the old messy table (WIPE DATA)
-        # Warning: This deletes all historical data!
-        cur.execute("DROP TABLE IF EXISTS market_data CASCADE;")
-        print("🗑  Old 'market_data' table wiped.")
-
-        # 2. Re-Create with UNIQUE Constraint
-        print("🛠  Building New Secure Vault...")
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS market_data (
-                time            TIMESTAMPTZ NOT NULL,
-                symbol          TEXT NOT NULL,
-                open            DOUBLE PRECISION,
-                high            DOUBLE PRECISION,
-                low             DOUBLE PRECISION,
-                close           DOUBLE PRECISION,
-                volume          DOUBLE PRECISION,
-                is_adjusted     BOOLEAN DEFAULT FALSE,
-                
-                -- THE SECURITY GUARD: No duplicate (time + symbol) allowed
-                UNIQUE (time, symbol)
-            );
-        """)
-        
-        # 3. Convert to Hypertable
-        try:
-            cur.execute("SELECT create_hypertable('market_data', 'time');")
-            print("✅ 'market_data' Hypertable created.")
-        except psycopg2.errors.InternalError: 
-             print("ℹ️ 'market_data' is already a Hypertable.")
+
+        version = run_migrations(cur)
+        sync_symbols(cur)
 
         cur.close()
         conn.close()
-        print("\n🚀 SUCCESS: Vault is now secure and duplicate-proof.")
+        print(f"\n🚀 SUCCESS: Vault is at schema version {version}. No data was dropped.")
 
     except Exception as e:
         print(f"❌ Error: {e}")
 
 if __name__ == "__main__":
-    create_schema()
\ No newline at end of file
+    create_schema()
@@ -1,35 +1,121 @@
 import pandas as pd
 import numpy as np
 import psycopg2
+import io
+import os
+import shutil
 import warnings
 from sector_map import SECTOR_MAP 
+from sector_index import SectorIndex
+from indicators import RSI, BollingerWidth, VolumeRatio, batch
 
 warnings.filterwarnings("ignore")
 
 DB_CONFIG = { "dbname": "postgres", "user": "postgres", "password": "password", "host": "localhost", "port": "5432" }
 
-def fetch_all_data():
+# --- READ PATH ---
+# market_data is streamed with COPY TO STDOUT and parsed in fixed-size byte
+# chunks, each scattered straight into dense float32 (time x symbol) matrices.
+# The long frame (and its two pivots) never exists in memory.
+READ_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Sector indices: "equal" weight, or "volume" (previous bar's traded volume)
+SECTOR_WEIGHTING = "equal"
+
+# --- OUT-OF-CORE BUILD ---
+# build_master_dataset_chunked() walks the history in time windows sized to fit
+# MEMORY_LIMIT_MB, each with a warm-up overlap, and spills compact parts to Parquet.
+MEMORY_LIMIT_MB = int(os.environ.get("ORACLE_MEMORY_LIMIT_MB", "2048"))
+BYTES_PER_CELL = 300        # Measured peak per (bar x symbol) of one in-memory build
+WARMUP_BARS = 30            # >= longest look-back (BB / volume 20, RSI 15)
+PARTS_DIR = "feature_parts"
+FEATURE_COLUMNS = ['log_return', 'RSI', 'BB_Width', 'Volume_Ratio', 'Market_Rel_Strength', 'Sector_Rel_Strength', 'F_Score']
+
+class PanelMatrix:
+    """Dense (time x symbol) float32 matrices + the index that labels them."""
+    def __init__(self, times, symbols, fields):
+        self.times = times
+        self.symbols = list(symbols)
+        self.symbol_index = {s: i for i, s in enumerate(self.symbols)}
+        self.fields = fields
+
+    def frame(self, field):
+        """Zero-copy DataFrame view of one field."""
+        return pd.DataFrame(self.fields[field], index=self.times, columns=self.symbols, copy=False)
+
+class _ChunkSink:
+    """File-like COPY target: hands over complete CSV lines every `chunk_bytes`."""
+    def __init__(self, on_chunk, chunk_bytes):
+        self.on_chunk = on_chunk
+        self.chunk_bytes = chunk_bytes
+        self.buf = bytearray()
+
+    def write(self, data):
+        self.buf += data.encode() if isinstance(data, str) else data
+        if len(self.buf) >= self.chunk_bytes:
+            self.flush(final=False)
+
+    def flush(self, final=True):
+        cut = len(self.buf) if final else self.buf.rfind(b"\n") + 1
+        if cut <= 0: return
+        block = bytes(self.buf[:cut])
+        del self.buf[:cut]
+        self.on_chunk(block)
+
+def _time_filter(start, end):
+    clauses, params = [], []
+    if start is not None:
+        clauses.append("time >= %s"); params.append(pd.Timestamp(start).to_pydatetime())
+    if end is not None:
+        clauses.append("time < %s"); params.append(pd.Timestamp(end).to_pydatetime())
+    return ("WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+def fetch_panel(fields=('close', 'volume'), start=None, end=None, chunk_bytes=READ_CHUNK_BYTES):
+    """Reads market_data into a PanelMatrix without materialising the long frame."""
+    fields = list(fields)
     conn = psycopg2.connect(**DB_CONFIG)
-    query = "SELECT time, symbol, close, volume FROM market_data ORDER BY time ASC;"
-    df = pd.read_sql(query, conn)
+    cur = conn.cursor()
+    where, params = _time_filter(start, end)
+
+    # 1. Axes first (cheap index scans), so the matrices can be allocated once
+    cur.execute(f"SELECT DISTINCT symbol FROM market_data {where} ORDER BY symbol;", params)
+    symbols = [r[0] for r in cur.fetchall()]
+    cur.execute(f"SELECT DISTINCT extract(epoch FROM time)::bigint AS t FROM market_data {where} ORDER BY t;", params)
+    epochs = np.array([r[0] for r in cur.fetchall()], dtype=np.int64)
+
+    matrices = {f: np.full((len(epochs), len(symbols)), np.nan, dtype=np.float32) for f in fields}
+    symbol_axis = pd.Index(symbols)
+    names = ['t', 'symbol'] + fields
+
+    # 2. Stream rows and scatter each chunk into place (row order doesn't matter)
+    def scatter(block):
+        chunk = pd.read_csv(io.BytesIO(block), header=None, names=names,
+                            dtype={'symbol': str}, engine='pyarrow')
+        rows = np.searchsorted(epochs, chunk['t'].to_numpy())
+        cols = symbol_axis.get_indexer(chunk['symbol'])
+        for f in fields:
+            matrices[f][rows, cols] = chunk[f].to_numpy(dtype=np.float32)
+
+    # Literal params are mogrified in, since COPY can't take bind parameters
+    select = cur.mogrify(
+        f"SELECT extract(epoch FROM time)::bigint, symbol, {', '.join(fields)} FROM market_data {where}", params
+    ).decode()
+    sink = _ChunkSink(scatter, chunk_bytes)
+    cur.copy_expert(f"COPY ({select}) TO STDOUT WITH (FORMAT csv)", sink)
+    sink.flush()
     conn.close()
-    df['time'] = pd.to_datetime(df['time'])
-    df.set_index('time', inplace=True)
-    return df
 
+    times = pd.to_datetime(epochs, unit='s', utc=True)
+    times.name = 'time'
+    return PanelMatrix(times, symbols, matrices)
+
+# Batch runs of the streaming indicators (indicators.py): a Series or a whole
+# (time x symbol) frame, identical to what a live feed would produce bar by bar
 def calculate_rsi(series, period=14):
-    delta = series.diff(1)
-    gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
-    rs = gain / loss
-    return 100 - (100 / (1 + rs))
+    return batch(RSI, series, period=period)
 
 def calculate_bollinger_width(series, window=20, num_std=2):
-    rolling_mean = series.rolling(window=window).mean()
-    rolling_std = series.rolling(window=window).std()
-    upper = rolling_mean + (rolling_std * num_std)
-    lower = rolling_mean - (rolling_std * num_std)
-    return (upper - lower) / rolling_mean
+    return batch(BollingerWidth, series, window=window, num_std=num_std)
 
 def load_fundamental_scores():
     """Loads the Piotroski F-Scores from CSV"""
@@ -41,67 +127,151 @@ def load_fundamental_scores():
         print("⚠️ Warning: fundamental_data.csv not found. Running without CA scores.")
         return {}
 
-def build_master_dataset():
+def _to_long(matrices, times, symbols):
+    """
+    Stacks (time x symbol) matrices into the long training frame, symbol by symbol
+    (same row order the per-symbol loop produced), dropping rows with any NaN.
+    """
+    n_times, n_symbols = len(times), len(symbols)
+    # Transposed ravel = symbol-major order, one contiguous block per symbol
+    columns = {name: np.ascontiguousarray(m.T).ravel() for name, m in matrices.items()}
+    keep = np.ones(n_times * n_symbols, dtype=bool)
+    for values in columns.values():
+        keep &= ~np.isnan(values)
+
+    index = times.take(np.tile(np.arange(n_times), n_symbols)[keep])
+    codes = np.repeat(np.arange(n_symbols, dtype=np.int32), n_times)[keep]
+    out = pd.DataFrame({name: values[keep] for name, values in columns.items()}, index=index)
+    out.insert(0, 'symbol', pd.Categorical.from_codes(codes, categories=symbols))
+    return out
+
+def build_master_dataset(panel=None, f_scores=None, sector_map=None):
+    """
+    Pass `panel` / `f_scores` / `sector_map` to build from in-memory inputs
+    (benchmarks, synthetic markets); by default they come from the Vault + CSV.
+    Every feature is computed once on the whole (time x symbol) matrix.
+    """
     print("🌍 Loading Universe for Sector & Fundamental Analysis...")
-    raw_df = fetch_all_data()
+    if panel is None:
+        panel = fetch_panel(fields=('close', 'volume'))
     
     # Load Fundamentals
-    f_scores = load_fundamental_scores()
+    if f_scores is None:
+        f_scores = load_fundamental_scores()
+    if sector_map is None:
+        sector_map = SECTOR_MAP
     
-    close_pivot = raw_df.pivot(columns='symbol', values='close')
-    volume_pivot = raw_df.pivot(columns='symbol', values='volume')
+    close_pivot = panel.frame('close')
+    volume_pivot = panel.frame('volume')
     returns_df = close_pivot.pct_change()
+    nifty_ret = returns_df['^NSEI'] if '^NSEI' in returns_df.columns else returns_df.mean(axis=1)
+
+    stocks = [s for s in returns_df.columns if s != '^NSEI']
+    close = close_pivot[stocks]
+    returns = returns_df[stocks].to_numpy(dtype=np.float64)
     
     # --- SECTOR INDICES ---
-    print("🏭 Building Synthetic Sector Indices...")
-    sector_returns = pd.DataFrame(index=returns_df.index)
-    unique_sectors = set(SECTOR_MAP.values())
-    
-    for sector in unique_sectors:
-        stocks_in_sector = [s for s in SECTOR_MAP if SECTOR_MAP[s] == sector]
-        valid_stocks = [s for s in stocks_in_sector if s in returns_df.columns]
-        if valid_stocks:
-            sector_returns[sector] = returns_df[valid_stocks].mean(axis=1)
-            
-    # --- INDIVIDUAL PROCESSING ---
-    final_dfs = []
-    nifty_ret = returns_df['^NSEI'] if '^NSEI' in returns_df.columns else returns_df.mean(axis=1)
+    sectors = SectorIndex(stocks, sector_map)
+    weights = volume_pivot[stocks].shift(1) if SECTOR_WEIGHTING == "volume" else None
+    # Each stock's own sector index, gathered back onto the stock columns
+    own_sector = sectors.own(sectors.returns(returns, weights))
 
     print("⚙️  Calculating Technicals + Fundamentals...")
-    for symbol in returns_df.columns:
-        if symbol == '^NSEI': continue 
-        
-        sector = SECTOR_MAP.get(symbol, "OTHER")
-        
-        df = pd.DataFrame(index=returns_df.index)
-        df['close'] = close_pivot[symbol]
-        df['volume'] = volume_pivot[symbol]
-        df['stock_return'] = returns_df[symbol]
-        
-        # Technicals
-        df['log_return'] = np.log(df['close'] / df['close'].shift(1))
-        df['RSI'] = calculate_rsi(df['close'])
-        df['BB_Width'] = calculate_bollinger_width(df['close'])
-        df['Volume_Ratio'] = df['volume'] / df['volume'].rolling(20).mean()
-        
-        # Relative Strength
-        df['Market_Rel_Strength'] = df['stock_return'] - nifty_ret
-        if sector in sector_returns.columns:
-            df['Sector_Rel_Strength'] = df['stock_return'] - sector_returns[sector]
-        else:
-            df['Sector_Rel_Strength'] = 0.0
-            
-        # --- NEW: FUNDAMENTAL F-SCORE ---
-        # Map the score. If missing (like ^IXIC), default to 0.
-        score = f_scores.get(symbol, 0)
-        df['F_Score'] = score
-            
-        # Target
-        df['target'] = (df['Market_Rel_Strength'].shift(-1) > 0).astype(int)
-        
-        # We add 'F_Score' to the feature list
-        features = ['log_return', 'RSI', 'BB_Width', 'Volume_Ratio', 'Market_Rel_Strength', 'Sector_Rel_Strength', 'F_Score', 'target']
-        df = df[features].dropna()
-        final_dfs.append(df)
-        
-    return pd.concat(final_dfs)
\ No newline at end of file
+    market_rel = returns - nifty_ret.to_numpy(dtype=np.float64)[:, None]
+    # Stocks outside the sector map have no index to beat -> 0.0
+    sector_rel = np.where(sectors.in_map[None, :], returns - own_sector, 0.0)
+    # Map the score. If missing (like ^IXIC), default to 0.
+    f_score = np.array([f_scores.get(s, 0) for s in stocks], dtype=np.float64)
+    # Target: beats Nifty on the next bar (the last bar has no next bar -> 0)
+    next_rel = np.vstack([market_rel[1:], np.full((1, len(stocks)), np.nan)])
+    with np.errstate(invalid='ignore'):
+        target = (next_rel > 0).astype(np.float64)
+
+    features = {
+        'log_return': np.log(close / close.shift(1)).to_numpy(dtype=np.float64),
+        'RSI': calculate_rsi(close).to_numpy(dtype=np.float64),
+        'BB_Width': calculate_bollinger_width(close).to_numpy(dtype=np.float64),
+        'Volume_Ratio': batch(VolumeRatio, volume_pivot[stocks], window=20).to_numpy(dtype=np.float64),
+        'Market_Rel_Strength': market_rel,
+        'Sector_Rel_Strength': sector_rel,
+        'F_Score': np.broadcast_to(f_score, returns.shape),
+        'target': target,
+    }
+    out = _to_long(features, returns_df.index, stocks)
+    out[['F_Score', 'target']] = out[['F_Score', 'target']].astype(int)
+    return out
+
+def compact_features(df, symbols=None):
+    """float32 features, int8 score/target, categorical symbol (~1/2 the bytes of the build)."""
+    out = df.copy()
+    for col in FEATURE_COLUMNS:
+        if col in out.columns and col != 'F_Score':
+            out[col] = out[col].astype(np.float32)
+    out['F_Score'] = out['F_Score'].astype(np.int8)
+    out['target'] = out['target'].astype(np.int8)
+    categories = symbols if symbols is not None else sorted(out['symbol'].astype(str).unique())
+    out['symbol'] = pd.Categorical(out['symbol'].astype(str), categories=categories)
+    return out
+
+def _time_axis(start=None, end=None):
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    where, params = _time_filter(start, end)
+    cur.execute(f"SELECT DISTINCT symbol FROM market_data {where} ORDER BY symbol;", params)
+    symbols = [r[0] for r in cur.fetchall()]
+    cur.execute(f"SELECT DISTINCT time FROM market_data {where} ORDER BY time;", params)
+    times = pd.DatetimeIndex([r[0] for r in cur.fetchall()]).tz_convert('UTC')
+    conn.close()
+    return times, symbols
+
+def first_bars(symbols=None):
+    """{symbol: time of its first bar} for every symbol in market_data (or just `symbols`)."""
+    conn = psycopg2.connect(**DB_CONFIG)
+    cur = conn.cursor()
+    if symbols is None:
+        cur.execute("SELECT symbol, MIN(time) FROM market_data GROUP BY symbol;")
+    else:
+        cur.execute("SELECT symbol, MIN(time) FROM market_data WHERE symbol = ANY(%s) GROUP BY symbol;", (list(symbols),))
+    first = {symbol: pd.Timestamp(t).tz_convert('UTC') for symbol, t in cur.fetchall()}
+    conn.close()
+    return first
+
+def build_master_dataset_chunked(out_dir=PARTS_DIR, memory_limit_mb=MEMORY_LIMIT_MB, start=None, end=None,
+                                 f_scores=None, sector_map=None):
+    """
+    Same rows as build_master_dataset, built window by window under a memory ceiling.
+    Each window reads WARMUP_BARS extra bars before it (rolling windows) and one after
+    it (the next-bar target), keeps only its own bars and writes part-NNNNN.parquet.
+    Returns the part paths in time order.
+    """
+    times, symbols = _time_axis(start, end)
+    if len(times) == 0:
+        return []
+    if f_scores is None:
+        f_scores = load_fundamental_scores()
+    stocks = [s for s in symbols if s != '^NSEI']
+
+    budget = memory_limit_mb * 1024 * 1024
+    window = max(WARMUP_BARS * 2, budget // (len(symbols) * BYTES_PER_CELL) - WARMUP_BARS - 1)
+    n_windows = -(-len(times) // window)
+    print(f"🧱 Chunked build: {len(times)} bars x {len(symbols)} symbols -> {n_windows} windows of {window} bars "
+          f"(ceiling {memory_limit_mb} MB)")
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    parts = []
+    for k, lo in enumerate(range(0, len(times), window)):
+        hi = min(lo + window, len(times))
+        read_from = times[max(0, lo - WARMUP_BARS)]
+        read_until = times[hi] if hi < len(times) else None
+        panel = fetch_panel(fields=('close', 'volume'), start=read_from,
+                            end=read_until + pd.Timedelta(seconds=1) if read_until is not None else None)
+        dataset = build_master_dataset(panel=panel, f_scores=f_scores, sector_map=sector_map)
+        own = dataset[(dataset.index >= times[lo]) & (dataset.index <= times[hi - 1])]
+        path = os.path.join(out_dir, f"part-{k:05d}.parquet")
+        compact_features(own, stocks).to_parquet(path)
+        parts.append(path)
+        del panel, dataset, own
+        print(f"   📦 [{k+1}/{n_windows}] {times[lo]:%Y-%m-%d} -> {times[hi - 1]:%Y-%m-%d} spilled", end="\r")
+    print(f"\n✅ {len(parts)} feature parts written to {out_dir}/")
+    return parts
@@ -0,0 +1,241 @@
+import os
+import json
+import shutil
+import sys
+import warnings
+from datetime import timedelta
+
+import pandas as pd
+
+from feature_engineering import build_master_dataset, build_master_dataset_chunked, compact_features, fetch_panel, first_bars
+
+warnings.filterwarnings("ignore")
+
+# --- CONFIG ---
+# Computed feature rows, one Parquet file per month:
+#   feature_store/v<FEATURE_SET_VERSION>/month=YYYY-MM/part.parquet + manifest.json
+# Bump FEATURE_SET_VERSION whenever a feature's definition changes; the next
+# run then rebuilds into a fresh directory and the old version stays readable.
+STORE_DIR = os.environ.get("ORACLE_FEATURE_DIR", "feature_store")
+FEATURE_SET_VERSION = 2   # v2: float32 features, int8 score/target
+
+# Longest look-back in build_master_dataset is 20 bars (BB width, volume ratio;
+# RSI needs 15). Warm up with a margin, read from this many days before the mark.
+WARMUP_BARS = 30
+WARMUP_DAYS = 14
+
+def _version_dir(version=FEATURE_SET_VERSION):
+    return os.path.join(STORE_DIR, f"v{version}")
+
+def _month_path(month):
+    return os.path.join(_version_dir(), f"month={month}", "part.parquet")
+
+def load_manifest():
+    try:
+        with open(os.path.join(_version_dir(), "manifest.json"), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def _save_manifest(manifest):
+    path = os.path.join(_version_dir(), "manifest.json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, path)
+
+def _write_month(month, rows, replace_from=None, symbols=None):
+    """
+    Merges `rows` into one month's file. Stored rows at/after `replace_from` are
+    superseded; with `symbols`, only those symbols' stored rows are.
+    """
+    path = _month_path(month)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    if (replace_from is not None or symbols is not None) and os.path.exists(path):
+        stored = pd.read_parquet(path)
+        superseded = pd.Series(True, index=stored.index)
+        if replace_from is not None:
+            superseded &= stored['time'] >= replace_from
+        if symbols is not None:
+            superseded &= stored['symbol'].isin(symbols)
+        rows = pd.concat([stored[~superseded], rows], ignore_index=True)
+    rows = rows.sort_values(['symbol', 'time'], kind='stable')
+    tmp = f"{path}.{os.getpid()}.tmp"
+    rows.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+def _to_rows(dataset):
+    rows = compact_features(dataset).reset_index()
+    # Plain strings on disk: each month would otherwise carry its own category set
+    rows['symbol'] = rows['symbol'].astype(str)
+    return rows
+
+def _write(dataset, replace_from=None):
+    rows = _to_rows(dataset)
+    months = rows['time'].dt.strftime('%Y-%m')
+    for month, chunk in rows.groupby(months):
+        _write_month(month, chunk, replace_from)
+    return len(rows)
+
+def _warm_panel(high_water):
+    """Bars from WARMUP_BARS before the high-water mark onwards (widens over long holidays)."""
+    days = WARMUP_DAYS
+    for _ in range(4):
+        panel = fetch_panel(fields=('close', 'volume'), start=high_water - timedelta(days=days))
+        if (panel.times < high_water).sum() >= WARMUP_BARS:
+            return panel
+        days *= 2
+    return panel
+
+def _store_parts(parts, symbols=None):
+    """
+    Merges spilled parts (time order) into their month files, deleting each part
+    as it goes. With `symbols`, only those symbols' rows are kept and replaced.
+    Returns (rows stored, newest row time).
+    """
+    rows, high_water = 0, None
+    for path in parts:
+        part = pd.read_parquet(path).reset_index()
+        os.remove(path)
+        part['symbol'] = part['symbol'].astype(str)
+        if symbols is not None:
+            part = part[part['symbol'].isin(symbols)]
+        if part.empty:
+            continue
+        # Windows are in time order: a month split across two parts keeps the earlier rows
+        first = part['time'].min()
+        for month, chunk in part.groupby(part['time'].dt.strftime('%Y-%m')):
+            _write_month(month, chunk, replace_from=first, symbols=symbols)
+        rows += len(part)
+        high_water = part['time'].max()
+        del part
+    return rows, high_water
+
+def rebuild():
+    """
+    Rebuilds from full history window by window (build_master_dataset_chunked under
+    MEMORY_LIMIT_MB): each spilled part is merged into its month files and deleted,
+    so neither the whole table nor all the parts are ever held at once.
+    """
+    print(f"🏗️  Rebuilding feature store v{FEATURE_SET_VERSION} from full history...")
+    target = _version_dir()
+    if os.path.isdir(target):
+        for month_dir in os.listdir(target):
+            path = os.path.join(target, month_dir, "part.parquet")
+            if os.path.exists(path): os.remove(path)
+    parts_dir = os.path.join(target, "_parts")
+    rows, high_water = _store_parts(build_master_dataset_chunked(out_dir=parts_dir))
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    if not rows:
+        return 0
+    _save_manifest({
+        'version': FEATURE_SET_VERSION,
+        'high_water': high_water.isoformat(),
+        # Every symbol with bars, feature rows or not (a listing still warming up is not "new" next time)
+        'symbols': sorted(s for s in first_bars() if s != '^NSEI'),
+    })
+    print(f"✅ {rows} feature rows stored.")
+    return rows
+
+def backfill(symbols, high_water):
+    """
+    History before the high-water mark for newly listed symbols only, built window
+    by window from their first bar. Stored rows of other symbols are left alone
+    (their Sector_Rel_Strength over the new listing's history is not recomputed).
+    """
+    first = first_bars(symbols)
+    if not first:
+        return 0
+    start = min(first.values()) - timedelta(days=WARMUP_DAYS)
+    parts_dir = os.path.join(_version_dir(), "_parts")
+    parts = build_master_dataset_chunked(out_dir=parts_dir, start=start, end=high_water)
+    rows, _ = _store_parts(parts, symbols=set(symbols))
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    return rows
+
+def update_feature_store(full=False):
+    """
+    Computes only the bars after the stored high-water mark, warming up the
+    rolling windows from the stored tail. The row AT the mark is recomputed too:
+    its target (next bar beats Nifty) could not be known when it was written.
+    """
+    manifest = load_manifest()
+    if full or manifest is None or manifest.get('version') != FEATURE_SET_VERSION:
+        return rebuild()
+
+    high_water = pd.Timestamp(manifest['high_water'])
+    panel = _warm_panel(high_water)
+    stocks = {s for s in panel.symbols if s != '^NSEI'}
+    new_symbols = stocks - set(manifest['symbols'])
+    if new_symbols:
+        # A new listing arrives with a two-year backfill that predates the mark
+        print(f"   🆕 {len(new_symbols)} new symbols (e.g. {sorted(new_symbols)[0]}); backfilling their history...")
+        rows = backfill(sorted(new_symbols), high_water)
+        manifest['symbols'] = sorted(set(manifest['symbols']) | stocks)
+        _save_manifest(manifest)
+        print(f"   ✅ {rows} backfilled rows.")
+
+    dataset = build_master_dataset(panel=panel)
+    fresh = dataset[dataset.index >= high_water]
+    if fresh.empty:
+        print("✅ Feature store up to date.")
+        return 0
+
+    rows = _write(fresh, replace_from=high_water)
+    manifest['high_water'] = fresh.index.max().isoformat()
+    _save_manifest(manifest)
+    print(f"✅ {rows} feature rows computed since {high_water:%Y-%m-%d %H:%M} (warm-up {len(panel.times)} bars).")
+    return rows
+
+def _utc(ts):
+    ts = pd.Timestamp(ts)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+
+def month_files():
+    """Stored month files, oldest first (for out-of-core readers)."""
+    root = _version_dir()
+    if not os.path.isdir(root):
+        return []
+    months = sorted(d.split("=", 1)[1] for d in os.listdir(root) if d.startswith("month="))
+    return [_month_path(m) for m in months if os.path.exists(_month_path(m))]
+
+def load_features(start=None, end=None):
+    """
+    Stored feature rows in [start, end), in build_master_dataset's layout:
+    time index, categorical symbol, grouped symbol by symbol.
+    """
+    root = _version_dir()
+    if not os.path.isdir(root):
+        return pd.DataFrame()
+    start = _utc(start) if start is not None else None
+    end = _utc(end) if end is not None else None
+    months = sorted(d.split("=", 1)[1] for d in os.listdir(root) if d.startswith("month="))
+    # Only touch the months that overlap the window
+    if start is not None:
+        months = [m for m in months if m >= start.strftime('%Y-%m')]
+    if end is not None:
+        months = [m for m in months if m <= end.strftime('%Y-%m')]
+    frames = [pd.read_parquet(_month_path(m)) for m in months if os.path.exists(_month_path(m))]
+    if not frames:
+        return pd.DataFrame()
+
+    rows = pd.concat(frames, ignore_index=True)
+    if start is not None: rows = rows[rows['time'] >= start]
+    if end is not None: rows = rows[rows['time'] < end]
+    rows['symbol'] = pd.Categorical(rows['symbol'], categories=sorted(rows['symbol'].unique()))
+    rows = rows.sort_values(['symbol', 'time'], kind='stable')
+    return rows.set_index('time')
+
+def latest_features():
+    """Newest stored row per symbol (inference input) without reading the whole history."""
+    manifest = load_manifest()
+    if manifest is None:
+        return pd.DataFrame()
+    high_water = pd.Timestamp(manifest['high_water'])
+    rows = load_features(start=high_water - timedelta(days=WARMUP_DAYS))
+    if rows.empty:
+        return rows
+    return rows.groupby('symbol', observed=True).tail(1)
+
+if __name__ == "__main__":
+    update_feature_store(full="--rebuild" in sys.argv)
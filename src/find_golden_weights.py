@@ -1,7 +1,9 @@
-import yfinance as yf
 import pandas as pd
 import numpy as np
 from sector_map import SECTOR_MAP
+from market_data import get_prices
+from indicators import SMA, batch
+from scoring import composite_scores, top_k_mean
 import itertools
 import warnings
 
@@ -15,29 +17,22 @@ TEST_START = "2024-01-01"
 TEST_END = "2024-12-31"
 
 def get_data_and_regime():
-    print("⏳ Downloading Universe Data (w/ history buffer)...")
+    print("⏳ Loading Universe Data (w/ history buffer)...")
     tickers = list(SECTOR_MAP.keys()) + ["^NSEI"]
     
-    # Chunked download to prevent errors
-    chunk_size = 50
-    all_data = []
-    for i in range(0, len(tickers), chunk_size):
-        chunk = tickers[i:i+chunk_size]
-        try:
-            df = yf.download(chunk, start=DOWNLOAD_START, end=TEST_END, interval="1d", progress=False, auto_adjust=True, threads=False)['Close']
-            if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
-            all_data.append(df)
-            print(f"   Batch {i//chunk_size + 1} downloaded...", end="\r")
-        except: continue
+    # Shared provider handles chunking + caching
+    data = get_prices(tickers, start=DOWNLOAD_START, end=TEST_END, interval="1d")
     
     print("\n   Processing Data...")
-    if not all_data: return None, None, None
-    data = pd.concat(all_data, axis=1)
-    
+    if data.empty or '^NSEI' not in data.columns: return None, None, None
+    return build_factors(data)
+
+def build_factors(data, test_start=TEST_START):
+    """Regime + per-ticker factor frames from a (date x symbol) close matrix that includes ^NSEI."""
     # Calculate Regime (Bull/Bear)
     # We use data from 2023 to calc SMA, but valid_regime starts later
     nifty = data['^NSEI'].copy()
-    sma_200 = nifty.rolling(200).mean()
+    sma_200 = batch(SMA, nifty, window=200)
     
     # 1 = Bull, 0 = Bear. (NaN if not enough data)
     regime_mask = np.where(nifty > sma_200, 'BULL', 'BEAR')
@@ -45,12 +40,12 @@ def get_data_and_regime():
     
     # Mask out the warmup period (2023)
     # We only want to optimize on 2024 data
-    regime_df = regime_df.loc[TEST_START:] 
+    regime_df = regime_df.loc[test_start:] 
     
     print("📊 Calculating Factors...")
     factors = {}
     
-    for ticker in tickers:
+    for ticker in data.columns:
         if ticker == "^NSEI": continue
         try:
             series = data[ticker]
@@ -73,17 +68,29 @@ def get_data_and_regime():
                 'Safety': safety,
                 'Value': val_score
             })
-            factors[ticker] = df_f.loc[TEST_START:]
+            factors[ticker] = df_f.loc[test_start:]
             
         except: continue
         
     # Trim prices to Test Period too
-    prices = data.loc[TEST_START:]
+    prices = data.loc[test_start:]
         
     return prices, regime_df, factors
 
-def backtest_weights(weights, factors, prices, regime_series, target_regime):
-    w_mom, w_safe, w_val = weights
+def _factor_cube(factors, index):
+    """(date x ticker x [Momentum, Safety, Value]) array, one ticker per column."""
+    return np.stack([factors[t].reindex(index)[['Momentum', 'Safety', 'Value']].to_numpy(dtype=np.float64)
+                     for t in factors], axis=1)
+
+def backtest_weight_matrix(weights, factors, prices, regime_series, target_regime, top_n=10, horizon=20):
+    """
+    Every weight vector in one pass: each month-end, all candidate weightings are
+    scored with a single (ticker x factor) @ (factor x weighting) product, and each
+    one's top 10 is held for 20 trading days.
+    Returns the mean period return per weight vector (-999 = no dates for this regime).
+    """
+    # Safety is on a ~10x larger scale than the other two factors
+    weights = np.atleast_2d(np.asarray(weights, dtype=np.float64)) * [1.0, 0.1, 1.0]
     
     # Filter dates where Regime matches Target (e.g., only check BULL days)
     valid_dates = regime_series[regime_series['Regime'] == target_regime].index
@@ -91,41 +98,32 @@ def backtest_weights(weights, factors, prices, regime_series, target_regime):
     # Rebalance Monthly
     monthly_dates = [d for d in valid_dates if d.is_month_end]
     
-    if not monthly_dates: return -999 # No days found for this regime
+    if not monthly_dates: return np.full(len(weights), -999.0) # No days found for this regime
 
+    tickers = list(factors)
+    cube = _factor_cube(factors, prices.index)
+    closes = prices.reindex(columns=tickers).to_numpy(dtype=np.float64)
     returns = []
     
     for date in monthly_dates:
-        daily_scores = {}
-        for ticker, df_feat in factors.items():
-            if date not in df_feat.index: continue
-            row = df_feat.loc[date]
-            
-            # Normalize inputs roughly so weights matter
-            # (Simple Z-score like normalization logic is implicit here for speed)
-            score = (row['Momentum'] * w_mom) + (row['Safety'] * w_safe * 0.1) + (row['Value'] * w_val)
-            
-            if not np.isnan(score):
-                daily_scores[ticker] = score
-        
-        if not daily_scores: continue
+        pos = prices.index.get_loc(date)
+        # A NaN factor voids the ticker under every weighting
+        ok = ~np.isnan(cube[pos]).any(axis=1)
+        if not ok.any(): continue
         
-        # Pick Top 10
-        top_picks = sorted(daily_scores, key=daily_scores.get, reverse=True)[:10]
+        # Look forward 20 trading days
+        if pos + horizon >= len(prices): continue
+        with np.errstate(invalid='ignore', divide='ignore'):
+            period_ret = (closes[pos + horizon] - closes[pos]) / closes[pos]
         
-        try:
-            current_price = prices.loc[date, top_picks]
-            # Look forward 20 trading days
-            future_idx = prices.index.get_loc(date) + 20
-            if future_idx < len(prices):
-                future_date = prices.index[future_idx]
-                future_price = prices.loc[future_date, top_picks]
-                
-                period_ret = (future_price - current_price) / current_price
-                returns.append(period_ret.mean())
-        except: pass
+        scores = composite_scores(cube[pos][ok], weights)
+        returns.append(top_k_mean(scores, period_ret[ok], k=top_n))
         
-    return np.mean(returns) if returns else -999
+    return np.mean(returns, axis=0) if returns else np.full(len(weights), -999.0)
+
+def backtest_weights(weights, factors, prices, regime_series, target_regime):
+    """Single weighting (mom, safe, val) -> mean period return."""
+    return float(backtest_weight_matrix([weights], factors, prices, regime_series, target_regime)[0])
 
 def optimize():
     prices, regime, factors = get_data_and_regime()
@@ -142,8 +140,8 @@ def optimize():
     best_bull_ret = -999
     best_bull_w = (0.5, 0.0, 0.5) # Default fallback
     
-    for w in combinations:
-        ret = backtest_weights(w, factors, prices, regime, "BULL")
+    bull_returns = backtest_weight_matrix(combinations, factors, prices, regime, "BULL")
+    for w, ret in zip(combinations, bull_returns):
         if ret > best_bull_ret and ret != -999:
             best_bull_ret = ret
             best_bull_w = w
@@ -154,8 +152,8 @@ def optimize():
     best_bear_ret = -999
     best_bear_w = (0.0, 1.0, 0.0) # Default fallback
     
-    for w in combinations:
-        ret = backtest_weights(w, factors, prices, regime, "BEAR")
+    bear_returns = backtest_weight_matrix(combinations, factors, prices, regime, "BEAR")
+    for w, ret in zip(combinations, bear_returns):
         if ret > best_bear_ret and ret != -999:
             best_bear_ret = ret
             best_bear_w = w
@@ -1,4 +1,4 @@
-import yfinance as yf
+import yahoo_client as yf
 import pandas as pd
 import time
 from sector_map import SECTOR_MAP # We use this just to get the list of tickers
@@ -0,0 +1,239 @@
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from feature_engineering import FEATURE_COLUMNS
+from feature_store import update_feature_store, load_features
+from train_model import BOOSTER_PARAMS, evaluate
+from walk_forward import PURGE_BARS, EMBARGO_BARS, time_folds, to_arrays
+
+warnings.filterwarnings("ignore")
+
+# --- CONFIG ---
+# Search space: (kind, low, high). 'log' samples uniformly in log space.
+PARAM_SPACE = {
+    'eta': ('log', 0.01, 0.3),
+    'max_depth': ('int', 2, 8),
+    'min_child_weight': ('log', 1.0, 100.0),
+    'subsample': ('uniform', 0.5, 1.0),
+    'colsample_bytree': ('uniform', 0.5, 1.0),
+    'lambda': ('log', 0.1, 10.0),
+    'gamma': ('uniform', 0.0, 5.0),
+}
+STRATEGY = "halving"        # "halving" (successive halving) or "random"
+N_TRIALS = 64               # Configurations sampled (the first rung, for halving)
+MIN_ROUNDS = 100            # Halving: tree budget of the first rung...
+HALVING_FACTOR = 3          # ...x3 per rung for the best third
+MAX_ROUNDS = 1000           # Random search budget / halving cap
+EARLY_STOPPING_ROUNDS = 50
+N_FOLDS = 3                 # Expanding walk-forward folds (purged, see walk_forward.py)
+# Early stopping watches the newest VALID_FRACTION of each training window, cut off
+# from the rows it fits on by the same purge + embargo gap as the test window.
+# The test window itself is only ever scored.
+VALID_FRACTION = 0.15
+SEED = 42
+
+# Each trial trains with a fixed thread count; the pool runs cores / threads of
+# them at once (32 cores -> 8 trials x 4 threads).
+THREADS_PER_TRIAL = 4
+WORKERS = max(1, (os.cpu_count() or 1) // THREADS_PER_TRIAL)
+
+# Objective (lower is better): pooled out-of-sample logloss, minus a bonus for the
+# win rate of the trades above OBJECTIVE_THRESHOLD (the sniper-scope number).
+OBJECTIVE_THRESHOLD = 0.53
+WIN_RATE_WEIGHT = 0.5
+
+# Every finished trial is appended here, so an interrupted search resumes where it stopped
+SEARCH_DIR = "search_results"
+LEADERBOARD = os.path.join(SEARCH_DIR, "leaderboard.jsonl")
+
+def sample_params(trial, seed=SEED):
+    """Trial k always gets the same configuration (resumable, reproducible)."""
+    rng = np.random.default_rng([seed, trial])
+    params = {}
+    for name, (kind, low, high) in PARAM_SPACE.items():
+        if kind == 'int':
+            params[name] = int(rng.integers(low, high + 1))
+        elif kind == 'log':
+            params[name] = float(np.exp(rng.uniform(np.log(low), np.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+def trial_id(params, rounds, data_key):
+    raw = json.dumps({'params': params, 'rounds': rounds, 'data': data_key}, sort_keys=True)
+    return hashlib.sha1(raw.encode()).hexdigest()[:12]
+
+def objective(logloss, win_rate):
+    # Too few trades above the threshold counts as a coin flip
+    return logloss - WIN_RATE_WEIGHT * (win_rate if win_rate is not None else 0.5)
+
+def validation_splits(folds, valid_fraction=VALID_FRACTION, purge=PURGE_BARS, embargo=EMBARGO_BARS):
+    """[(fit, valid, test)] bar-position ranges (end exclusive) from walk-forward folds."""
+    splits = []
+    for train_start, train_end, test_start, test_end in folds:
+        valid_start = train_end - max(1, int((train_end - train_start) * valid_fraction))
+        fit_end = valid_start - purge - embargo
+        if fit_end <= train_start:
+            continue
+        splits.append(((train_start, fit_end), (valid_start, train_end), (test_start, test_end)))
+    return splits
+
+# --- WORKERS ---
+# Each worker process builds its fold matrices once and reuses them for every trial
+_windows = None
+
+def _init_worker(cache_dir, splits):
+    global _windows
+    X, y, position = (np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode='r') for name in ('X', 'y', 'position'))
+    _windows = []
+    for (fit_start, fit_end), (valid_start, valid_end), (test_start, test_end) in splits:
+        fit = (position >= fit_start) & (position < fit_end)
+        valid = (position >= valid_start) & (position < valid_end)
+        test = (position >= test_start) & (position < test_end)
+        dtrain = xgb.QuantileDMatrix(X[fit], label=y[fit], feature_names=FEATURE_COLUMNS, nthread=THREADS_PER_TRIAL)
+        _windows.append({
+            'dtrain': dtrain,
+            'dvalid': xgb.QuantileDMatrix(X[valid], label=y[valid], feature_names=FEATURE_COLUMNS,
+                                          ref=dtrain, nthread=THREADS_PER_TRIAL),
+            'X_test': np.ascontiguousarray(X[test]),
+            'y_test': np.asarray(y[test]),
+        })
+
+def run_trial(params, rounds):
+    """All folds for one configuration: early-stopped on validation, scored on test."""
+    t0 = time.perf_counter()
+    train_params = dict(BOOSTER_PARAMS, **params, nthread=THREADS_PER_TRIAL)
+    confidence, actual, trees = [], [], []
+    for window in _windows:
+        booster = xgb.train(train_params, window['dtrain'], num_boost_round=rounds,
+                            evals=[(window['dvalid'], 'valid')], early_stopping_rounds=EARLY_STOPPING_ROUNDS,
+                            verbose_eval=False)
+        best = booster.best_iteration + 1
+        confidence.append(booster.inplace_predict(window['X_test'], iteration_range=(0, best)))
+        actual.append(window['y_test'])
+        trees.append(best)
+    metrics = evaluate(np.concatenate(confidence), np.concatenate(actual))
+    win_rate = metrics['sniper'][f"{OBJECTIVE_THRESHOLD:.2f}"]['win_rate']
+    return {
+        'params': params,
+        'rounds': rounds,
+        'trees': int(np.mean(trees)),
+        'logloss': metrics['logloss'],
+        'accuracy': metrics['accuracy'],
+        'win_rate': win_rate,
+        'trades': metrics['sniper'][f"{OBJECTIVE_THRESHOLD:.2f}"]['trades'],
+        'objective': objective(metrics['logloss'], win_rate),
+        'seconds': round(time.perf_counter() - t0, 2),
+    }
+
+# --- LEADERBOARD ---
+def load_leaderboard(path=LEADERBOARD):
+    board = {}
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    board[record['id']] = record
+                except (ValueError, KeyError):
+                    continue   # a line cut short by an interrupted run
+    return board
+
+def _append(record, path=LEADERBOARD):
+    with open(path, "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+def _run_rung(executor, configs, rounds, board, data_key):
+    """Runs the configs not already on the leaderboard; returns every config's record."""
+    ids = [trial_id(p, rounds, data_key) for p in configs]
+    todo = [(i, p) for i, p in zip(ids, configs) if i not in board]
+    print(f"🎲 {len(configs)} configs x {rounds} rounds ({len(configs) - len(todo)} already on the leaderboard)")
+    futures = {executor.submit(run_trial, p, rounds): i for i, p in todo}
+    for done, future in enumerate(as_completed(futures)):
+        try:
+            record = future.result()
+        except Exception as e:
+            print(f"\n   ⚠️ Trial {futures[future]} failed: {e}")
+            continue
+        record['id'] = futures[future]
+        record['data'] = data_key
+        board[record['id']] = record
+        _append(record)
+        print(f"   [{done+1}/{len(todo)}] logloss {record['logloss']:.4f} | "
+              f"win@{OBJECTIVE_THRESHOLD:.2f} {record['win_rate'] or 0:.2%} | {record['seconds']:.0f}s    ",
+              end="\r", flush=True)
+    if todo:
+        print()
+    return [board[i] for i in ids if i in board]
+
+def search(strategy=STRATEGY, n_trials=N_TRIALS, workers=WORKERS):
+    # 1. Data: one float32 copy on disk, memory-mapped by every worker
+    update_feature_store()
+    df = load_features()
+    if df.empty:
+        print("❌ Dataset empty. Check database or ingestion.")
+        return pd.DataFrame()
+    times = df.index.unique().sort_values()
+    splits = validation_splits(time_folds(times, n_folds=N_FOLDS, mode="expanding"))
+    if not splits:
+        print(f"❌ Not enough history for {N_FOLDS} folds ({len(times)} bars).")
+        return pd.DataFrame()
+
+    cache_dir = os.path.join(SEARCH_DIR, "cache")
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, array in zip(('X', 'y', 'position'), to_arrays(df, times)):
+        np.save(os.path.join(cache_dir, f"{name}.npy"), array)
+    data_key = f"{len(df)}:{times[-1].isoformat()}"
+    del df
+
+    board = load_leaderboard()
+    print(f"🔍 {strategy} search, {n_trials} configs, {len(splits)} folds, "
+          f"{workers} workers x {THREADS_PER_TRIAL} threads (leaderboard: {len(board)} trials)")
+
+    # 2. Trials (spawned workers: no OpenMP state inherited through fork)
+    configs = [sample_params(k) for k in range(n_trials)]
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                             initializer=_init_worker, initargs=(cache_dir, splits)) as executor:
+        if strategy == "random":
+            _run_rung(executor, configs, MAX_ROUNDS, board, data_key)
+        else:
+            rounds = MIN_ROUNDS
+            while True:
+                records = _run_rung(executor, configs, rounds, board, data_key)
+                if rounds >= MAX_ROUNDS or len(records) <= 1:
+                    break
+                keep = max(1, len(records) // HALVING_FACTOR)
+                configs = [r['params'] for r in sorted(records, key=lambda r: r['objective'])[:keep]]
+                rounds = min(MAX_ROUNDS, rounds * HALVING_FACTOR)
+
+    # 3. Results for this dataset
+    results = pd.DataFrame([r for r in board.values() if r.get('data') == data_key])
+    if results.empty:
+        print("❌ No trial finished.")
+        return results
+    results = results.sort_values('objective').reset_index(drop=True)
+    print(f"\n🏆 LEADERBOARD ({len(results)} trials, {time.perf_counter() - t0:.0f}s)")
+    print(results[['objective', 'logloss', 'win_rate', 'trades', 'rounds', 'trees']].head(10).to_string())
+
+    best = dict(results.loc[0, 'params'], num_boost_round=int(results.loc[0, 'trees']))
+    with open(os.path.join(SEARCH_DIR, "best_params.json"), "w") as f:
+        json.dump(best, f, indent=2)
+    print(f"\n✅ Best params (saved to {SEARCH_DIR}/best_params.json):")
+    print(json.dumps(best, indent=2))
+    return results
+
+if __name__ == "__main__":
+    strategy = "random" if "--random" in sys.argv else STRATEGY
+    n_trials = int(sys.argv[sys.argv.index("--trials") + 1]) if "--trials" in sys.argv else N_TRIALS
+    search(strategy, n_trials)
@@ -0,0 +1,245 @@
+import numpy as np
+import pandas as pd
+
+# --- STREAMING INDICATORS ---
+# Every indicator holds a compact per-symbol state (a ring buffer of the last
+# `window` inputs + running sums) and advances one bar in O(1) with update().
+# Batch mode (run_batch) is nothing but update() looped over history, so a live
+# feed and a historical rebuild produce bit-identical values.
+# NaN rules follow pandas rolling(window) with min_periods=window.
+
+class _Window:
+    """Ring buffer over the last `size` bars for n symbols, with running sum / sum of squares."""
+    def __init__(self, size, n):
+        self.size = size
+        self.values = np.zeros((size, n))
+        self.valid = np.zeros((size, n), dtype=bool)
+        self.head = 0
+        self.filled = 0
+        self.total = np.zeros(n)
+        self.total_sq = np.zeros(n)
+        self.count = np.zeros(n, dtype=np.int64)
+
+    def push(self, x):
+        ok = ~np.isnan(x)
+        clean = np.where(ok, x, 0.0)
+        old, old_ok = self.values[self.head], self.valid[self.head]
+        self.total += clean - old
+        self.total_sq += clean * clean - old * old
+        self.count += ok.astype(np.int64) - old_ok.astype(np.int64)
+        self.values[self.head] = clean
+        self.valid[self.head] = ok
+        self.head = (self.head + 1) % self.size
+        self.filled = min(self.filled + 1, self.size)
+        if self.head == 0:
+            # Re-sum once per lap: running sums never drift, cost stays O(1) amortised
+            self.total = self.values.sum(axis=0)
+            self.total_sq = (self.values * self.values).sum(axis=0)
+
+    def oldest(self):
+        """Value that is `size - 1` bars old (NaN until the buffer is full)."""
+        if self.filled < self.size:
+            return np.full(self.values.shape[1], np.nan)
+        return np.where(self.valid[self.head], self.values[self.head], np.nan)
+
+    def full(self):
+        return self.count == self.size
+
+    def mean(self):
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(self.full(), self.total / self.size, np.nan)
+
+    def std(self):
+        """Sample std (ddof=1), like pandas."""
+        n = self.size
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self.total_sq - self.total * self.total / n) / (n - 1)
+        return np.where(self.full(), np.sqrt(np.maximum(var, 0.0)), np.nan)
+
+    def state(self):
+        return {k: getattr(self, k) for k in ('size', 'values', 'valid', 'head', 'filled', 'total', 'total_sq', 'count')}
+
+    @classmethod
+    def restore(cls, state):
+        window = cls.__new__(cls)
+        for k, v in state.items():
+            setattr(window, k, v.copy() if isinstance(v, np.ndarray) else v)
+        return window
+
+class Indicator:
+    """Base class: update(x) -> value per symbol; state()/load() for checkpoints."""
+    def __init__(self, n_symbols=1):
+        self.n = n_symbols
+
+    def state(self):
+        """Plain dict of arrays / numbers (picklable checkpoint)."""
+        return {k: ('window', v.state()) if isinstance(v, _Window) else ('value', v.copy() if isinstance(v, np.ndarray) else v)
+                for k, v in vars(self).items()}
+
+    @classmethod
+    def restore(cls, state):
+        indicator = cls.__new__(cls)
+        for k, (kind, v) in state.items():
+            if kind == 'window':
+                v = _Window.restore(v)
+            elif isinstance(v, np.ndarray):
+                v = v.copy()
+            setattr(indicator, k, v)
+        return indicator
+
+    def _prepare(self, x):
+        return np.broadcast_to(np.asarray(x, dtype=np.float64), (self.n,)).copy()
+
+class SMA(Indicator):
+    def __init__(self, n_symbols=1, window=200):
+        super().__init__(n_symbols)
+        self.window = _Window(window, n_symbols)
+
+    def update(self, x):
+        self.window.push(self._prepare(x))
+        return self.window.mean()
+
+class RSI(Indicator):
+    """Simple-average RSI (rolling mean of gains / losses), as calculate_rsi always was."""
+    def __init__(self, n_symbols=1, period=14):
+        super().__init__(n_symbols)
+        self.gains = _Window(period, n_symbols)
+        self.losses = _Window(period, n_symbols)
+        self.prev = np.full(n_symbols, np.nan)
+
+    def update(self, x):
+        x = self._prepare(x)
+        delta = x - self.prev
+        self.prev = x
+        # A missing delta counts as "no move" (pandas .where(delta > 0, 0) semantics)
+        with np.errstate(invalid='ignore'):
+            self.gains.push(np.where(delta > 0, delta, 0.0))
+            self.losses.push(np.where(delta < 0, -delta, 0.0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            rs = self.gains.mean() / self.losses.mean()
+            return 100 - (100 / (1 + rs))
+
+class BollingerWidth(Indicator):
+    def __init__(self, n_symbols=1, window=20, num_std=2):
+        super().__init__(n_symbols)
+        self.window = _Window(window, n_symbols)
+        self.num_std = num_std
+
+    def update(self, x):
+        self.window.push(self._prepare(x))
+        mean, std = self.window.mean(), self.window.std()
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return ((mean + std * self.num_std) - (mean - std * self.num_std)) / mean
+
+class VolumeRatio(Indicator):
+    """Current volume / rolling mean volume (current bar included)."""
+    def __init__(self, n_symbols=1, window=20):
+        super().__init__(n_symbols)
+        self.window = _Window(window, n_symbols)
+
+    def update(self, volume):
+        volume = self._prepare(volume)
+        self.window.push(volume)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return volume / self.window.mean()
+
+class Momentum(Indicator):
+    """x / x[period bars ago] - 1 (pct_change(period))."""
+    def __init__(self, n_symbols=1, period=126):
+        super().__init__(n_symbols)
+        self.window = _Window(period + 1, n_symbols)
+
+    def update(self, x):
+        x = self._prepare(x)
+        self.window.push(x)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return x / self.window.oldest() - 1
+
+class DownsideDeviation(Indicator):
+    """
+    Sample std of the negative returns among the last `window` returns.
+    Fewer than `min_negatives` down bars -> `fallback`; no return yet -> NaN.
+    """
+    def __init__(self, n_symbols=1, window=252, min_negatives=2, fallback=0.02):
+        super().__init__(n_symbols)
+        self.returns = _Window(window, n_symbols)     # every return (for the lap/eviction)
+        self.negatives = _Window(window, n_symbols)   # negative returns only, NaN elsewhere
+        self.prev = np.full(n_symbols, np.nan)
+        self.min_negatives = min_negatives
+        self.fallback = fallback
+
+    def update(self, x):
+        x = self._prepare(x)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            ret = x / self.prev - 1
+        self.prev = x
+        self.returns.push(ret)
+        with np.errstate(invalid='ignore'):
+            self.negatives.push(np.where(ret < 0, ret, np.nan))
+        k = self.negatives.count
+        with np.errstate(invalid='ignore', divide='ignore'):
+            var = (self.negatives.total_sq - self.negatives.total ** 2 / k) / (k - 1)
+        out = np.where(k >= self.min_negatives, np.sqrt(np.maximum(var, 0.0)), self.fallback)
+        return np.where(self.returns.count > 0, out, np.nan)
+
+# --- BATCH MODE ---
+def run_batch(indicator, values):
+    """
+    Feeds a history through indicator.update() bar by bar (vectorised across symbols).
+    values: Series (one symbol), DataFrame (time x symbol) or 2-D array. Returns the same shape.
+    The indicator keeps its final state, so a live feed can continue from it.
+    """
+    if isinstance(values, pd.Series):
+        out = run_batch(indicator, values.to_numpy(dtype=np.float64)[:, None])
+        return pd.Series(out[:, 0], index=values.index, name=values.name)
+    if isinstance(values, pd.DataFrame):
+        out = run_batch(indicator, values.to_numpy(dtype=np.float64))
+        return pd.DataFrame(out, index=values.index, columns=values.columns)
+    values = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(values)
+    for t in range(len(values)):
+        out[t] = indicator.update(values[t])
+    return out
+
+def batch(cls, values, **params):
+    """One-shot batch: a fresh `cls` sized to `values`, run over all of it."""
+    if isinstance(values, pd.Series):
+        return run_batch(cls(1, **params), values)
+    if not isinstance(values, pd.DataFrame) and np.ndim(values) == 1:
+        return run_batch(cls(1, **params), np.asarray(values, dtype=np.float64)[:, None])[:, 0]
+    return run_batch(cls(np.shape(values)[1], **params), values)
+
+# --- CHECKPOINTS ---
+class IndicatorSet:
+    """Named indicators over one fixed symbol list, checkpointable as a single file."""
+    def __init__(self, symbols, **indicators):
+        self.symbols = list(symbols)
+        self.indicators = indicators
+        self.last_time = None
+
+    def update(self, time, **inputs):
+        """inputs: indicator name -> value per symbol (array or Series indexed by symbol)."""
+        out = {}
+        for name, indicator in self.indicators.items():
+            x = inputs[name]
+            if isinstance(x, pd.Series):
+                x = x.reindex(self.symbols).to_numpy(dtype=np.float64)
+            out[name] = pd.Series(indicator.update(x), index=self.symbols)
+        self.last_time = time
+        return out
+
+    def save(self, path):
+        pd.to_pickle({
+            'symbols': self.symbols,
+            'last_time': self.last_time,
+            'indicators': {k: (type(v).__name__, v.state()) for k, v in self.indicators.items()},
+        }, path)
+
+    @classmethod
+    def load(cls, path):
+        raw = pd.read_pickle(path)
+        kinds = {c.__name__: c for c in (SMA, RSI, BollingerWidth, VolumeRatio, Momentum, DownsideDeviation)}
+        indicators = {name: kinds[kind].restore(state) for name, (kind, state) in raw['indicators'].items()}
+        restored = cls(raw['symbols'], **indicators)
+        restored.last_time = raw['last_time']
+        return restored
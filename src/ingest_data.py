@@ -1,8 +1,16 @@
-import yfinance as yf
+import yahoo_client as yf
 import pandas as pd
 import psycopg2
-from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+import io
+import sys
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from market_data import fetch_windows
+from rate_limit import TokenBucket, retry_with_backoff
+from sector_map import SECTOR_MAP
 
 # Suppress warnings
 warnings.filterwarnings("ignore")
@@ -16,91 +24,246 @@ DB_CONFIG = {
     "port": "5432"
 }
 
-# FULL UNIVERSE
-TICKERS = [
-    "ADANIENT.NS", "ADANIPORTS.NS", "APOLLOHOSP.NS", "ASIANPAINT.NS", "AXISBANK.NS",
-    "BAJAJ-AUTO.NS", "BAJFINANCE.NS", "BAJAJFINSV.NS", "BEL.NS", "BPCL.NS",
-    "BHARTIARTL.NS", "BRITANNIA.NS", "CIPLA.NS", "COALINDIA.NS", "DIVISLAB.NS",
-    "DRREDDY.NS", "EICHERMOT.NS", "GRASIM.NS", "HCLTECH.NS", "HDFCBANK.NS",
-    "HDFCLIFE.NS", "HEROMOTOCO.NS", "HINDALCO.NS", "HINDUNILVR.NS", "ICICIBANK.NS",
-    "ITC.NS", "INDUSINDBK.NS", "INFY.NS", "JSWSTEEL.NS", "KOTAKBANK.NS",
-    "LT.NS", "M&M.NS", "MARUTI.NS", "NTPC.NS", "NESTLEIND.NS",
-    "ONGC.NS", "POWERGRID.NS", "RELIANCE.NS", "SBILIFE.NS", "SBIN.NS",
-    "SUNPHARMA.NS", "TCS.NS", "TATACONSUM.NS", "TATAMOTORS.NS", "TATASTEEL.NS",
-    "TECHM.NS", "TITAN.NS", "ULTRACEMCO.NS", "WIPRO.NS", "^NSEI"
-]
-
-def ingest_historical_data():
-    try:
-        print("🔌 Connecting to the Vault...")
-        conn = psycopg2.connect(**DB_CONFIG)
-        cur = conn.cursor()
+# FULL UNIVERSE: the same 500 names the rest of the system scores, plus the index
+def get_universe():
+    return list(SECTOR_MAP.keys()) + ["^NSEI"]
+
+# CONCURRENCY
+MAX_WORKERS = 8             # Download threads (and pooled DB connections)
+REQUESTS_PER_SECOND = 2.0   # Shared Yahoo budget across all threads
+BURST = 4                   # Token-bucket capacity
+MAX_RETRIES = 4             # Per request, with jittered exponential backoff
+EXPECT_DATA_DAYS = 5        # An empty answer for a window this long is treated as a failure
+
+# INCREMENTAL MODE
+# Yahoo only keeps ~730 days of hourly candles, so a new symbol's backfill
+# starts inside that horizon and is pulled in smaller windows.
+BACKFILL_DAYS = 729
+BACKFILL_CHUNK_DAYS = 180
+
+# BULK LOADER
+COLUMNS = ['time', 'symbol', 'open', 'high', 'low', 'close', 'volume', 'is_adjusted']
+
+# Session-private staging table. TEMP tables are never WAL-logged (same as
+# UNLOGGED) and each pooled connection gets its own, so loaders can't collide.
+STAGING_DDL = """
+    CREATE TEMP TABLE IF NOT EXISTS market_data_staging
+    (LIKE market_data INCLUDING DEFAULTS)
+    ON COMMIT DELETE ROWS;
+"""
+
+MERGE_QUERY = """
+    INSERT INTO market_data (time, symbol, open, high, low, close, volume, is_adjusted)
+    SELECT time, symbol, open, high, low, close, volume, is_adjusted
+    FROM market_data_staging
+    ON CONFLICT (time, symbol) DO NOTHING;
+"""
+
+def get_high_water_marks(cur):
+    """Latest stored candle per symbol, from ONE grouped query."""
+    cur.execute("SELECT symbol, max(time) FROM market_data GROUP BY symbol;")
+    return {symbol: pd.Timestamp(last).tz_convert('UTC') for symbol, last in cur.fetchall()}
+
+def prepare_frame(df, ticker):
+    """Maps a raw Yahoo frame onto the market_data columns."""
+    if isinstance(df.columns, pd.MultiIndex): df.columns = df.columns.get_level_values(0)
+
+    # 1. Reset Index (Date becomes a column)
+    df = df.reset_index()
+    
+    # 2. Rename columns safely
+    # We map whatever Yahoo gives us to our standard names
+    # Note: 'Datetime' is usually the name for hourly data
+    df.rename(columns={
+        "Datetime": "time", 
+        "Date": "time", 
+        "Open": "open", 
+        "High": "high", 
+        "Low": "low", 
+        "Close": "close", 
+        "Volume": "volume"
+    }, inplace=True)
+    
+    # Force rename first column if renaming didn't work (fallback)
+    if 'time' not in df.columns:
+         df.rename(columns={df.columns[0]: "time"}, inplace=True)
+
+    # 3. Timezone Cleanup
+    if df['time'].dt.tz is None:
+        df['time'] = df['time'].dt.tz_localize('UTC')
+    else:
+        df['time'] = df['time'].dt.tz_convert('UTC')
+    
+    # 4. Add Metadata
+    df['symbol'] = ticker
+    df['is_adjusted'] = True
+    
+    # Filter only the columns we need to prevent errors
+    return df[['time', 'symbol', 'open', 'high', 'low', 'close', 'volume', 'is_adjusted']].dropna()
+
+def bulk_load(conn, frame):
+    """
+    COPY one symbol's frame into the staging table, then merge it into the hypertable
+    with a single INSERT ... SELECT. Returns the number of new rows.
+    """
+    if frame.empty:
+        return 0
+    # pandas' C writer serialises the column blocks directly (no Python tuples)
+    buf = io.StringIO()
+    frame[COLUMNS].to_csv(buf, index=False, header=False, date_format='%Y-%m-%d %H:%M:%S%z')
+    buf.seek(0)
+
+    cur = conn.cursor()
+    cur.execute(STAGING_DDL)
+    cur.copy_expert(f"COPY market_data_staging ({', '.join(COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buf)
+    cur.execute(MERGE_QUERY)
+    inserted = cur.rowcount
+    conn.commit()  # ON COMMIT DELETE ROWS empties the staging table
+    cur.close()
+    return inserted
 
-        print(f"📥 Downloading data for {len(TICKERS)} tickers (One by One)...")
+class EmptyResponse(Exception):
+    """Yahoo answered with no bars for a window that must contain some (throttled / failed)."""
 
-        for ticker in TICKERS:
+def _download(limiter, ticker, interval="1h", start=None, end=None, period=None, expect_data=True):
+    """
+    One rate-limited, retried Yahoo request.
+    A Ticker per call: yf.download shares module-global result dicts between
+    threads, so concurrent downloads can lose or swap symbols.
+    Errors raise (raise_errors=True) and so does an empty answer where bars must
+    exist, which is what Yahoo returns when it throttles; both are retried.
+    """
+    def call():
+        limiter.acquire()
+        try:
+            if period is not None:
+                df = yf.Ticker(ticker).history(period=period, interval=interval, auto_adjust=True, raise_errors=True)
+            else:
+                df = yf.Ticker(ticker).history(start=start, end=end, interval=interval, auto_adjust=True, raise_errors=True)
+        except Exception as e:
+            # "No price data found" for a short window (night, weekend, holiday) is a real answer
+            if type(e).__name__ == "YFPricesMissingError":
+                if not expect_data:
+                    return pd.DataFrame()
+                raise EmptyResponse(str(e)) from e
+            raise
+        if df.empty and expect_data:
+            raise EmptyResponse(f"no bars for {ticker} ({period or start})")
+        return df
+    return retry_with_backoff(call, retries=MAX_RETRIES)
+
+def download_new_bars(ticker, last_time, now, limiter):
+    """
+    Incremental fetch for one symbol.
+    - Known symbol: only the candles after its high-water mark.
+    - New symbol: chunked backfill inside Yahoo's 730-day hourly horizon.
+    """
+    if last_time is None:
+        windows = fetch_windows(now - timedelta(days=BACKFILL_DAYS), now, "1h", span_days=BACKFILL_CHUNK_DAYS)
+    else:
+        windows = [(last_time, now)]
+
+    frames = []
+    for w_start, w_end in windows:
+        # Leave the last window open so the running hour is included.
+        # Backfill windows before a recent listing are legitimately empty; the
+        # incremental window is expected to hold bars once it spans EXPECT_DATA_DAYS
+        expect_data = last_time is not None and w_end - w_start >= timedelta(days=EXPECT_DATA_DAYS)
+        df = _download(limiter, ticker, "1h", start=w_start, end=None if w_end >= now else w_end,
+                       expect_data=expect_data)
+        if not df.empty:
+            frames.append(prepare_frame(df, ticker))
+
+    if not frames:
+        if last_time is None:
+            # Not one bar in the whole backfill horizon: throttled (or not a live symbol)
+            raise EmptyResponse(f"no bars for {ticker} in {len(windows)} backfill windows")
+        return pd.DataFrame()
+    final_df = pd.concat(frames).drop_duplicates(subset='time')
+    if last_time is not None:
+        final_df = final_df[final_df['time'] > last_time]
+    return final_df
+
+def ingest_symbol(ticker, last_time, now, incremental, limiter, pool):
+    """Download + load one symbol. Returns a summary record for the report."""
+    t0 = time.perf_counter()
+    record = {'symbol': ticker, 'status': 'OK', 'rows': 0, 'new': 0}
+    try:
+        if incremental:
+            final_df = download_new_bars(ticker, last_time, now, limiter)
+        else:
+            df = _download(limiter, ticker, "1h", period="1y")
+            final_df = prepare_frame(df, ticker) if not df.empty else pd.DataFrame()
+
+        if final_df.empty:
+            record['status'] = 'UP TO DATE' if last_time is not None else 'NO DATA'
+        else:
+            conn = pool.getconn()
             try:
-                # Download INDIVIDUAL ticker (Safe Mode)
-                # auto_adjust=True gives us adjusted Close automatically
-                df = yf.download(ticker, period="1y", interval="1h", progress=False, auto_adjust=True)
-                
-                if df.empty:
-                    print(f"   ⚠️ Skipping {ticker} (No data found)")
-                    continue
-
-                # 1. Reset Index (Date becomes a column)
-                df.reset_index(inplace=True)
-                
-                # 2. Rename columns safely
-                # We map whatever Yahoo gives us to our standard names
-                # Note: 'Datetime' is usually the name for hourly data
-                df.rename(columns={
-                    "Datetime": "time", 
-                    "Date": "time", 
-                    "Open": "open", 
-                    "High": "high", 
-                    "Low": "low", 
-                    "Close": "close", 
-                    "Volume": "volume"
-                }, inplace=True)
-                
-                # Force rename first column if renaming didn't work (fallback)
-                if 'time' not in df.columns:
-                     df.rename(columns={df.columns[0]: "time"}, inplace=True)
-
-                # 3. Timezone Cleanup
-                if df['time'].dt.tz is None:
-                    df['time'] = df['time'].dt.tz_localize('UTC')
-                else:
-                    df['time'] = df['time'].dt.tz_convert('UTC')
-                
-                # 4. Add Metadata
-                df['symbol'] = ticker
-                df['is_adjusted'] = True
-                
-                # 5. Insert
-                # Filter only the columns we need to prevent errors
-                final_df = df[['time', 'symbol', 'open', 'high', 'low', 'close', 'volume', 'is_adjusted']].dropna()
-                
-                rows = final_df.values.tolist()
-                
-                query = """
-                    INSERT INTO market_data (time, symbol, open, high, low, close, volume, is_adjusted)
-                    VALUES %s
-                    ON CONFLICT DO NOTHING;
-                """
-                execute_values(cur, query, rows)
-                print(f"   ✅ {ticker}: Inserted {len(rows)} candles.")
-
-            except Exception as e:
-                print(f"   ❌ Error {ticker}: {e}")
-
-        conn.commit()
-        conn.close()
-        print("\n🚀 FULL UNIVERSE INGESTED.")
+                record['new'] = bulk_load(conn, final_df)
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                pool.putconn(conn)
+            record['rows'] = len(final_df)
+            if incremental and last_time is None:
+                record['status'] = 'BACKFILLED'
+    except Exception as e:
+        record['status'] = f"ERROR: {str(e)[:40]}"
+    record['latency'] = time.perf_counter() - t0
+    return record
 
+def print_summary(results, elapsed):
+    print("\n" + "=" * 70)
+    print(f"{'SYMBOL':<18} | {'STATUS':<22} | {'ROWS':>7} | {'NEW':>7} | {'SECS':>6}")
+    print("-" * 70)
+    for r in sorted(results, key=lambda r: r['latency'], reverse=True):
+        print(f"{r['symbol']:<18} | {r['status'][:22]:<22} | {r['rows']:>7} | {r['new']:>7} | {r['latency']:>6.2f}")
+    print("-" * 70)
+    failed = [r for r in results if r['status'].startswith('ERROR')]
+    latencies = sorted(r['latency'] for r in results) or [0.0]
+    print(f"✅ {len(results) - len(failed)}/{len(results)} symbols OK | "
+          f"{sum(r['new'] for r in results)} new candles | "
+          f"p50 {latencies[len(latencies) // 2]:.2f}s | max {latencies[-1]:.2f}s | wall {elapsed:.1f}s")
+    if failed:
+        print(f"❌ Failed: {', '.join(r['symbol'] for r in failed)}")
+
+def ingest_historical_data(incremental=True):
+    try:
+        print("🔌 Connecting to the Vault...")
+        pool = ThreadedConnectionPool(1, MAX_WORKERS, **DB_CONFIG)
+        conn = pool.getconn()
+        cur = conn.cursor()
+        high_water = get_high_water_marks(cur) if incremental else {}
+        cur.close()
+        pool.putconn(conn)
     except Exception as e:
         print(f"❌ Critical Connection Error: {e}")
+        return
+
+    tickers = get_universe()
+    now = yf.now()
+    limiter = TokenBucket(REQUESTS_PER_SECOND, BURST)
+    mode = "Incremental" if incremental else "Full 1y Refresh"
+    print(f"📥 Downloading data for {len(tickers)} tickers ({mode}, {MAX_WORKERS} workers @ {REQUESTS_PER_SECOND}/s)...")
+
+    t0 = time.perf_counter()
+    results = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(ingest_symbol, t, high_water.get(t), now, incremental, limiter, pool)
+            for t in tickers
+        ]
+        for i, future in enumerate(as_completed(futures)):
+            record = future.result()
+            results.append(record)
+            print(f"   [{i+1}/{len(tickers)}] {record['symbol']}: {record['status']}          ", end="\r", flush=True)
+
+    pool.closeall()
+    print_summary(results, time.perf_counter() - t0)
+    print("\n🚀 FULL UNIVERSE INGESTED.")
 
 if __name__ == "__main__":
-    ingest_historical_data()
\ No newline at end of file
+    # Default is incremental; pass --full for the old 1y re-download
+    ingest_historical_data(incremental="--full" not in sys.argv)
@@ -0,0 +1,289 @@
+import os
+import json
+import warnings
+from datetime import timedelta
+
+import pandas as pd
+import yahoo_client as yf
+import psycopg2
+
+from db_setup import DB_CONFIG
+
+warnings.filterwarnings("ignore")
+
+# --- CONFIG ---
+# Every module asks this provider for bars instead of calling Yahoo itself.
+# Lookup order: Parquet cache -> TimescaleDB -> Yahoo (only for the missing ranges).
+CACHE_DIR = os.environ.get("ORACLE_CACHE_DIR", "data_cache")
+USE_DATABASE = True
+CHUNK_SIZE = 50                       # Tickers per multi-ticker Yahoo request
+STALE_AFTER = timedelta(minutes=15)   # Open-ended requests re-check the tail after this
+MAX_EMPTY_GAP = timedelta(days=4)     # An empty answer this short can be a weekend/holiday; longer ones are re-asked
+OHLCV = ["Open", "High", "Low", "Close", "Volume"]
+
+PERIODS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827
+}
+
+# Yahoo refuses intraday requests wider than these windows
+MAX_WINDOW_DAYS = {"1m": 7, "5m": 59, "15m": 59, "30m": 59, "1h": 729}
+
+# Intervals the database can serve, and the query that serves them
+DB_QUERIES = {
+    "1h": """
+        SELECT time, symbol, open, high, low, close, volume
+        FROM market_data
+        WHERE symbol = ANY(%s) AND time >= %s AND time < %s
+        ORDER BY time ASC;
+    """,
+    # Daily/weekly bars come pre-aggregated from the continuous aggregates (db_setup)
+    "1d": """
+        SELECT bucket AS time, symbol, open, high, low, close, volume
+        FROM market_data_daily
+        WHERE symbol = ANY(%s) AND bucket >= %s AND bucket < %s
+        ORDER BY bucket ASC;
+    """,
+    "1wk": """
+        SELECT bucket AS time, symbol, open, high, low, close, volume
+        FROM market_data_weekly
+        WHERE symbol = ANY(%s) AND bucket >= %s AND bucket < %s
+        ORDER BY bucket ASC;
+    """,
+}
+
+_db_available = True
+
+
+def _is_intraday(interval):
+    return interval.endswith("m") or interval.endswith("h")
+
+
+def _to_utc_naive(ts):
+    ts = pd.Timestamp(ts)
+    if ts.tzinfo is not None:
+        ts = ts.tz_convert("UTC").tz_localize(None)
+    return ts
+
+
+def _resolve_window(start, end, interval, period):
+    """Returns (start, end, open_ended) as naive UTC timestamps."""
+    open_ended = end is None
+    end = _to_utc_naive(yf.now() if end is None else end)
+    if start is None:
+        start = end - timedelta(days=PERIODS.get(period, 366))
+    start = _to_utc_naive(start)
+    if not _is_intraday(interval):
+        start = start.normalize()
+    return start, end, open_ended
+
+
+# --- PARQUET CACHE (partitioned by interval / symbol) ---
+def _partition_dir(symbol, interval):
+    return os.path.join(CACHE_DIR, f"interval={interval}", f"symbol={symbol}")
+
+
+def _load_partition(symbol, interval):
+    path = _partition_dir(symbol, interval)
+    bars_file = os.path.join(path, "bars.parquet")
+    cov_file = os.path.join(path, "coverage.json")
+    try:
+        frame = pd.read_parquet(bars_file)
+        with open(cov_file, "r") as f:
+            raw = json.load(f)
+        coverage = (pd.Timestamp(raw["from"]), pd.Timestamp(raw["until"]))
+        return frame, coverage
+    except (FileNotFoundError, KeyError, ValueError):
+        return pd.DataFrame(columns=OHLCV), None
+
+
+def _save_partition(symbol, interval, frame, coverage):
+    path = _partition_dir(symbol, interval)
+    os.makedirs(path, exist_ok=True)
+    # Write-then-rename so a concurrent reader never sees half a file
+    tmp_bars = os.path.join(path, f".bars.{os.getpid()}.tmp")
+    tmp_cov = os.path.join(path, f".coverage.{os.getpid()}.tmp")
+    frame.to_parquet(tmp_bars)
+    with open(tmp_cov, "w") as f:
+        json.dump({"from": coverage[0].isoformat(), "until": coverage[1].isoformat()}, f)
+    os.replace(tmp_bars, os.path.join(path, "bars.parquet"))
+    os.replace(tmp_cov, os.path.join(path, "coverage.json"))
+
+
+def _missing_ranges(coverage, start, end, open_ended):
+    if coverage is None:
+        return [(start, end)]
+    cov_from, cov_until = coverage
+    ranges = []
+    if start < cov_from:
+        ranges.append((start, cov_from))
+    if end > cov_until:
+        if not (open_ended and end - cov_until < STALE_AFTER):
+            ranges.append((cov_until, end))
+    return ranges
+
+
+# --- SOURCES ---
+def _clean_frame(df):
+    df = df.rename(columns=str.title)
+    df = df[[c for c in OHLCV if c in df.columns]].dropna(how="all")
+    df.index = pd.to_datetime(df.index)
+    if df.index.tz is not None:
+        df.index = df.index.tz_convert("UTC").tz_localize(None)
+    df.index.name = "time"
+    return df.astype("float64")
+
+
+def _fetch_database(symbols, start, end, interval):
+    global _db_available
+    if not (USE_DATABASE and _db_available) or interval not in DB_QUERIES:
+        return {}
+    try:
+        conn = psycopg2.connect(**DB_CONFIG)
+        params = (list(symbols), start.tz_localize("UTC").to_pydatetime(), end.tz_localize("UTC").to_pydatetime())
+        df = pd.read_sql(DB_QUERIES[interval], conn, params=params)
+        conn.close()
+    except Exception as e:
+        _db_available = False
+        print(f"   ℹ️ Vault offline ({str(e).strip()[:40]}). Using cache + Yahoo only.")
+        return {}
+
+    out = {}
+    for symbol, group in df.groupby("symbol"):
+        out[symbol] = _clean_frame(group.set_index("time").drop(columns="symbol"))
+    return out
+
+
+def fetch_windows(start, end, interval, span_days=None):
+    """Splits [start, end) into windows Yahoo will accept for this interval."""
+    limit = MAX_WINDOW_DAYS.get(interval, 100000)
+    span = timedelta(days=min(span_days, limit) if span_days else limit)
+    windows = []
+    cursor = start
+    while cursor < end:
+        windows.append((cursor, min(cursor + span, end)))
+        cursor += span
+    return windows
+
+
+def _split_download(raw, symbols):
+    if raw is None or raw.empty:
+        return {}
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {symbols[0]: _clean_frame(raw)}
+    out = {}
+    tickers = raw.columns.get_level_values(1)
+    for symbol in symbols:
+        if symbol in tickers:
+            frame = _clean_frame(raw.xs(symbol, axis=1, level=1))
+            if not frame.empty:
+                out[symbol] = frame
+    return out
+
+
+def _fetch_network(symbols, start, end, interval, open_ended):
+    out = {}
+    for w_start, w_end in fetch_windows(start, end, interval):
+        last_window = w_end >= end
+        for i in range(0, len(symbols), CHUNK_SIZE):
+            chunk = symbols[i:i + CHUNK_SIZE]
+            # Tz-aware bounds: yfinance reads naive datetimes in the exchange timezone
+            raw = yf.download(
+                chunk, start=w_start.tz_localize("UTC"),
+                end=None if (open_ended and last_window) else w_end.tz_localize("UTC"),
+                interval=interval, progress=False, auto_adjust=True, threads=False, group_by="column"
+            )
+            for symbol, frame in _split_download(raw, chunk).items():
+                out[symbol] = pd.concat([out[symbol], frame]) if symbol in out else frame
+    return out
+
+
+def _fill(symbols, start, end, interval, open_ended):
+    """Database first, then Yahoo for whatever the database could not cover."""
+    found = _fetch_database(symbols, start, end, interval)
+    network_ranges = {}
+    # One shared tail request for everything the database already knows about
+    db_tail = min((f.index[-1] for f in found.values() if not f.empty), default=None)
+    for symbol in symbols:
+        frame = found.get(symbol)
+        if frame is None or frame.empty:
+            network_ranges.setdefault((start, end), []).append(symbol)
+            continue
+        if frame.index[0] - start > timedelta(days=5):
+            network_ranges.setdefault((start, frame.index[0]), []).append(symbol)
+        network_ranges.setdefault((db_tail, end), []).append(symbol)
+
+    for (n_start, n_end), syms in network_ranges.items():
+        if not _is_intraday(interval):
+            n_start = n_start.normalize()
+        tail = open_ended and n_end >= end
+        fetched = _fetch_network(syms, n_start, n_end, interval, tail)
+        for symbol, frame in fetched.items():
+            found[symbol] = pd.concat([found[symbol], frame]) if symbol in found else frame
+    return found
+
+
+# --- PUBLIC API ---
+def get_bars(symbols, start=None, end=None, interval="1d", period="1y"):
+    """
+    Returns {symbol: OHLCV DataFrame} for [start, end).
+    Cached ranges are served from disk; only the uncovered head/tail is fetched.
+    """
+    if isinstance(symbols, str):
+        symbols = [symbols]
+    symbols = list(dict.fromkeys(symbols))
+    start, end, open_ended = _resolve_window(start, end, interval, period)
+
+    cached = {}
+    wants = {}
+    for symbol in symbols:
+        frame, coverage = _load_partition(symbol, interval)
+        cached[symbol] = (frame, coverage)
+        for rng in _missing_ranges(coverage, start, end, open_ended):
+            wants.setdefault(rng, []).append(symbol)
+
+    for (m_start, m_end), syms in wants.items():
+        try:
+            fresh = _fill(syms, m_start, m_end, interval, open_ended and m_end >= end)
+        except Exception as e:
+            print(f"   ⚠️ Fetch failed for {len(syms)} symbols: {str(e)[:60]}")
+            continue
+        for symbol in syms:
+            frame, coverage = cached[symbol]
+            new = fresh.get(symbol)
+            # An empty answer only counts as covered when the range is short enough to
+            # hold no sessions; otherwise (throttled, transient failure, brand-new
+            # symbol) the range stays missing and is asked for again next call.
+            if (new is None or new.empty) and (coverage is None or m_end - m_start > MAX_EMPTY_GAP):
+                continue
+            if new is not None and not new.empty:
+                frame = pd.concat([frame, new]) if not frame.empty else new
+                frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+            coverage = (
+                min(coverage[0], m_start) if coverage else m_start,
+                max(coverage[1], m_end) if coverage else m_end
+            )
+            cached[symbol] = (frame, coverage)
+            _save_partition(symbol, interval, frame, coverage)
+
+    out = {}
+    for symbol in symbols:
+        frame = cached[symbol][0]
+        if not frame.empty:
+            frame = frame[(frame.index >= start) & (frame.index < end)]
+        out[symbol] = frame
+    return out
+
+
+def get_prices(symbols, start=None, end=None, interval="1d", field="Close", period="1y"):
+    """Aligned (time x symbol) matrix of one OHLCV field."""
+    bars = get_bars(symbols, start=start, end=end, interval=interval, period=period)
+    columns = {s: b[field] for s, b in bars.items() if not b.empty and field in b.columns}
+    if not columns:
+        return pd.DataFrame()
+    return pd.DataFrame(columns).sort_index()
+
+
+def get_ohlcv(symbol, start=None, end=None, interval="1d", period="1y"):
+    """Single-symbol OHLCV frame (for candlestick charts and intraday checks)."""
+    return get_bars([symbol], start=start, end=end, interval=interval, period=period)[symbol]
@@ -1,8 +1,9 @@
-import yfinance as yf
 import time
 import smtplib
 from datetime import datetime
 from sentiment_engine import NewsSentimentEngine
+from market_data import get_ohlcv
+from indicators import IndicatorSet, RSI, SMA
 
 # --- CONFIGURATION ---
 CHECK_INTERVAL = 300  # Check every 5 minutes
@@ -10,6 +11,11 @@ CRASH_THRESHOLD = -0.025  # Panic if Market drops 2.5% intraday
 SENTIMENT_PANIC = -0.40   # Panic if News Sentiment hits -0.40 (Disaster)
 MY_EMAIL = "your_email@gmail.com" # Placeholder
 EMAIL_PASSWORD = "your_app_password" # Placeholder
+RSI_PANIC = 15            # Warn if Nifty's 5-min RSI collapses below this (one-way selling)
+STATE_FILE = "sentinel_state.pkl"  # Indicator checkpoint: restarts resume, no history replay
+
+_indicators = None
+_latest = {}
 
 def send_emergency_alert(subject, body):
     """ Sends an email alert to your phone (Liquidate Signal) """
@@ -21,14 +27,38 @@ def send_emergency_alert(subject, body):
     #     message = f"Subject: {subject}\n\n{body}"
     #     server.sendmail(MY_EMAIL, MY_EMAIL, message)
 
+def update_intraday_indicators(hist):
+    """Feeds only the 5-min candles newer than the last one seen: O(new bars) per scan."""
+    global _indicators
+    if _indicators is None:
+        try:
+            _indicators = IndicatorSet.load(STATE_FILE)
+        except Exception:
+            _indicators = IndicatorSet(["^NSEI"], rsi=RSI(1, period=14), sma=SMA(1, window=20))
+    last = _indicators.last_time
+    new_bars = hist if last is None else hist[hist.index > last]
+    for t, close in new_bars['Close'].items():
+        out = _indicators.update(t, rsi=close, sma=close)
+        _latest.update({name: float(series.iloc[0]) for name, series in out.items()})
+    if not new_bars.empty:
+        _indicators.save(STATE_FILE)
+    return _latest
+
 def check_market_health():
     print(f"   👀 Sentinel Scanning at {datetime.now().strftime('%H:%M:%S')}...", end="\r")
     
     try:
         # 1. CHECK NIFTY CRASH (Price Shock)
         # We use ^NSEI (Nifty 50) as the proxy for the whole market
-        nifty = yf.Ticker("^NSEI")
-        hist = nifty.history(period="1d", interval="5m")
+        hist = get_ohlcv("^NSEI", period="1d", interval="5m")
+        if not hist.empty:
+            live = update_intraday_indicators(hist)
+            rsi = live.get('rsi', float('nan'))
+            if rsi < RSI_PANIC:
+                print(f"\n   ⚠️ Nifty 5-min RSI at {rsi:.1f} (SMA20 {live.get('sma', float('nan')):,.0f}): heavy one-way selling.")
+        # Only today's session (the lookback window can reach into yesterday)
+        if not hist.empty:
+            hist = hist[hist.index.date == hist.index[-1].date()]
         
         if not hist.empty:
             open_price = hist['Open'].iloc[0]
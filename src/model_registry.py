@@ -0,0 +1,126 @@
+import os
+import json
+import sys
+import threading
+import time
+
+import pandas as pd
+import xgboost as xgb
+
+# --- CONFIG ---
+# Trained boosters live next to their metadata, one directory per version:
+#   models/<name>/<version>/model.ubj + meta.json,  models/<name>/LATEST -> version
+# Scoring loads the latest booster (milliseconds) instead of retraining.
+REGISTRY_DIR = os.environ.get("ORACLE_MODEL_DIR", "models")
+DEFAULT_NAME = "oracle"
+
+_cache = {}
+_lock = threading.Lock()
+
+def _model_dir(name, version):
+    return os.path.join(REGISTRY_DIR, name, version)
+
+def _atomic_write(path, text):
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _new_version(name):
+    version = pd.Timestamp.now(tz="UTC").strftime("%Y%m%dT%H%M%S")
+    # Two saves inside one second get a suffix instead of overwriting each other
+    suffix = 0
+    while os.path.exists(_model_dir(name, version + (f"-{suffix}" if suffix else ""))):
+        suffix += 1
+    return version + (f"-{suffix}" if suffix else "")
+
+def _stamp(ts):
+    return pd.Timestamp(ts).isoformat() if ts is not None else None
+
+def save_model(model, features, train_start, train_end, feature_set_version, metrics=None,
+               params=None, parent=None, name=DEFAULT_NAME, extra=None):
+    """
+    Stores a booster (or XGBClassifier) plus everything needed to trust it later.
+    Moves the LATEST pointer to it and returns the version id.
+    """
+    booster = model.get_booster() if hasattr(model, "get_booster") else model
+    version = _new_version(name)
+    path = _model_dir(name, version)
+    os.makedirs(path)
+    booster.save_model(os.path.join(path, "model.ubj"))
+    meta = {
+        'name': name,
+        'version': version,
+        'created': pd.Timestamp.now(tz="UTC").isoformat(),
+        'features': list(features),
+        'train_start': _stamp(train_start),
+        'train_end': _stamp(train_end),
+        'feature_set_version': feature_set_version,
+        'num_trees': booster.num_boosted_rounds(),
+        'params': params or {},
+        'metrics': metrics or {},
+        'parent': parent,
+    }
+    if extra:
+        meta.update(extra)
+    _atomic_write(os.path.join(path, "meta.json"), json.dumps(meta, indent=2, default=str))
+    _atomic_write(os.path.join(REGISTRY_DIR, name, "LATEST"), version)
+    return version
+
+def latest_version(name=DEFAULT_NAME):
+    try:
+        with open(os.path.join(REGISTRY_DIR, name, "LATEST"), "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+def load_meta(version=None, name=DEFAULT_NAME):
+    version = version or latest_version(name)
+    if version is None:
+        return None
+    with open(os.path.join(_model_dir(name, version), "meta.json"), "r") as f:
+        return json.load(f)
+
+def load_model(version=None, name=DEFAULT_NAME):
+    """(xgb.Booster, meta) for a version (default: LATEST), or (None, None). Cached per process."""
+    version = version or latest_version(name)
+    if version is None:
+        return None, None
+    key = (name, version)
+    with _lock:
+        if key not in _cache:
+            booster = xgb.Booster()
+            booster.load_model(os.path.join(_model_dir(name, version), "model.ubj"))
+            _cache[key] = (booster, load_meta(version, name))
+        return _cache[key]
+
+def list_models(name=DEFAULT_NAME):
+    root = os.path.join(REGISTRY_DIR, name)
+    if not os.path.isdir(root):
+        return pd.DataFrame()
+    rows = []
+    for version in sorted(os.listdir(root)):
+        meta_path = os.path.join(root, version, "meta.json")
+        if not os.path.exists(meta_path):
+            continue
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        rows.append({
+            'version': version,
+            'trees': meta.get('num_trees'),
+            'train_end': meta.get('train_end'),
+            'feature_set': meta.get('feature_set_version'),
+            'logloss': meta.get('metrics', {}).get('logloss'),
+            'parent': meta.get('parent'),
+        })
+    return pd.DataFrame(rows)
+
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_NAME
+    t0 = time.perf_counter()
+    booster, meta = load_model(name=name)
+    if booster is None:
+        print(f"❌ No models registered under '{name}'. Run train_model.py first.")
+    else:
+        print(f"✅ Loaded {name}/{meta['version']} ({meta['num_trees']} trees) in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        print(list_models(name).to_string(index=False))
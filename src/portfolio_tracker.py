@@ -1,6 +1,6 @@
 import pandas as pd
-import yfinance as yf
 import warnings
+from market_data import get_prices
 
 warnings.filterwarnings("ignore")
 
@@ -33,19 +33,11 @@ def track_portfolio():
     tickers = portfolio['Ticker'].tolist()
     print(f"   🌍 Fetching live prices for: {', '.join(tickers)}...")
     
-    # Download live data
-    live_data = yf.download(tickers, period="1d", interval="1m", progress=False)['Close']
+    # Live 1-minute bars via the shared provider (always one column per ticker)
+    live_data = get_prices(tickers, period="1d", interval="1m")
     
-    # Handle single-ticker result format difference
-    if isinstance(live_data, pd.Series): 
-        live_data = live_data.to_frame()
-        # If the series name isn't the ticker, we might need to adjust, 
-        # but yf usually handles single ticker downloads by returning a DataFrame if asked correctly.
-        # Safer fallback:
-        current_prices = {tickers[0]: live_data.iloc[-1].item()}
-    else:
-        # Get the very last price available (current market price)
-        current_prices = live_data.iloc[-1].to_dict()
+    # Get the very last price available (current market price)
+    current_prices = live_data.ffill().iloc[-1].to_dict() if not live_data.empty else {}
 
     # 3. Calculate P&L
     print("\n" + "="*95)
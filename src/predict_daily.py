@@ -1,10 +1,13 @@
 import pandas as pd
 import numpy as np
-import yfinance as yf
 import os
 import warnings
 import sys
-from datetime import datetime
+import time
+import hashlib
+import multiprocessing as mp
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime, timedelta
 
 # --- INTERNAL MODULES ---
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
@@ -13,8 +16,20 @@ try:
 except ImportError:
     SECTOR_MAP = {}
     
+from market_data import get_prices
+from indicators import SMA, Momentum, DownsideDeviation, batch
 from sentiment_engine import NewsSentimentEngine
 from valuation_logic import get_intrinsic_value
+from rate_limit import TokenBucket
+from scan_checkpoint import ScanCheckpoint, CHECKPOINT_FILE
+from scoring import oracle_scores, badges
+import yahoo_client as yf
+try:
+    from train_model import get_model
+    from feature_store import update_feature_store, latest_features
+    from sector_models import predict_routed
+except ImportError:
+    get_model = None
 # (If you don't have portfolio_manager or reality_simulator yet, comment these out)
 # from portfolio_manager import PortfolioManager
 # from reality_simulator import IndiaTradingCostModel
@@ -22,16 +37,36 @@ from valuation_logic import get_intrinsic_value
 warnings.filterwarnings("ignore")
 LOG_FILE = "nifty_oracle_log.csv"
 SENTIMENT_THRESHOLD = -0.20
+MIN_HISTORY_BARS = 100  # Fewer closes than this -> 'Data Error'
+
+# AUDIT PIPELINE
+# Valuation and news calls for many tickers are in flight at once; one shared
+# token bucket keeps the whole scan under the Yahoo budget.
+AUDIT_WORKERS = 16
+REQUESTS_PER_SECOND = 2.0
+BURST = 4
+VALUATION_REQUESTS = 3     # info + financials + cashflow (financials reused from the fingerprint fetch)
+SENTIMENT_REQUESTS = 1     # news
+STAGE_TIMEOUTS = {'valuation': 30.0, 'sentiment': 20.0}  # Seconds of Yahoo time (waiting for the limiter doesn't count)
+
+# CHECKPOINT / RESUME (scan_checkpoint.py)
+# Within these windows a stored stage result is reused without asking Yahoo at all;
+# after them, only the fingerprint is fetched (statement date / news IDs) and the
+# stage is recomputed only if it changed. Price metrics are always recomputed
+# (price_stage is milliseconds on the cached close matrix).
+VALUATION_RECHECK = timedelta(hours=12)
+NEWS_RECHECK = timedelta(minutes=60)
 SAMPLE_MODE = False  # Set to True for fast testing
+CONFIDENCE_MAX_AGE_DAYS = 5  # Feature rows older than this (delisted / halted) get no Confidence
+USE_SECTOR_MODELS = False    # Route each symbol to its sector model (sector_models.py)
 
 def get_market_regime():
     print("\n🌎 ANALYZING MARKET REGIME...", flush=True)
     try:
-        nifty = yf.download("^NSEI", period="1y", progress=False)['Close']
-        if isinstance(nifty, pd.DataFrame): nifty = nifty.iloc[:, 0]
+        nifty = get_prices("^NSEI", period="1y")["^NSEI"].dropna()
         
         current_price = float(nifty.iloc[-1])
-        sma200 = float(nifty.rolling(200).mean().iloc[-1])
+        sma200 = float(batch(SMA, nifty, window=200).iloc[-1])
         
         if current_price < sma200:
             return {"status": "BEARISH", "multiplier": 0.8}
@@ -40,31 +75,227 @@ def get_market_regime():
         return {"status": "NEUTRAL", "multiplier": 1.0}
 
 def calculate_downside_deviation(series):
-    returns = series.pct_change().dropna()
-    negative_returns = returns[returns < 0]
-    if len(negative_returns) < 2: return 0.02
-    return float(negative_returns.std())
+    # Std of the down days over the last 252 returns (0.02 if fewer than 2)
+    return float(batch(DownsideDeviation, series, window=252).iloc[-1])
 
-def calculate_composite_score(row, regime_status):
-    if row['Status'] != 'Active': return 0.0
-    
-    mom_rank = row.get('Momentum_Rank', 0.5)
-    safe_rank = row.get('Safety_Rank', 0.5)
-    val_rank = np.clip((row.get('Upside_Pct', 0) + 0.2), 0, 1)
-    
-    if regime_status == "BULLISH":
-        w_mom, w_safe, w_val = 0.18, 0.36, 0.36
-        base_score = (mom_rank * w_mom) + (safe_rank * w_safe) + (val_rank * w_val)
+def price_stage(closes, tickers):
+    """
+    Price-derived metrics for the whole universe from one aligned close matrix.
+    Each column's valid closes are packed to the bottom first, so every metric
+    matches what the old per-ticker dropna() series produced, holidays and halts included.
+    """
+    closes = closes.reindex(columns=tickers).astype(np.float64)
+    values = closes.to_numpy()
+    valid = ~np.isnan(values)
+    # Stable sort on the valid flag: gaps float to the top, closes keep their order
+    packed = np.take_along_axis(values, np.argsort(valid, axis=0, kind='stable'), axis=0)
+    bars = valid.sum(axis=0)
+
+    if len(packed):
+        close = packed[-1]
+        momentum = batch(Momentum, packed, period=126)[-1]
+        downside = batch(DownsideDeviation, packed, window=252)[-1]
     else:
-        w_safe = 0.90
-        base_score = (safe_rank * w_safe)
-    
-    return round(base_score * 100, 1)
+        close = momentum = downside = np.full(len(tickers), np.nan)
 
-def make_predictions():
-    regime = get_market_regime()
-    
-    # 1. GET FULL LIST
+    return pd.DataFrame({
+        'Close': close, 'Momentum_Raw': momentum, 'Downside_Risk_Raw': downside,
+        'Bars': bars, 'Data_Error': bars < MIN_HISTORY_BARS,
+    }, index=pd.Index(tickers, name='symbol'))
+
+def score_universe(tickers):
+    """
+    ML stage: Confidence = P(next bar beats Nifty) from the registered XGBoost model,
+    scored on each ticker's latest stored feature row in a single batched call.
+    """
+    if get_model is None:
+        print("⚠️ ML stage skipped (xgboost not installed).")
+        return pd.Series(dtype=float)
+    try:
+        booster, meta = get_model()
+        update_feature_store()
+        rows = latest_features()
+    except Exception as e:
+        print(f"⚠️ ML stage skipped: {e}")
+        return pd.Series(dtype=float)
+    if booster is None or rows.empty:
+        return pd.Series(dtype=float)
+
+    t0 = time.perf_counter()
+    rows = rows[rows['symbol'].isin(tickers)]
+    rows = rows[rows.index >= rows.index.max() - timedelta(days=CONFIDENCE_MAX_AGE_DAYS)]
+    if USE_SECTOR_MODELS:
+        confidence = predict_routed(rows, SECTOR_MAP or None)
+        print(f"🤖 ML: {len(rows)} assets scored by sector models in {(time.perf_counter() - t0) * 1000:.0f} ms", flush=True)
+        return confidence
+    # One contiguous float32 matrix, columns in the model's own order
+    X = np.ascontiguousarray(rows[meta['features']].to_numpy(dtype=np.float32))
+    confidence = booster.inplace_predict(X)
+    print(f"🤖 ML: {len(rows)} assets scored by model {meta['version']} in {(time.perf_counter() - t0) * 1000:.0f} ms", flush=True)
+    return pd.Series(confidence, index=rows['symbol'].astype(str).to_numpy())
+
+def _audit_row(ticker, metrics, stages):
+    """Candidate row from the price metrics + stage results {stage: (outcome, value)}."""
+    row_data = {
+        'symbol': ticker, 'Close': 0, 'Momentum_Raw': 0,
+        'Downside_Risk_Raw': 0, 'Upside_Pct': 0,
+        'News_Score': 0, 'F_Score': 0, 'Fair_Value': 0,
+        'Status': 'Unknown'
+    }
+    if metrics['Data_Error']:
+        row_data['Status'] = 'Data Error'
+        return row_data
+
+    errors = [value for outcome, value in stages.values() if outcome == 'error']
+    if errors:
+        row_data['Status'] = f'Error: {str(errors[0])[:20]}'
+        return row_data
+
+    # A timed-out stage counts as "no data": no fair value / neutral news
+    close_price = float(metrics['Close'])
+    outcome, fair_val = stages['valuation']
+    fair_val = fair_val if outcome == 'ok' else None
+    outcome, sentiment = stages['sentiment']
+    news_score = sentiment[0] if outcome == 'ok' else 0.0
+    upside_pct = (fair_val - close_price) / close_price if fair_val else 0
+
+    row_data.update({
+        'Close': close_price, 'Momentum_Raw': float(metrics['Momentum_Raw']),
+        'Downside_Risk_Raw': float(metrics['Downside_Risk_Raw']), 'Upside_Pct': upside_pct,
+        'News_Score': news_score, 'F_Score': 5,
+        'Fair_Value': fair_val
+    })
+    row_data['Status'] = 'Rejected: Sentiment' if news_score < SENTIMENT_THRESHOLD else 'Active'
+    return row_data
+
+def valuation_stage(ticker, gate, checkpoint):
+    """Fair value, recomputed only when the latest statement date has changed."""
+    cached = checkpoint.get(ticker, 'valuation')
+    if checkpoint.get(ticker, 'valuation', max_age=VALUATION_RECHECK):
+        checkpoint.hit()
+        return cached['value']
+    gate(1)
+    stock = yf.Ticker(ticker)
+    try:
+        statements = stock.financials
+    except Exception:
+        # No fingerprint this time: value from scratch (get_intrinsic_value refetches)
+        statements = statement_date = None
+    else:
+        statement_date = str(max(statements.columns)) if statements is not None and not statements.empty else None
+        # A stored "no fair value" is never carried forward on the fingerprint alone
+        if cached and cached['value'] is not None and cached['inputs'] == statement_date:
+            checkpoint.hit()
+            checkpoint.put(ticker, 'valuation', statement_date, cached['value'])
+            return cached['value']
+    gate(VALUATION_REQUESTS if statements is None else VALUATION_REQUESTS - 1)
+    try:
+        fair_val = get_intrinsic_value(ticker, stock=stock, financials=statements, raise_errors=True)
+    except Exception:
+        # Throttled / failed fetch: no fair value this run, and nothing checkpointed
+        return None
+    fair_val = float(fair_val) if fair_val is not None else None
+    checkpoint.put(ticker, 'valuation', statement_date, fair_val)
+    return fair_val
+
+def sentiment_stage(ticker, gate, checkpoint, sent_engine):
+    """(score, count, headline), rescored only when the set of news IDs has changed."""
+    cached = checkpoint.get(ticker, 'sentiment')
+    if checkpoint.get(ticker, 'sentiment', max_age=NEWS_RECHECK):
+        checkpoint.hit()
+        return tuple(cached['value'])
+    gate(SENTIMENT_REQUESTS)
+    try:
+        news = yf.Ticker(ticker).news or []
+    except Exception as e:
+        # Same graceful failure as get_sentiment; not checkpointed
+        return 0.0, 0, f"Error: {str(e)}"
+    news_ids = [a.get('uuid') or a.get('id') or a.get('title', '') for a in news]
+    if cached and cached['inputs'] == news_ids:
+        checkpoint.hit()
+        checkpoint.put(ticker, 'sentiment', news_ids, cached['value'])
+        return tuple(cached['value'])
+    result = sent_engine.score_articles(news)
+    checkpoint.put(ticker, 'sentiment', news_ids, list(result))
+    return result
+
+def _run_stage(limiter, started, waiting, key, fn, *args):
+    def gate(tokens):
+        # The stage's timeout clock starts once its first request is allowed out and
+        # pauses while it queues for more tokens: only Yahoo time is charged to it
+        waiting[key] = time.monotonic()
+        limiter.acquire(tokens)
+        now = time.monotonic()
+        started[key] = started[key] + (now - waiting[key]) if key in started else now
+        del waiting[key]
+    ticker, *rest = args
+    return fn(ticker, gate, *rest)
+
+def audit_universe(tickers, prices, sent_engine, limiter=None, checkpoint=None):
+    """
+    Staged audit: valuation and news for every ticker run concurrently on a thread
+    pool behind one shared TokenBucket. Each call gets STAGE_TIMEOUTS[stage] seconds
+    from the moment it starts; a ticker's row is emitted as soon as both stages are
+    settled. Stage results are checkpointed as they finish. Returns the rows in
+    completion order.
+    """
+    limiter = limiter or TokenBucket(REQUESTS_PER_SECOND, BURST)
+    checkpoint = checkpoint or ScanCheckpoint()
+    candidates = [_audit_row(t, prices.loc[t], {}) for t in tickers if prices.loc[t, 'Data_Error']]
+    audit = [t for t in tickers if not prices.loc[t, 'Data_Error']]
+    print(f"🔬 Auditing {len(audit)} assets ({AUDIT_WORKERS} workers @ {REQUESTS_PER_SECOND}/s)...", flush=True)
+
+    executor = ThreadPoolExecutor(max_workers=AUDIT_WORKERS)
+    started, waiting, futures = {}, {}, {}
+    for t in audit:
+        futures[executor.submit(_run_stage, limiter, started, waiting, (t, 'valuation'),
+                                valuation_stage, t, checkpoint)] = (t, 'valuation')
+        futures[executor.submit(_run_stage, limiter, started, waiting, (t, 'sentiment'),
+                                sentiment_stage, t, checkpoint, sent_engine)] = (t, 'sentiment')
+
+    stages = {t: {} for t in audit}
+    pending, timeouts = set(futures), 0
+    while pending:
+        done, pending = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+        settled = set()
+        for future in done:
+            ticker, stage = futures[future]
+            try:
+                stages[ticker][stage] = ('ok', future.result())
+            except Exception as e:
+                stages[ticker][stage] = ('error', e)
+            settled.add(ticker)
+
+        # Give up on calls that have run past their stage's deadline (not while queued at the limiter)
+        now = time.monotonic()
+        for future in list(pending):
+            ticker, stage = futures[future]
+            if (ticker, stage) in waiting:
+                continue
+            if now - started.get((ticker, stage), now) > STAGE_TIMEOUTS[stage]:
+                pending.discard(future)
+                stages[ticker][stage] = ('timeout', None)
+                settled.add(ticker)
+                timeouts += 1
+
+        # Stream finished tickers into the candidate table
+        for ticker in settled:
+            if len(stages[ticker]) == 2:
+                row_data = _audit_row(ticker, prices.loc[ticker], stages.pop(ticker))
+                candidates.append(row_data)
+                status_icon = "✅" if row_data['Status'] == 'Active' else "⚠️"
+                print(f"[{len(candidates)}/{len(tickers)}] {status_icon} Scanned {ticker} ({row_data['Status']})   ",
+                      end="\r", flush=True)
+
+    # Timed-out calls may still be running: don't wait for them
+    executor.shutdown(wait=False, cancel_futures=True)
+    if timeouts:
+        print(f"\n⏱️ {timeouts} calls timed out (scored without that input).", flush=True)
+    if checkpoint.reused:
+        print(f"\n♻️ {checkpoint.reused} stage results reused from the checkpoint (inputs unchanged).", flush=True)
+    return candidates
+
+def get_universe():
     full_list = [t for t in SECTOR_MAP.keys() if len(str(t)) > 2]
     # Fallback if sector map is empty
     if not full_list:
@@ -72,67 +303,26 @@ def make_predictions():
         
     tickers = full_list[:20] if SAMPLE_MODE else full_list
     if "^NSEI" not in tickers: tickers.append("^NSEI")
-    
-    print(f"📡 AUDITING {len(tickers)} ASSETS (Audit Mode: ON)...", flush=True)
-    
-    candidates = []
-    sent_engine = NewsSentimentEngine()
-    
-    for i, ticker in enumerate(tickers):
-        row_data = {
-            'symbol': ticker, 'Close': 0, 'Momentum_Raw': 0,
-            'Downside_Risk_Raw': 0, 'Upside_Pct': 0,
-            'News_Score': 0, 'F_Score': 0, 'Fair_Value': 0,
-            'Status': 'Unknown'
-        }
-        
-        try:
-            df = yf.download(ticker, period="1y", progress=False, auto_adjust=True)
-            
-            if df is None or df.empty or len(df) < 100:
-                row_data['Status'] = 'Data Error'
-                candidates.append(row_data)
-                print(f"[{i+1}/{len(tickers)}] ❌ {ticker}: Data Error", end="\r", flush=True)
-                continue
-            
-            # Metrics
-            if isinstance(df.columns, pd.MultiIndex):
-                # Fix for new yfinance format
-                close_series = df.xs('Close', axis=1, level=0).iloc[:, 0]
-            else:
-                close_series = df['Close']
-                
-            close_price = float(close_series.iloc[-1])
-            momentum = float(close_series.pct_change(126).iloc[-1])
-            downside_risk = calculate_downside_deviation(close_series)
-            
-            # Advanced
-            f_score = 5 
-            fair_val = get_intrinsic_value(ticker)
-            upside_pct = (fair_val - close_price) / close_price if fair_val else 0
-            news_score, _, _ = sent_engine.get_sentiment(ticker)
-            
-            row_data.update({
-                'Close': close_price, 'Momentum_Raw': momentum,
-                'Downside_Risk_Raw': downside_risk, 'Upside_Pct': upside_pct,
-                'News_Score': news_score, 'F_Score': f_score,
-                'Fair_Value': fair_val
-            })
-            
-            if news_score < SENTIMENT_THRESHOLD:
-                row_data['Status'] = 'Rejected: Sentiment'
-            else:
-                row_data['Status'] = 'Active'
-                
-        except Exception as e:
-            row_data['Status'] = f'Error: {str(e)[:20]}'
-        
-        candidates.append(row_data)
-        status_icon = "✅" if row_data['Status'] == 'Active' else "⚠️"
-        print(f"[{i+1}/{len(tickers)}] {status_icon} Scanned {ticker} ({row_data['Status']})   ", end="\r", flush=True)
+    return tickers
 
+def scan_candidates(tickers, fresh=False, limiter=None, checkpoint_path=CHECKPOINT_FILE):
+    """Per-ticker work (prices + audit) for any subset of the universe -> candidate table."""
+    # One cached, chunked fetch for the whole universe (only new bars hit the network)
+    closes = get_prices(tickers, period="1y")
+    prices = price_stage(closes, tickers)
+    print(f"📈 Price metrics ready for {len(prices)} assets ({int(prices['Data_Error'].sum())} data errors).", flush=True)
+
+    # AUDIT (valuation + news, concurrent, rate-limited)
+    checkpoint = ScanCheckpoint(checkpoint_path, fresh=fresh)
+    candidates = audit_universe(tickers, prices, NewsSentimentEngine(), limiter=limiter, checkpoint=checkpoint)
+    checkpoint.compact()
+    # Rows arrive in completion order; the table keeps the universe order
+    return pd.DataFrame(candidates).set_index('symbol').reindex(tickers).reset_index()
+
+def finalize(df_results, regime):
+    """Cross-sectional step: Confidence, ranks, Oracle_Score and the log (needs the whole universe)."""
     # 3. RANKING
-    df_results = pd.DataFrame(candidates)
+    df_results['Confidence'] = df_results['symbol'].map(score_universe(list(df_results['symbol'])))
     active_mask = df_results['Status'] == 'Active'
     
     if active_mask.sum() > 0:
@@ -142,32 +332,146 @@ def make_predictions():
         df_results['Momentum_Rank'] = 0
         df_results['Safety_Rank'] = 0
 
-    df_results['Oracle_Score'] = df_results.apply(lambda r: calculate_composite_score(r, regime['status']), axis=1)
+    df_results['Oracle_Score'] = oracle_scores(df_results, regime['status'])
     
     # 4. SAVE LOG
     today = datetime.now().strftime('%Y-%m-%d')
-    log_data = []
-    for _, row in df_results.iterrows():
-        s_badge = "🛡️ HIGH" if row.get('Safety_Rank', 0) > 0.6 else "⚠️ MED"
-        m_badge = "🚀 FAST" if row.get('Momentum_Rank', 0) > 0.6 else "🐢 SLOW"
-        
-        log_data.append({
-            'Date': today,
-            'Ticker': row['symbol'],
-            'Entry_Price': round(row['Close'], 2),
-            'Oracle_Score': round(row['Oracle_Score'], 1),
-            'Projected_Upside': round(row['Upside_Pct'] * 100, 1),
-            'Fair_Value': round(row['Fair_Value'], 2),
-            'F_Score': row['F_Score'],
-            'Status': row['Status'],
-            'Safety_Badge': s_badge,
-            'Momentum_Badge': m_badge,
-            'Regime_Active': regime['status']
-        })
+    final_df = pd.DataFrame({
+        'Date': today,
+        'Ticker': df_results['symbol'],
+        'Entry_Price': df_results['Close'].round(2),
+        'Oracle_Score': df_results['Oracle_Score'].round(1),
+        'Projected_Upside': (df_results['Upside_Pct'] * 100).round(1),
+        'Fair_Value': df_results['Fair_Value'].astype(float).round(2),
+        'F_Score': df_results['F_Score'],
+        'Confidence': df_results['Confidence'].round(3),
+        'Status': df_results['Status'],
+    })
+    final_df = final_df.join(badges(df_results))
+    final_df['Regime_Active'] = regime['status']
         
-    final_df = pd.DataFrame(log_data)
     final_df.to_csv(LOG_FILE, index=False)
     print(f"\n\n🏆 AUDIT COMPLETE. {len(final_df)} assets logged to {LOG_FILE}.", flush=True)
+    return final_df
+
+def make_predictions(fresh=False):
+    regime = get_market_regime()
+    
+    # 1. GET FULL LIST
+    tickers = get_universe()
+    print(f"📡 AUDITING {len(tickers)} ASSETS (Audit Mode: ON)...", flush=True)
+    
+    # 2. SCAN
+    df_results = scan_candidates(tickers, fresh=fresh)
+    finalize(df_results, regime)
+
+# --- SHARDED MODE ---
+# The universe is split into N shards by a stable hash of the ticker (the same
+# ticker always lands in the same shard, on any machine). Each shard runs the
+# per-ticker scan and writes a partial candidate table to SHARD_DIR (local disk,
+# or a directory shared between machines); merge_shards() then does the
+# cross-sectional part once, so ranks and scores match a single-process scan.
+#
+# The scan is bound by the Yahoo budget (REQUESTS_PER_SECOND), not the CPU, so
+# shards only pay off when each one has a budget of its own: one machine (egress
+# IP) per shard, or locally one HTTP(S) proxy per shard in ORACLE_SHARD_PROXIES
+# (comma-separated). Local shards sharing one egress would just split the same
+# budget N ways, so run_sharded() refuses that and runs a single scan instead.
+#
+# Every partial is stamped with its scan ID (today's date, or ORACLE_SCAN_ID when
+# shards of one run may straddle midnight or several runs happen a day), and the
+# merge refuses partials from any other scan: a shard that failed today must not
+# leave yesterday's file to be ranked.
+SHARD_DIR = os.environ.get("ORACLE_SHARD_DIR", "scan_shards")
+SHARD_PROXIES = [p.strip() for p in os.environ.get("ORACLE_SHARD_PROXIES", "").split(",") if p.strip()]
+
+def shard_of(ticker, n_shards):
+    return int(hashlib.md5(ticker.encode()).hexdigest(), 16) % n_shards
+
+def _shard_path(shard_dir, k, n_shards):
+    return os.path.join(shard_dir, f"shard-{k}-of-{n_shards}.parquet")
+
+def _use_egress(proxy):
+    # Picked up by yfinance's HTTP session (this process only)
+    for name in ("HTTPS_PROXY", "HTTP_PROXY", "https_proxy", "http_proxy"):
+        os.environ[name] = proxy
+
+def scan_id():
+    return os.environ.get("ORACLE_SCAN_ID") or datetime.now().strftime('%Y-%m-%d')
+
+def run_shard(k, n_shards, shard_dir=SHARD_DIR, fresh=False, proxy=None, run_id=None):
+    """Scans shard k of n_shards (with this egress's full Yahoo budget) and writes its partial candidate table."""
+    if proxy:
+        _use_egress(proxy)
+    tickers = [t for t in get_universe() if shard_of(t, n_shards) == k]
+    print(f"🧩 SHARD {k+1}/{n_shards}: {len(tickers)} assets", flush=True)
+    checkpoint_path = CHECKPOINT_FILE.replace(".jsonl", f".{k}-of-{n_shards}.jsonl")
+    partial = scan_candidates(tickers, fresh=fresh, checkpoint_path=checkpoint_path)
+    partial['scan_id'] = run_id or scan_id()
+    os.makedirs(shard_dir, exist_ok=True)
+    path = _shard_path(shard_dir, k, n_shards)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    partial.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+def merge_shards(n_shards, shard_dir=SHARD_DIR, run_id=None):
+    """Combines all partial tables of this scan (in universe order) and runs ranking + scoring + log."""
+    run_id = run_id or scan_id()
+    paths = [_shard_path(shard_dir, k, n_shards) for k in range(n_shards)]
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        print(f"❌ {len(missing)} shards missing (e.g. {missing[0]}). Run them first.")
+        return None
+    partials = [pd.read_parquet(p) for p in paths]
+    stale = [(p, sorted(set(df['scan_id'])) if 'scan_id' in df.columns else ['unstamped'])
+             for p, df in zip(paths, partials)
+             if 'scan_id' not in df.columns or (df['scan_id'] != run_id).any()]
+    if stale:
+        print(f"❌ {len(stale)} shards are not from scan {run_id} (e.g. {stale[0][0]}: {stale[0][1][0]}). Re-run them first.")
+        return None
+    combined = pd.concat(partials, ignore_index=True).drop(columns=['scan_id'])
+    order = {t: i for i, t in enumerate(get_universe())}
+    combined = combined.sort_values('symbol', key=lambda s: s.map(order)).reset_index(drop=True)
+    print(f"🧮 Merged {n_shards} shards ({len(combined)} assets, scan {run_id}).", flush=True)
+    finalize(combined, get_market_regime())
+    return combined
+
+def run_sharded(n_shards, fresh=False, shard_dir=SHARD_DIR, proxies=None):
+    """All shards as local processes, one egress proxy each, then the merge."""
+    proxies = SHARD_PROXIES if proxies is None else proxies
+    if n_shards > 1 and len(proxies) < n_shards:
+        print(f"⚠️ {n_shards} local shards need {n_shards} egress proxies in ORACLE_SHARD_PROXIES "
+              f"(found {len(proxies)}): on one egress they only split the same Yahoo budget. "
+              f"Running a single scan instead.", flush=True)
+        make_predictions(fresh=fresh)
+        return None
+    # One ID for the whole run, and no partials left over from an earlier one
+    run_id = f"{scan_id()}-{os.getpid()}"
+    for k in range(n_shards):
+        path = _shard_path(shard_dir, k, n_shards)
+        if os.path.exists(path): os.remove(path)
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=n_shards, mp_context=mp.get_context("spawn")) as executor:
+        futures = [executor.submit(run_shard, k, n_shards, shard_dir, fresh,
+                                   proxies[k] if k < len(proxies) else None, run_id)
+                   for k in range(n_shards)]
+        for future in futures:
+            future.result()
+    print(f"\n⏱️ {n_shards} shards scanned in {time.perf_counter() - t0:.0f}s.", flush=True)
+    return merge_shards(n_shards, shard_dir, run_id)
 
 if __name__ == "__main__":
-    make_predictions()
\ No newline at end of file
+    # --fresh ignores the checkpoint and re-audits every ticker
+    fresh = "--fresh" in sys.argv
+    if "--shards" in sys.argv:
+        # All shards on this machine, one proxy each: ORACLE_SHARD_PROXIES=http://a,http://b ... --shards 2
+        run_sharded(int(sys.argv[sys.argv.index("--shards") + 1]), fresh=fresh)
+    elif "--shard" in sys.argv:
+        # One shard per machine: --shard 2/4 (shard 2 of 4, zero-based), then --merge 4
+        k, n_shards = map(int, sys.argv[sys.argv.index("--shard") + 1].split("/"))
+        run_shard(k, n_shards, fresh=fresh)
+    elif "--merge" in sys.argv:
+        merge_shards(int(sys.argv[sys.argv.index("--merge") + 1]))
+    else:
+        make_predictions(fresh=fresh)
@@ -2,6 +2,7 @@ import pandas as pd
 import time
 from sector_map import SECTOR_MAP
 from valuation_logic import calculate_intrinsic_value
+from market_data import get_prices
 
 def scan_valuations():
     print(f"💎 Starting Valuation Scan for {len(SECTOR_MAP)} companies...")
@@ -10,16 +11,16 @@ def scan_valuations():
     results = []
     
     tickers = list(SECTOR_MAP.keys())
+    closes = get_prices(tickers, period="5d").ffill()
     
     for i, ticker in enumerate(tickers):
         print(f"   [{i+1}/{len(tickers)}] Analyzing {ticker}...", end=" ", flush=True)
         
         fair_value, is_undervalued, method = calculate_intrinsic_value(ticker)
         
-        # Get current price for context (using yfinance inside the loop is slow but simple)
+        # Current price for context (pre-fetched for the whole universe above)
         try:
-            import yfinance as yf
-            current_price = yf.Ticker(ticker).history(period='1d')['Close'].iloc[-1]
+            current_price = float(closes[ticker].dropna().iloc[-1])
         except:
             current_price = 0
             
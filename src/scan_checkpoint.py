@@ -0,0 +1,72 @@
+import json
+import os
+import threading
+
+import pandas as pd
+
+# --- CONFIG ---
+# Every settled audit stage (valuation, sentiment) is appended here as one JSON
+# line the moment it finishes, together with the inputs it was computed from
+# (statement date, news IDs). A crashed or throttled scan resumes from it, and a
+# re-run only asks Yahoo again for what may have changed.
+CHECKPOINT_FILE = os.environ.get("ORACLE_SCAN_CHECKPOINT", "scan_checkpoint.jsonl")
+CHECKPOINT_TTL_HOURS = 24   # Older records are ignored (tomorrow's scan starts clean)
+
+class ScanCheckpoint:
+    """Latest record per (ticker, stage), append-only on disk, thread-safe."""
+    def __init__(self, path=CHECKPOINT_FILE, ttl_hours=CHECKPOINT_TTL_HOURS, fresh=False):
+        self.path = path
+        self.ttl = pd.Timedelta(hours=ttl_hours)
+        self.lock = threading.Lock()
+        self.records = {} if fresh else self._load()
+        self.reused = 0
+
+    def _load(self):
+        records = {}
+        if not os.path.exists(self.path):
+            return records
+        cutoff = pd.Timestamp.now(tz="UTC") - self.ttl
+        with open(self.path, "r") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    if pd.Timestamp(record['checked']) >= cutoff:
+                        records[(record['ticker'], record['stage'])] = record
+                except (ValueError, KeyError):
+                    continue   # a line cut short by a crash
+        return records
+
+    def get(self, ticker, stage, max_age=None):
+        """Stored record, or None. With max_age (Timedelta): only if checked that recently."""
+        record = self.records.get((ticker, stage))
+        if record is not None and max_age is not None:
+            if pd.Timestamp.now(tz="UTC") - pd.Timestamp(record['checked']) > max_age:
+                return None
+        return record
+
+    def hit(self):
+        """Counts a stage answered from the checkpoint."""
+        with self.lock:
+            self.reused += 1
+
+    def put(self, ticker, stage, inputs, value):
+        record = {
+            'ticker': ticker, 'stage': stage,
+            'checked': pd.Timestamp.now(tz="UTC").isoformat(),
+            'inputs': inputs, 'value': value,
+        }
+        line = json.dumps(record, default=str)
+        with self.lock:
+            self.records[(ticker, stage)] = record
+            with open(self.path, "a") as f:
+                f.write(line + "\n")
+                f.flush()
+
+    def compact(self):
+        """Rewrites the file with one line per (ticker, stage)."""
+        with self.lock:
+            tmp = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                for record in self.records.values():
+                    f.write(json.dumps(record, default=str) + "\n")
+            os.replace(tmp, self.path)
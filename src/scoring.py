@@ -0,0 +1,77 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# --- CONFIG ---
+# Oracle_Score = 100 * (w_mom * Momentum_Rank + w_safe * Safety_Rank + w_val * Value_Rank)
+# with Value_Rank = clip(Upside_Pct + 0.2, 0, 1). Only 'Active' rows are scored.
+FACTORS = ['Momentum_Rank', 'Safety_Rank', 'Value_Rank']
+REGIME_WEIGHTS = {
+    'BULLISH': (0.18, 0.36, 0.36),
+}
+DEFENSIVE_WEIGHTS = (0.0, 0.90, 0.0)   # Bearish / neutral: safety only
+
+# Badges are stored as categorical codes (0/1) over these labels
+BADGE_THRESHOLD = 0.6
+SAFETY_BADGES = ["⚠️ MED", "🛡️ HIGH"]
+MOMENTUM_BADGES = ["🐢 SLOW", "🚀 FAST"]
+
+def regime_weights(regime_status):
+    return np.array(REGIME_WEIGHTS.get(regime_status, DEFENSIVE_WEIGHTS), dtype=np.float64)
+
+def factor_matrix(candidates):
+    """(n x 3) [Momentum_Rank, Safety_Rank, Value_Rank] from a candidate table."""
+    def column(name, default):
+        if name not in candidates.columns:
+            return np.full(len(candidates), default, dtype=np.float64)
+        return candidates[name].to_numpy(dtype=np.float64)
+    value = np.clip(column('Upside_Pct', 0.0) + 0.2, 0, 1)
+    return np.column_stack([column('Momentum_Rank', 0.5), column('Safety_Rank', 0.5), value])
+
+def composite_scores(factors, weights, active=None):
+    """
+    factors: (n x k) matrix; weights: one (k,) vector or an (m x k) matrix of
+    alternatives. Returns (n,) or (n x m) scores in one matrix product.
+    A NaN factor only makes the score NaN where it carries weight (0 * NaN would
+    poison it everywhere). Inactive rows score 0.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    missing = np.isnan(factors)
+    scores = np.where(missing, 0.0, factors) @ weights.T
+    scores[(missing.astype(np.float64) @ (weights != 0).T) > 0] = np.nan
+    if active is not None:
+        mask = np.asarray(active, dtype=bool)
+        scores[~mask] = 0.0
+    return scores
+
+def oracle_scores(candidates, regime_status):
+    """Oracle_Score (0-100, one decimal) for every row of the candidate table."""
+    active = (candidates['Status'] == 'Active').to_numpy()
+    scores = composite_scores(factor_matrix(candidates), regime_weights(regime_status), active)
+    return pd.Series(np.round(scores * 100, 1), index=candidates.index)
+
+def badges(candidates):
+    """Safety_Badge / Momentum_Badge as categoricals (rank above BADGE_THRESHOLD -> code 1)."""
+    def badge(name, labels):
+        ranks = candidates[name].to_numpy(dtype=np.float64) if name in candidates.columns else np.zeros(len(candidates))
+        with np.errstate(invalid='ignore'):
+            codes = (ranks > BADGE_THRESHOLD).astype(np.int8)
+        return pd.Categorical.from_codes(codes, categories=labels)
+    return pd.DataFrame({
+        'Safety_Badge': badge('Safety_Rank', SAFETY_BADGES),
+        'Momentum_Badge': badge('Momentum_Rank', MOMENTUM_BADGES),
+    }, index=candidates.index)
+
+def top_k_mean(scores, forward_returns, k=10):
+    """
+    For an (n x m) score matrix: mean forward return of each column's top-k rows
+    (ties keep row order). NaN scores never rank.
+    """
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    order = np.argsort(-scores, axis=0, kind='stable')[:k]
+    valid = np.take_along_axis(np.isfinite(scores), order, axis=0)
+    picked = np.where(valid, forward_returns[order], np.nan)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)   # all-NaN column -> NaN
+        return np.nanmean(picked, axis=0)
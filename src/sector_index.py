@@ -0,0 +1,86 @@
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from sector_map import SECTOR_MAP
+
+# Stand-in sector for symbols the map doesn't know (index, ETFs, bonds)
+UNMAPPED = "OTHER"
+
+class SectorIndex:
+    """
+    Symbol -> sector membership as a sparse (symbol x sector) 0/1 matrix, built once.
+    Sector aggregates for every bar are then a single matrix multiply:
+        sector_ret = (R * W) @ M / (valid * W) @ M
+    NaN returns (halted / not yet listed) drop out of both sides, so a gap in one
+    stock never turns its whole sector NaN.
+    """
+    def __init__(self, symbols, sector_map=None):
+        sector_map = SECTOR_MAP if sector_map is None else sector_map
+        self.symbols = list(symbols)
+        self.sectors = sorted({sector_map[s] for s in self.symbols if s in sector_map})
+        position = {sector: k for k, sector in enumerate(self.sectors)}
+
+        # -1 = not in the map
+        self.codes = np.array([position.get(sector_map.get(s), -1) for s in self.symbols], dtype=np.int64)
+        self.in_map = self.codes >= 0
+        rows = np.flatnonzero(self.in_map)
+        self.membership = sparse.csr_array(
+            (np.ones(len(rows)), (rows, self.codes[rows])),
+            shape=(len(self.symbols), len(self.sectors))
+        )
+
+    def _dense(self, values):
+        if isinstance(values, pd.DataFrame):
+            values = values.reindex(columns=self.symbols).to_numpy(dtype=np.float64)
+        elif isinstance(values, pd.Series):
+            values = values.reindex(self.symbols).to_numpy(dtype=np.float64)
+        return np.asarray(values, dtype=np.float64)
+
+    def returns(self, returns, weights=None):
+        """
+        (time x sector) returns from (time x symbol) returns.
+        weights: None (equal), a per-symbol vector (e.g. market cap) or a (time x symbol)
+        matrix (e.g. volume). Lag time-varying weights by a bar to avoid look-ahead.
+        """
+        index = returns.index if isinstance(returns, pd.DataFrame) else None
+        r = np.atleast_2d(self._dense(returns))
+        valid = ~np.isnan(r)
+        if weights is None:
+            w = valid.astype(np.float64)
+        else:
+            w = np.broadcast_to(np.nan_to_num(self._dense(weights)), r.shape) * valid
+        num = np.where(valid, r, 0.0) * w @ self.membership
+        den = w @ self.membership
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out = np.where(den > 0, num / den, np.nan)
+        return pd.DataFrame(out, index=index, columns=self.sectors) if index is not None else out
+
+    def own(self, sector_values):
+        """Each symbol's own sector column, gathered back onto the symbols (NaN if unmapped)."""
+        if isinstance(sector_values, pd.DataFrame):
+            sector_values = sector_values.reindex(columns=self.sectors).to_numpy(dtype=np.float64)
+        sector_values = np.atleast_2d(sector_values)
+        if not self.sectors:
+            return np.full((len(sector_values), len(self.symbols)), np.nan)
+        out = sector_values[:, np.maximum(self.codes, 0)]
+        out[:, ~self.in_map] = np.nan
+        return out
+
+    def aggregate(self, values, how="mean"):
+        """Cross-sectional per-sector 'mean' or 'sum' of one value per symbol (NaN-aware)."""
+        v = self._dense(values)
+        valid = ~np.isnan(v)
+        total = np.where(valid, v, 0.0) @ self.membership
+        if how == "sum":
+            return pd.Series(total, index=self.sectors)
+        count = valid.astype(np.float64) @ self.membership
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return pd.Series(np.where(count > 0, total / count, np.nan), index=self.sectors)
+
+    def mapper(self, default=UNMAPPED):
+        """{symbol: sector} with unmapped symbols under `default` (pypfopt sector constraints)."""
+        return {s: self.sectors[c] if c >= 0 else default for s, c in zip(self.symbols, self.codes)}
+
+    def counts(self):
+        return pd.Series(self.membership.sum(axis=0), index=self.sectors).astype(int)
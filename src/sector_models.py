@@ -0,0 +1,127 @@
+import multiprocessing as mp
+import os
+import re
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from feature_engineering import FEATURE_COLUMNS
+from feature_store import FEATURE_SET_VERSION, update_feature_store, load_features
+from model_registry import save_model, load_model
+from sector_index import SectorIndex, UNMAPPED
+from sector_map import SECTOR_MAP
+from train_model import BOOSTER_PARAMS, NUM_BOOST_ROUND, TEST_FRACTION, evaluate, print_sniper_report, get_model
+
+warnings.filterwarnings("ignore")
+
+# --- CONFIG ---
+# One model per sector cluster instead of one global model. Tiny sectors ride
+# along with a related one; anything still under MIN_CLUSTER_SYMBOLS names (and
+# unmapped symbols) shares the UNMAPPED cluster. A cluster without a registered
+# model is scored by the global model.
+SECTOR_CLUSTERS = {
+    'Forest Materials': 'Materials',
+    'Textiles': 'Consumer',
+    'Media Entertainment & Publication': 'Services',
+}
+MIN_CLUSTER_SYMBOLS = 10
+
+# Clusters are independent: each trains in its own process with a fixed thread count
+THREADS_PER_MODEL = 2
+WORKERS = max(1, (os.cpu_count() or 1) // THREADS_PER_MODEL)
+
+def registry_name(cluster):
+    return "sector_" + re.sub(r"[^a-z0-9]+", "_", cluster.lower()).strip("_")
+
+def cluster_map(symbols, sector_map=None):
+    """{symbol: cluster} for the given symbols. Cluster sizes count the whole map, not just `symbols`."""
+    sector_map = SECTOR_MAP if sector_map is None else sector_map
+    sizes = pd.Series([SECTOR_CLUSTERS.get(sector, sector) for sector in sector_map.values()]).value_counts()
+    sectors = SectorIndex([str(s) for s in symbols], sector_map).mapper(default=UNMAPPED)
+    clusters = {s: SECTOR_CLUSTERS.get(sector, sector) for s, sector in sectors.items()}
+    return {s: c if sizes.get(c, 0) >= MIN_CLUSTER_SYMBOLS else UNMAPPED for s, c in clusters.items()}
+
+def _train_cluster(cluster, rows):
+    """Worker: fits one cluster on its oldest rows, scores the newest TEST_FRACTION of its bars."""
+    t0 = time.perf_counter()
+    times = rows.index.unique().sort_values()
+    cut = times[int(len(times) * (1 - TEST_FRACTION))]
+    train, test = rows[rows.index < cut], rows[rows.index >= cut]
+    dtrain = xgb.QuantileDMatrix(train[FEATURE_COLUMNS].to_numpy(dtype=np.float32), label=train['target'].to_numpy(),
+                                 feature_names=FEATURE_COLUMNS, nthread=THREADS_PER_MODEL)
+    booster = xgb.train(dict(BOOSTER_PARAMS, nthread=THREADS_PER_MODEL), dtrain, num_boost_round=NUM_BOOST_ROUND)
+    confidence = booster.inplace_predict(test[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+    return {
+        'cluster': cluster,
+        'model': booster.save_raw("ubj"),
+        'train_start': train.index.min(), 'train_end': train.index.max(),
+        'confidence': confidence, 'actual': test['target'].to_numpy(),
+        'seconds': time.perf_counter() - t0,
+    }
+
+def train_sector_models(df=None, workers=WORKERS):
+    """Trains and registers one model per cluster in a process pool. Returns {cluster: version}."""
+    # 1. Data
+    if df is None:
+        update_feature_store()
+        df = load_features()
+    if df.empty:
+        print("❌ Dataset empty. Check database or ingestion.")
+        return {}
+    symbols = df['symbol'].astype(str)
+    clusters = symbols.map(cluster_map(symbols.unique()))
+
+    # 2. Biggest clusters first, so the pool's tail is short
+    groups = sorted(df.groupby(clusters.to_numpy()), key=lambda g: -len(g[1]))
+    print(f"🏭 Training {len(groups)} sector models on {workers} workers x {THREADS_PER_MODEL} threads...")
+    t0 = time.perf_counter()
+    versions, confidence, actual = {}, [], []
+    with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn")) as executor:
+        futures = [executor.submit(_train_cluster, cluster, rows) for cluster, rows in groups]
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"   ⚠️ Sector model failed: {e}")
+                continue
+            booster = xgb.Booster()
+            booster.load_model(bytearray(result['model']))
+            metrics = evaluate(result['confidence'], result['actual'])
+            versions[result['cluster']] = save_model(
+                booster, FEATURE_COLUMNS, result['train_start'], result['train_end'], FEATURE_SET_VERSION,
+                metrics=metrics, params=BOOSTER_PARAMS, name=registry_name(result['cluster']),
+                extra={'cluster': result['cluster']})
+            confidence.append(result['confidence'])
+            actual.append(result['actual'])
+            print(f"   ✅ {result['cluster']:<20} logloss {metrics.get('logloss', float('nan')):.4f} "
+                  f"({len(result['actual'])} test rows, {result['seconds']:.0f}s)")
+
+    print(f"\n🧮 ALL SECTORS (held-out, trained in {time.perf_counter() - t0:.0f}s)")
+    if actual:
+        print_sniper_report(np.concatenate(confidence), np.concatenate(actual))
+    return versions
+
+def predict_routed(rows, sector_map=None):
+    """
+    Confidence per row of `rows` (feature rows with a 'symbol' column): each symbol is
+    routed to its cluster's model, one batched inplace_predict per cluster.
+    Clusters without a compatible registered model fall back to the global model.
+    """
+    symbols = rows['symbol'].astype(str).to_numpy()
+    clusters = pd.Series(symbols).map(cluster_map(np.unique(symbols), sector_map)).to_numpy()
+    confidence = np.full(len(rows), np.nan, dtype=np.float32)
+    X = np.ascontiguousarray(rows[FEATURE_COLUMNS].to_numpy(dtype=np.float32))
+    for cluster in np.unique(clusters):
+        booster, meta = load_model(name=registry_name(cluster))
+        if booster is None or meta.get('feature_set_version') != FEATURE_SET_VERSION or meta.get('features') != FEATURE_COLUMNS:
+            booster, meta = get_model()
+        routed = clusters == cluster
+        confidence[routed] = booster.inplace_predict(X[routed])
+    return pd.Series(confidence, index=symbols)
+
+if __name__ == "__main__":
+    train_sector_models()
@@ -1,4 +1,4 @@
-import yfinance as yf
+import yahoo_client as yf
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 import warnings
 
@@ -16,35 +16,37 @@ class NewsSentimentEngine:
         try:
             # Ticker object
             stock = yf.Ticker(ticker)
-            news_list = stock.news
-            
-            if not news_list:
-                return 0.0, 0, "No news found."
-
-            total_score = 0
-            count = 0
-            headlines = []
-
-            for article in news_list:
-                title = article.get('title', '')
-                if title:
-                    score = self.vader.polarity_scores(title)['compound']
-                    total_score += score
-                    count += 1
-                    headlines.append(title)
-            
-            if count == 0:
-                return 0.0, 0, "No valid headlines."
-
-            avg_score = total_score / count
-            top_headline = headlines[0] if headlines else "N/A"
-            
-            return avg_score, count, top_headline
+            return self.score_articles(stock.news)
 
         except Exception as e:
             # Fail gracefully so the bot doesn't crash
             return 0.0, 0, f"Error: {str(e)}"
 
+    def score_articles(self, news_list):
+        """Scores an already-fetched news list (same return values as get_sentiment)."""
+        if not news_list:
+            return 0.0, 0, "No news found."
+
+        total_score = 0
+        count = 0
+        headlines = []
+
+        for article in news_list:
+            title = article.get('title', '')
+            if title:
+                score = self.vader.polarity_scores(title)['compound']
+                total_score += score
+                count += 1
+                headlines.append(title)
+        
+        if count == 0:
+            return 0.0, 0, "No valid headlines."
+
+        avg_score = total_score / count
+        top_headline = headlines[0] if headlines else "N/A"
+        
+        return avg_score, count, top_headline
+
 if __name__ == "__main__":
     # Quick Test
     engine = NewsSentimentEngine()
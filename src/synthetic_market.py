@@ -0,0 +1,243 @@
+import argparse
+import os
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from sector_map import SECTOR_MAP
+from feature_engineering import PanelMatrix
+
+warnings.filterwarnings("ignore")
+
+# --- CONFIG ---
+# Bars per trading year, used to scale annual vols down to one bar
+BARS_PER_YEAR = {"1h": 252 * 7, "1d": 252, "1wk": 52}
+MARKET_VOL = 0.18        # Annualised vol of the market factor
+SECTOR_VOL = 0.12        # Annualised vol of each sector factor
+IDIO_VOL = (0.15, 0.45)  # Range of annualised idiosyncratic vols
+INDEX_SYMBOL = "^NSEI"
+FIELDS = ("open", "high", "low", "close", "volume")
+
+HEADLINES = {
+    1: ["{name} beats estimates as margins expand", "{name} wins record order book",
+        "Analysts upgrade {name} on strong demand", "{name} announces buyback"],
+    0: ["{name} to hold board meeting next week", "{name} files quarterly results",
+        "{name} management comments on outlook"],
+    -1: ["{name} misses estimates, shares slide", "Regulator probes {name} accounts",
+         "{name} cuts guidance amid weak demand", "Promoter pledge rises at {name}"],
+}
+
+class SyntheticMarket:
+    """A generated universe: prices as a PanelMatrix plus sectors, fundamentals and news."""
+    def __init__(self, panel, sector_map, fundamentals, headlines, interval):
+        self.panel = panel
+        self.sector_map = sector_map
+        self.fundamentals = fundamentals
+        self.headlines = headlines
+        self.interval = interval
+
+    def long_frame(self, symbols=None):
+        """market_data-shaped rows (time, symbol, open, ..., volume) for the given symbols."""
+        symbols = symbols or self.panel.symbols
+        frames = []
+        for symbol in symbols:
+            j = self.panel.symbol_index[symbol]
+            frame = pd.DataFrame({f: self.panel.fields[f][:, j].astype(np.float64) for f in FIELDS})
+            frame.insert(0, 'symbol', symbol)
+            frame.insert(0, 'time', self.panel.times)
+            frames.append(frame)
+        out = pd.concat(frames, ignore_index=True)
+        out['is_adjusted'] = True
+        return out
+
+def _trading_times(n_bars, interval, end):
+    """NSE-shaped timestamps (UTC) ending at `end`."""
+    end = pd.Timestamp(end).tz_convert("UTC") if pd.Timestamp(end).tzinfo else pd.Timestamp(end, tz="UTC")
+    if interval == "1h":
+        # Yahoo's hourly NSE bars open at 09:15 IST (03:45 UTC), seven per session
+        days_needed = n_bars // 7 + 3
+        days = pd.bdate_range(end=end.normalize(), periods=days_needed, tz="UTC")
+        offsets = pd.to_timedelta([3 * 60 + 45 + 60 * h for h in range(7)], unit="min")
+        times = pd.DatetimeIndex((days.tz_localize(None).values[:, None] + offsets.values[None, :]).ravel(), tz="UTC")
+        return times[times <= end][-n_bars:]
+    freq = "W-MON" if interval == "1wk" else "B"
+    return pd.date_range(end=end.normalize(), periods=n_bars, freq=freq, tz="UTC")
+
+def _sector_universe(n_symbols, rng):
+    """Synthetic symbols spread over the real sectors, in the real proportions."""
+    counts = pd.Series(SECTOR_MAP).value_counts(normalize=True)
+    sectors = rng.choice(counts.index.to_numpy(), size=n_symbols, p=counts.to_numpy())
+    width = max(5, len(str(n_symbols)))
+    return {f"SYN{i:0{width}d}.NS": str(sectors[i]) for i in range(n_symbols)}
+
+def generate_market(n_symbols=500, n_bars=2000, interval="1h", seed=42, end=None):
+    """
+    Sector-correlated OHLCV from a one-market + one-sector factor model:
+        r[t, s] = beta_m[s] * f_m[t] + beta_s[s] * f_sector[t] + sigma[s] * eps[t, s]
+    Deterministic for a given seed. Prices are float32, like the real read path.
+    """
+    rng = np.random.default_rng(seed)
+    scale = 1 / np.sqrt(BARS_PER_YEAR.get(interval, 252))
+
+    sector_map = _sector_universe(n_symbols, rng)
+    symbols = list(sector_map)
+    sectors = sorted(set(sector_map.values()))
+    sector_codes = np.array([sectors.index(sector_map[s]) for s in symbols])
+
+    # 1. Factor returns
+    f_market = rng.normal(0.08 / BARS_PER_YEAR.get(interval, 252), MARKET_VOL * scale, n_bars)
+    f_sector = rng.normal(0.0, SECTOR_VOL * scale, (n_bars, len(sectors)))
+
+    # 2. Loadings, idiosyncratic noise (float32 keeps 5,000 x years of bars in RAM)
+    beta_m = rng.uniform(0.6, 1.4, n_symbols).astype(np.float32)
+    beta_s = rng.uniform(0.3, 1.0, n_symbols).astype(np.float32)
+    sigma = (rng.uniform(*IDIO_VOL, n_symbols) * scale).astype(np.float32)
+    returns = rng.standard_normal((n_bars, n_symbols), dtype=np.float32)
+    returns *= sigma
+    returns += np.outer(f_market, beta_m).astype(np.float32)
+    returns += f_sector[:, sector_codes].astype(np.float32) * beta_s
+
+    # 3. Prices -> OHLC
+    start_price = np.exp(rng.uniform(np.log(50), np.log(5000), n_symbols)).astype(np.float32)
+    close = start_price * np.exp(np.cumsum(returns, axis=0, dtype=np.float32))
+    prev_close = np.vstack([start_price[None, :], close[:-1]])
+    open_ = prev_close * np.exp(rng.normal(0, 0.2, (n_bars, n_symbols)).astype(np.float32) * sigma)
+    wick = np.abs(rng.normal(0, 0.5, (2, n_bars, n_symbols))).astype(np.float32) * sigma
+    high = np.maximum(open_, close) * np.exp(wick[0])
+    low = np.minimum(open_, close) * np.exp(-wick[1])
+
+    # 4. Volume: liquidity tier x activity spike on big moves
+    base_volume = np.exp(rng.uniform(np.log(1e4), np.log(5e6), n_symbols)).astype(np.float32)
+    volume = base_volume * rng.lognormal(0, 0.3, (n_bars, n_symbols)).astype(np.float32)
+    volume *= 1 + 3 * np.abs(returns) / sigma
+    del returns, wick
+
+    # 5. Cap-weighted index built from the universe itself
+    caps = start_price * base_volume
+    index_ret = f_market + (f_sector[:, sector_codes] * beta_s) @ (caps / caps.sum())
+    index_close = (10000 * np.exp(np.cumsum(index_ret))).astype(np.float32)
+    index_open = np.concatenate([[10000], index_close[:-1]]).astype(np.float32)
+
+    def with_index(matrix, column):
+        return np.hstack([matrix, column[:, None]])
+
+    fields = {
+        "open": with_index(open_, index_open),
+        "high": with_index(high, np.maximum(index_open, index_close)),
+        "low": with_index(low, np.minimum(index_open, index_close)),
+        "close": with_index(close, index_close),
+        "volume": with_index(volume, np.zeros(n_bars, dtype=np.float32)),
+    }
+    times = _trading_times(n_bars, interval, end or pd.Timestamp.now(tz="UTC"))
+    times.name = "time"
+    panel = PanelMatrix(times, symbols + [INDEX_SYMBOL], fields)
+
+    # 6. Fundamentals + headlines share a latent "quality" so they agree with each other
+    quality = rng.normal(0, 1, n_symbols)
+    f_score = np.clip(np.round(4.5 + 1.8 * quality + rng.normal(0, 1, n_symbols)), 0, 9).astype(int)
+    fair_value = close[-1] * np.exp(0.1 + 0.25 * quality + rng.normal(0, 0.2, n_symbols))
+    fundamentals = pd.DataFrame({
+        'symbol': symbols,
+        'sector': [sector_map[s] for s in symbols],
+        'F_Score': f_score,
+        'fair_value': np.round(fair_value, 2),
+        'sharesOutstanding': (caps / close[-1] * 1e3).astype(np.int64),
+    })
+
+    headlines = {}
+    publish_end = int(times[-1].timestamp())
+    for i, symbol in enumerate(symbols):
+        tone = np.clip(np.round(quality[i] + rng.normal(0, 0.7, 6)), -1, 1).astype(int)
+        name = symbol.replace(".NS", "")
+        headlines[symbol] = [
+            {
+                'uuid': f"{name}-{k}",
+                'title': rng.choice(HEADLINES[t]).format(name=name),
+                'providerPublishTime': publish_end - k * 3600 * 6,
+            }
+            for k, t in enumerate(tone)
+        ]
+
+    return SyntheticMarket(panel, sector_map, fundamentals, headlines, interval)
+
+# --- WRITERS ---
+def to_database(market, batch_symbols=50):
+    """Bulk-loads the bars into market_data through the ingest COPY path."""
+    import psycopg2
+    from ingest_data import DB_CONFIG, bulk_load
+    if market.interval != "1h":
+        print(f"⚠️ market_data holds hourly candles; writing {market.interval} bars anyway.")
+    conn = psycopg2.connect(**DB_CONFIG)
+    symbols = market.panel.symbols
+    total = 0
+    for i in range(0, len(symbols), batch_symbols):
+        total += bulk_load(conn, market.long_frame(symbols[i:i + batch_symbols]))
+        print(f"   📦 {min(i + batch_symbols, len(symbols))}/{len(symbols)} symbols loaded...", end="\r")
+    conn.close()
+    print(f"\n✅ {total} synthetic candles written to market_data.")
+
+def to_cache(market):
+    """Writes each symbol into the shared Parquet price cache (market_data provider)."""
+    from market_data import _save_partition
+    times = market.panel.times.tz_convert("UTC").tz_localize(None)
+    coverage = (times[0], times[-1] + pd.Timedelta(seconds=1))
+    for symbol in market.panel.symbols:
+        j = market.panel.symbol_index[symbol]
+        frame = pd.DataFrame(
+            {f.title(): market.panel.fields[f][:, j].astype(np.float64) for f in FIELDS}, index=times
+        )
+        frame.index.name = "time"
+        _save_partition(symbol, market.interval, frame, coverage)
+    print(f"✅ {len(market.panel.symbols)} symbols written to the Parquet cache.")
+
+def _dcf_multiple(growth=0.12, discount=0.10, terminal_multiple=15, years=5):
+    """Per-share value / per-share cash flow under valuation_logic's 2-stage DCF."""
+    discounted = [((1 + growth) / (1 + discount)) ** y for y in range(1, years + 1)]
+    return sum(discounted) + discounted[-1] * terminal_multiple / (1 + discount) ** years
+
+def to_fixtures(market):
+    """
+    Writes info, news and annual statements (financials + cashflow) into the
+    yahoo_client replay store. The statements are sized so get_intrinsic_value's
+    DCF lands on each symbol's generated fair_value.
+    """
+    import yahoo_client
+    fundamentals = market.fundamentals.set_index('symbol')
+    # Last four fiscal year ends (March, Indian convention) before the final bar, newest first
+    last = market.panel.times[-1].tz_localize(None)
+    year_ends = [pd.Timestamp(year=last.year - (last.month < 4) - k, month=3, day=31) for k in range(4)]
+    multiple = _dcf_multiple()
+    for symbol, articles in market.headlines.items():
+        row = fundamentals.loc[symbol]
+        info = {'sector': row['sector'], 'industry': row['sector'], 'sharesOutstanding': int(row['sharesOutstanding'])}
+        cash = row['fair_value'] * row['sharesOutstanding'] / multiple
+        history = [cash / 1.12 ** k for k in range(len(year_ends))]
+        # Banks are valued on Net Income, the rest on OCF + Capex: both come out at `cash`
+        financials = pd.DataFrame([history], index=['Net Income'], columns=year_ends)
+        cashflow = pd.DataFrame([[c * 1.25 for c in history], [-c * 0.25 for c in history]],
+                                index=['Operating Cash Flow', 'Capital Expenditure'], columns=year_ends)
+        answers = {'info': info, 'news': articles, 'financials': financials, 'cashflow': cashflow}
+        for name, value in answers.items():
+            yahoo_client._save(yahoo_client._fixture_path("ticker", symbol, name), value)
+    print(f"✅ Info, headlines and statements for {len(market.headlines)} symbols written to {yahoo_client.FIXTURE_DIR}.")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic market generator for scale tests")
+    parser.add_argument("--symbols", type=int, default=5000)
+    parser.add_argument("--bars", type=int, default=2000)
+    parser.add_argument("--interval", default="1h", choices=sorted(BARS_PER_YEAR))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--target", default="cache", choices=["cache", "database", "fixtures", "all"])
+    parser.add_argument("--fundamentals-csv", default=None, help="Also write F-Scores here (fundamental_data.csv format)")
+    args = parser.parse_args()
+
+    print(f"🧪 Generating {args.symbols} symbols x {args.bars} {args.interval} bars (seed {args.seed})...")
+    market = generate_market(args.symbols, args.bars, args.interval, args.seed)
+    if args.target in ("cache", "all"): to_cache(market)
+    if args.target in ("database", "all"): to_database(market)
+    if args.target in ("fixtures", "all"): to_fixtures(market)
+    if args.fundamentals_csv:
+        os.makedirs(os.path.dirname(args.fundamentals_csv) or ".", exist_ok=True)
+        market.fundamentals[['symbol', 'F_Score']].to_csv(args.fundamentals_csv, index=False)
+        print(f"✅ F-Scores written to {args.fundamentals_csv}.")
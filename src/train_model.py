@@ -1,44 +1,193 @@
+import sys
+import numpy as np
 import pandas as pd
+import pyarrow.parquet as pq
 import xgboost as xgb
 from sklearn.metrics import accuracy_score
-from feature_engineering import build_master_dataset
+from feature_engineering import FEATURE_COLUMNS, build_master_dataset, build_master_dataset_chunked
+from feature_store import FEATURE_SET_VERSION, update_feature_store, load_features, month_files
+from model_registry import save_model, load_model
 
-def train_ai_model(return_model=False):
+# Train from the persisted feature store (only new bars are computed each run).
+# False = rebuild every feature from scratch, as before.
+USE_FEATURE_STORE = True
+
+# Out-of-core mode: Parquet parts are streamed into a QuantileDMatrix one file at a
+# time, so the full dataset is never in RAM (multi-year hourly panels).
+OUT_OF_CORE = False
+TEST_FRACTION = 0.2
+SNIPER_THRESHOLDS = [0.50, 0.51, 0.52, 0.53, 0.54, 0.55]
+
+# Same model as the in-memory XGBClassifier, in native-API form
+BOOSTER_PARAMS = {
+    'objective': 'binary:logistic',
+    'eval_metric': 'logloss',
+    'eta': 0.05,
+    'max_depth': 3,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'tree_method': 'hist',
+    'seed': 42,
+}
+NUM_BOOST_ROUND = 300
+
+# Model registry: every full training run is saved, and scoring loads the latest
+# booster instead of retraining. continue_training() adds WARM_START_ROUNDS trees
+# on the bars that arrived since the model's training window (xgb_model=).
+REGISTER_MODELS = True
+WARM_START_ROUNDS = 50
+MIN_NEW_ROWS = 500
+
+class ParquetBatches(xgb.DataIter):
+    """Feeds XGBoost one Parquet file at a time (only FEATURE_COLUMNS + target are read)."""
+    def __init__(self, files):
+        self.files = files
+        self.position = 0
+        super().__init__()
+
+    def next(self, input_data):
+        if self.position == len(self.files):
+            return False
+        batch = pd.read_parquet(self.files[self.position], columns=FEATURE_COLUMNS + ['target'])
+        input_data(data=batch[FEATURE_COLUMNS].to_numpy(dtype=np.float32), label=batch['target'].to_numpy(),
+                   feature_names=FEATURE_COLUMNS)
+        self.position += 1
+        return True
+
+    def reset(self):
+        self.position = 0
+
+def split_files(files, test_fraction=TEST_FRACTION):
+    """Time-ordered files -> (train, test); the newest ~test_fraction of rows is held out."""
+    rows = [pq.ParquetFile(f).metadata.num_rows for f in files]
+    held, cut = 0, len(files)
+    while cut > 1 and held < sum(rows) * test_fraction:
+        cut -= 1
+        held += rows[cut]
+    return files[:cut], files[cut:]
+
+def sniper_table(confidence, actual):
+    """[(threshold, trades, win_rate or None)]: win rate of the trades above each threshold."""
+    table = []
+    for t in SNIPER_THRESHOLDS:
+        hits = actual[confidence > t]
+        win_rate = accuracy_score(hits, [1]*len(hits)) if len(hits) > 30 else None
+        table.append((t, len(hits), win_rate))
+    return table
+
+def print_sniper_report(confidence, actual):
+    print("\n🎯 SNIPER SCOPE CALIBRATION")
+    print(f"{'THRESHOLD':<10} | {'TRADES':<10} | {'WIN RATE':<10}")
+    print("-" * 35)
+    for t, trades, win_rate in sniper_table(confidence, actual):
+        if win_rate is not None:
+            print(f"{t:.2f}       | {trades:<10} | {win_rate:.2%}")
+        else:
+            print(f"{t:.2f}       | {trades:<10} | (Not enough data)")
+
+def evaluate(confidence, actual):
+    """Held-out metrics stored with a registered model."""
+    confidence = np.clip(np.asarray(confidence, dtype=np.float64), 1e-7, 1 - 1e-7)
+    actual = np.asarray(actual, dtype=np.float64)
+    if len(actual) == 0:
+        return {}
+    return {
+        'rows': int(len(actual)),
+        'logloss': float(-np.mean(actual * np.log(confidence) + (1 - actual) * np.log(1 - confidence))),
+        'accuracy': float(np.mean((confidence > 0.5) == (actual == 1))),
+        'sniper': {f"{t:.2f}": {'trades': trades, 'win_rate': win_rate}
+                   for t, trades, win_rate in sniper_table(confidence, actual)},
+    }
+
+def _file_window(files):
+    times = [pq.read_table(f, columns=['time']).column('time') for f in (files[0], files[-1])]
+    return pd.Timestamp(times[0].to_pandas().min()), pd.Timestamp(times[-1].to_pandas().max())
+
+def train_out_of_core(files, return_model=False):
+    """
+    Trains on Parquet files without loading them together. Returns the xgb.Booster.
+    Memory stays around one file + the quantised matrix (1 byte per cell).
+    """
+    if not files:
+        print("❌ No feature parts to train on.")
+        return None
+    train_files, test_files = split_files(files)
+    train_matrix = xgb.QuantileDMatrix(ParquetBatches(train_files))
+    if not return_model:
+        print(f"🔥 Training XGBoost on {train_matrix.num_row()} rows ({len(train_files)} parts, out-of-core)...")
+    booster = xgb.train(BOOSTER_PARAMS, train_matrix, num_boost_round=NUM_BOOST_ROUND)
+
+    confidence, actual = [], []
+    for path in test_files:
+        batch = pd.read_parquet(path, columns=FEATURE_COLUMNS + ['target'])
+        confidence.append(booster.inplace_predict(batch[FEATURE_COLUMNS].to_numpy(dtype=np.float32)))
+        actual.append(batch['target'].to_numpy())
+    confidence, actual = np.concatenate(confidence), np.concatenate(actual)
+
+    if REGISTER_MODELS:
+        train_start, train_end = _file_window(train_files)
+        version = save_model(booster, FEATURE_COLUMNS, train_start, train_end, FEATURE_SET_VERSION,
+                             metrics=evaluate(confidence, actual), params=BOOSTER_PARAMS)
+        print(f"💾 Registered model {version}.")
+
+    if not return_model:
+        print_sniper_report(confidence, actual)
+
+        print("\n🧠 Feature Importance (What is the AI looking at?):")
+        gain = booster.get_score(importance_type='gain')
+        importance = pd.DataFrame({
+            'Feature': FEATURE_COLUMNS,
+            'Importance': [gain.get(f, 0.0) for f in FEATURE_COLUMNS]
+        })
+        importance['Importance'] /= importance['Importance'].sum() or 1.0
+        print(importance.sort_values(by='Importance', ascending=False))
+
+    if return_model:
+        return booster
+
+def train_ai_model(return_model=False, dataset=None):
     """
     Trains the Institutional AI model.
     - return_model=True: Returns the trained model (for predict_daily.py).
     - return_model=False: Prints the Sniper Report AND Feature Importance (for manual testing).
+    - dataset: a prebuilt master dataset (skips build_master_dataset, is not registered).
+    OUT_OF_CORE streams Parquet parts instead (returns an xgb.Booster).
+    Models trained on the stored history are saved to the model registry.
     """
     if not return_model:
         print("⛽️ Injecting Sector-Aware + Fundamental Fuel...")
     
     # 1. Build the Dataset
-    df = build_master_dataset()
+    if dataset is None and OUT_OF_CORE:
+        if USE_FEATURE_STORE:
+            update_feature_store()
+            files = month_files()
+        else:
+            files = build_master_dataset_chunked()
+        return train_out_of_core(files, return_model)
+    if dataset is not None:
+        df = dataset
+    elif USE_FEATURE_STORE:
+        update_feature_store()
+        df = load_features()
+    else:
+        df = build_master_dataset()
     
     if df.empty:
         print("❌ Dataset empty. Check database or ingestion.")
         return None
 
-    # 2. Split Data (Strict Time-Based Split)
-    split_point = int(len(df) * 0.8)
-    train_df = df.iloc[:split_point]
-    test_df = df.iloc[split_point:]
-    
-    # THE COMPLETE FEATURE LIST
-    features = [
-        'log_return',           # Momentum
-        'RSI',                  # Overbought/Oversold
-        'BB_Width',             # Volatility Squeeze
-        'Volume_Ratio',         # Liquidity Spikes
-        'Market_Rel_Strength',  # Alpha vs Nifty 50
-        'Sector_Rel_Strength',  # Alpha vs Sector
-        'F_Score'               # Fundamental Health (Piotroski)
-    ]
+    # 2. Split Data (Strict Time-Based Split): rows are grouped by symbol, so cut on
+    # the time axis. Every bar before the cut trains; the cut is what gets registered.
+    times = df.index.unique().sort_values()
+    cut = times[int(len(times) * (1 - TEST_FRACTION))]
+    train_df = df[df.index < cut]
+    test_df = df[df.index >= cut]
     target = 'target'
     
-    X_train = train_df[features]
+    X_train = train_df[FEATURE_COLUMNS]
     y_train = train_df[target]
-    X_test = test_df[features]
+    X_test = test_df[FEATURE_COLUMNS]
     y_test = test_df[target]
     
     if not return_model:
@@ -64,28 +213,21 @@ def train_ai_model(return_model=False):
     test_df = test_df.copy()
     test_df['confidence'] = probs
     test_df['actual_target'] = y_test
+
+    if REGISTER_MODELS and dataset is None:
+        version = save_model(model, FEATURE_COLUMNS, train_df.index.min(), train_df.index.max(), FEATURE_SET_VERSION,
+                             metrics=evaluate(probs, y_test.to_numpy()), params=BOOSTER_PARAMS)
+        print(f"💾 Registered model {version}.")
     
     # --- REPORTING (Only runs if we are NOT asking for the model) ---
     if not return_model:
         # 6. Sniper Scope Calibration
-        print("\n🎯 SNIPER SCOPE CALIBRATION")
-        print(f"{'THRESHOLD':<10} | {'TRADES':<10} | {'WIN RATE':<10}")
-        print("-" * 35)
-        
-        thresholds = [0.50, 0.51, 0.52, 0.53, 0.54, 0.55]
-        
-        for t in thresholds:
-            sniper_trades = test_df[test_df['confidence'] > t]
-            if len(sniper_trades) > 30:
-                win_rate = accuracy_score(sniper_trades['actual_target'], [1]*len(sniper_trades))
-                print(f"{t:.2f}       | {len(sniper_trades):<10} | {win_rate:.2%}")
-            else:
-                print(f"{t:.2f}       | {len(sniper_trades):<10} | (Not enough data)")
+        print_sniper_report(test_df['confidence'].to_numpy(), test_df['actual_target'].to_numpy())
 
         # 7. Feature Importance Analysis (THIS WAS MISSING)
         print("\n🧠 Feature Importance (What is the AI looking at?):")
         importance = pd.DataFrame({
-            'Feature': features,
+            'Feature': FEATURE_COLUMNS,
             'Importance': model.feature_importances_
         }).sort_values(by='Importance', ascending=False)
         print(importance)
@@ -94,5 +236,63 @@ def train_ai_model(return_model=False):
     if return_model:
         return model
 
+def _usable(meta):
+    return (meta is not None and meta.get('feature_set_version') == FEATURE_SET_VERSION
+            and meta.get('features') == FEATURE_COLUMNS)
+
+def get_model():
+    """
+    (xgb.Booster, meta) for scoring: the latest registered model, loaded in milliseconds.
+    Trains (and registers) one only if none exists or the feature set has changed.
+    """
+    booster, meta = load_model()
+    if booster is not None and _usable(meta):
+        return booster, meta
+    print("⚠️ No usable registered model. Training one...")
+    train_ai_model(return_model=True)
+    return load_model()
+
+def continue_training(rounds=WARM_START_ROUNDS):
+    """
+    Warm start: boosts `rounds` more trees on the feature rows that arrived after the
+    latest model's training window and registers the result as a child version.
+    Falls back to a full training run when there is no compatible model.
+    """
+    booster, meta = load_model()
+    if booster is None or not _usable(meta):
+        print("⚠️ No compatible model to continue. Running a full training.")
+        train_ai_model(return_model=True)
+        return load_model()
+
+    # 1. Only the bars the model has never seen
+    update_feature_store()
+    train_end = pd.Timestamp(meta['train_end'])
+    new_rows = load_features(start=train_end)
+    new_rows = new_rows[new_rows.index > train_end]
+    if len(new_rows) < MIN_NEW_ROWS:
+        print(f"✅ Model {meta['version']} is current ({len(new_rows)} new rows < {MIN_NEW_ROWS}).")
+        return booster, meta
+
+    X = new_rows[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+    y = new_rows['target'].to_numpy()
+
+    # 2. The new bars are out-of-sample for the current model: score it on them first
+    metrics = evaluate(booster.inplace_predict(X), y)
+    print(f"📈 {meta['version']} on {len(y)} new rows: logloss {metrics['logloss']:.4f}")
+
+    # 3. Continue boosting from the stored trees
+    print(f"🔥 Adding {rounds} trees on {len(y)} new rows (warm start)...")
+    updated = xgb.train(BOOSTER_PARAMS, xgb.DMatrix(X, label=y, feature_names=FEATURE_COLUMNS),
+                        num_boost_round=rounds, xgb_model=booster)
+    version = save_model(updated, FEATURE_COLUMNS, meta['train_start'], new_rows.index.max(), FEATURE_SET_VERSION,
+                         metrics=metrics, params=BOOSTER_PARAMS, parent=meta['version'])
+    print(f"💾 Registered model {version} (parent {meta['version']}).")
+    return load_model(version)
+
 if __name__ == "__main__":
-    train_ai_model()
\ No newline at end of file
+    if "--out-of-core" in sys.argv:
+        OUT_OF_CORE = True
+    if "--warm-start" in sys.argv:
+        continue_training()
+    else:
+        train_ai_model()
\ No newline at end of file
@@ -1,28 +1,38 @@
-import yfinance as yf
+import yahoo_client as yf
 import pandas as pd
 import numpy as np
 
-def get_intrinsic_value(ticker):
+def get_intrinsic_value(ticker, stock=None, financials=None, raise_errors=False):
     """
     Calculates Intrinsic Value using DCF.
+    Pass an existing Ticker / already fetched financials to skip those requests.
+    raise_errors=True lets a failed Yahoo fetch raise instead of returning None,
+    so callers can tell "throttled" apart from "no DCF value".
     SMART FIX: Auto-detects Banks/NBFCs and switches to 'Earnings Model' 
     instead of 'Cash Flow Model' to avoid false negatives.
     """
+    # 1. FETCH (metadata + statements)
     try:
-        stock = yf.Ticker(ticker)
-        
-        # 1. GET METADATA (Sector Check)
+        stock = stock if stock is not None else yf.Ticker(ticker)
         info = stock.info
+        if not info:
+            raise ValueError(f"{ticker}: empty info (throttled?)")
+        if financials is None:
+            financials = stock.financials
+        cashflow = stock.cashflow
+    except Exception:
+        if raise_errors:
+            raise
+        return None
+
+    try:
+        # 2. SECTOR CHECK
         sector = info.get('sector', 'Unknown')
         industry = info.get('industry', 'Unknown')
         
         # 🏦 BANK CHECK: If it's a financial stock, DCF is useless.
         is_financial = "Financial" in sector or "Bank" in industry or "Credit" in industry
         
-        # 2. GET FINANCIALS
-        financials = stock.financials
-        cashflow = stock.cashflow
-        
         if financials.empty or cashflow.empty:
             return None
 
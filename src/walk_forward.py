@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+
+from feature_engineering import FEATURE_COLUMNS
+from feature_store import update_feature_store, load_features
+from train_model import BOOSTER_PARAMS, NUM_BOOST_ROUND, SNIPER_THRESHOLDS, evaluate, print_sniper_report
+
+warnings.filterwarnings("ignore")
+
+# --- CONFIG ---
+# Folds are cut on the TIME axis (every symbol's bar at time t lands in the same
+# fold), so each test window is genuinely later than everything trained on.
+#   expanding: train on all bars before the test window
+#   rolling:   train on the last TRAIN_BARS bars before it
+MODE = "expanding"
+N_FOLDS = 5
+TRAIN_BARS = 1500        # Rolling window length (~1 year of hourly bars)
+MIN_TRAIN_BARS = 300     # Folds with less history than this are skipped
+
+# The target looks one bar ahead, so the last bars before a test
+# window carry labels computed from test-window prices: purge them. The embargo
+# drops a few more, since 20-bar rolling features overlap the boundary.
+PURGE_BARS = 1
+EMBARGO_BARS = 20
+
+# Folds train in parallel threads (XGBoost releases the GIL); each gets an equal
+# share of the cores instead of all of them fighting over every core.
+WORKERS = min(N_FOLDS, os.cpu_count() or 1)
+
+def time_folds(times, n_folds=N_FOLDS, mode=MODE, train_bars=TRAIN_BARS, test_bars=None,
+               purge=PURGE_BARS, embargo=EMBARGO_BARS, min_train=MIN_TRAIN_BARS):
+    """
+    [(train_start, train_end, test_start, test_end)] as positions in the sorted unique
+    `times` (end exclusive). The last n_folds * test_bars bars are split into test windows.
+    """
+    n = len(times)
+    test_bars = test_bars or n // (n_folds + 1)
+    first_test = n - n_folds * test_bars
+    folds = []
+    for k in range(n_folds):
+        test_start = first_test + k * test_bars
+        train_end = test_start - purge - embargo
+        train_start = 0 if mode == "expanding" else max(0, train_end - train_bars)
+        if train_end - train_start < min_train:
+            continue
+        folds.append((train_start, train_end, test_start, test_start + test_bars))
+    return folds
+
+def to_arrays(df, times):
+    """(X float32, y, position of each row's bar in `times`)."""
+    position = np.searchsorted(times, df.index)
+    return df[FEATURE_COLUMNS].to_numpy(dtype=np.float32), df['target'].to_numpy(), position
+
+def build_windows(X, y, position, folds, times, nthread=None):
+    """
+    Turns each fold into float32 matrices once: a QuantileDMatrix to train on (reused
+    by every model fitted on that window) and a plain array to predict on.
+    Windows with identical bounds share one matrix.
+    """
+    cache, windows = {}, []
+    for k, (train_start, train_end, test_start, test_end) in enumerate(folds):
+        if (train_start, train_end) not in cache:
+            train = (position >= train_start) & (position < train_end)
+            cache[(train_start, train_end)] = xgb.QuantileDMatrix(
+                X[train], label=y[train], feature_names=FEATURE_COLUMNS, nthread=nthread)
+        test = (position >= test_start) & (position < test_end)
+        windows.append({
+            'fold': k + 1,
+            'train': (times[train_start], times[train_end - 1]),
+            'test': (times[test_start], times[test_end - 1]),
+            'dtrain': cache[(train_start, train_end)],
+            'X_test': np.ascontiguousarray(X[test]),
+            'y_test': y[test],
+        })
+    return windows
+
+def fit_window(window, params=None, num_boost_round=NUM_BOOST_ROUND, nthread=1):
+    """Trains on one window and scores its test bars. Returns (booster, confidence)."""
+    params = dict(params or BOOSTER_PARAMS, nthread=nthread)
+    booster = xgb.train(params, window['dtrain'], num_boost_round=num_boost_round)
+    return booster, booster.inplace_predict(window['X_test'])
+
+def walk_forward(df=None, params=None, num_boost_round=NUM_BOOST_ROUND, mode=MODE, n_folds=N_FOLDS,
+                 workers=WORKERS, verbose=True):
+    """
+    Out-of-sample evaluation: one model per fold, folds trained in parallel.
+    Returns a DataFrame with one row per fold (window bounds + metrics) and the
+    pooled out-of-sample (confidence, actual) arrays.
+    """
+    # 1. Data (feature store by default)
+    if df is None:
+        update_feature_store()
+        df = load_features()
+    if df.empty:
+        print("❌ Dataset empty. Check database or ingestion.")
+        return pd.DataFrame(), None
+
+    times = df.index.unique().sort_values()
+    folds = time_folds(times, n_folds=n_folds, mode=mode)
+    if not folds:
+        print(f"❌ Not enough history for {n_folds} folds ({len(times)} bars).")
+        return pd.DataFrame(), None
+
+    # 2. Matrices, built once per window
+    workers = max(1, min(workers, len(folds)))
+    nthread = max(1, (os.cpu_count() or 1) // workers)
+    t0 = time.perf_counter()
+    windows = build_windows(*to_arrays(df, times), folds, times, nthread=os.cpu_count())
+    if verbose:
+        print(f"🧱 {len(windows)} {mode} folds over {len(times)} bars "
+              f"(purge {PURGE_BARS} + embargo {EMBARGO_BARS} bars), matrices in {time.perf_counter() - t0:.1f}s")
+        print(f"🔥 Training {len(windows)} folds on {workers} workers x {nthread} threads...")
+
+    # 3. Train folds in parallel
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda w: fit_window(w, params, num_boost_round, nthread), windows))
+    elapsed = time.perf_counter() - t0
+
+    # 4. Per-fold reports
+    rows = []
+    for window, (_, confidence) in zip(windows, results):
+        metrics = evaluate(confidence, window['y_test'])
+        if verbose:
+            print(f"\n📅 FOLD {window['fold']}: train {window['train'][0]:%Y-%m-%d} → {window['train'][1]:%Y-%m-%d} | "
+                  f"test {window['test'][0]:%Y-%m-%d} → {window['test'][1]:%Y-%m-%d} | "
+                  f"logloss {metrics.get('logloss', float('nan')):.4f}")
+            print_sniper_report(confidence, window['y_test'])
+        row = {
+            'fold': window['fold'],
+            'train_start': window['train'][0], 'train_end': window['train'][1],
+            'test_start': window['test'][0], 'test_end': window['test'][1],
+            'train_rows': window['dtrain'].num_row(), 'test_rows': len(window['y_test']),
+            'logloss': metrics.get('logloss'), 'accuracy': metrics.get('accuracy'),
+        }
+        for t in SNIPER_THRESHOLDS:
+            row[f"win_{t:.2f}"] = metrics.get('sniper', {}).get(f"{t:.2f}", {}).get('win_rate')
+        rows.append(row)
+
+    confidence = np.concatenate([c for _, c in results])
+    actual = np.concatenate([w['y_test'] for w in windows])
+    if verbose:
+        print(f"\n🧮 ALL FOLDS (pooled out-of-sample, {len(actual)} rows, trained in {elapsed:.1f}s)")
+        print_sniper_report(confidence, actual)
+    return pd.DataFrame(rows), (confidence, actual)
+
+if __name__ == "__main__":
+    mode = "rolling" if "--rolling" in sys.argv else MODE
+    report, _ = walk_forward(mode=mode)
+    if not report.empty:
+        print("\n" + report.drop(columns=['train_start', 'test_end']).to_string(index=False))
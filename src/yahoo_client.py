@@ -0,0 +1,203 @@
+import os
+import random
+import threading
+import time
+import warnings
+
+import pandas as pd
+import yfinance
+
+warnings.filterwarnings("ignore")
+
+# --- RECORD / REPLAY SWITCH ---
+# Modules do `import yahoo_client as yf` and use yf.download / yf.Ticker as before.
+#   live   -> straight to Yahoo (default)
+#   record -> straight to Yahoo, and every response is saved to the fixture store
+#   replay -> served from the fixture store only (no network at all)
+# Tip: record with an empty ORACLE_CACHE_DIR, otherwise the price cache answers
+# before Yahoo is ever asked and those bars never reach the fixtures.
+MODE = os.environ.get("ORACLE_YF_MODE", "live")
+FIXTURE_DIR = os.environ.get("ORACLE_FIXTURE_DIR", "fixtures/yahoo")
+REPLAY_LATENCY = float(os.environ.get("ORACLE_REPLAY_LATENCY", "0"))  # Mean seconds per call
+REPLAY_SEED = 42
+
+PERIODS = {
+    "1d": 1, "5d": 5, "1mo": 31, "3mo": 92, "6mo": 183,
+    "1y": 366, "2y": 731, "5y": 1827, "10y": 3653
+}
+
+_lock = threading.Lock()
+_rng = random.Random(REPLAY_SEED)
+_clock_saved = False
+
+class FixtureMissing(LookupError):
+    """Replay mode was asked for something that was never recorded."""
+
+def _fixture_path(kind, *parts):
+    safe = [str(p).replace(os.sep, "_") for p in parts]
+    return os.path.join(FIXTURE_DIR, kind, *safe[:-1], f"{safe[-1]}.pkl")
+
+def _save(path, value):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    pd.to_pickle(value, tmp)
+    os.replace(tmp, path)
+
+def _load(path):
+    if not os.path.exists(path):
+        raise FixtureMissing(path)
+    return pd.read_pickle(path)
+
+def _simulate_latency():
+    if REPLAY_LATENCY > 0:
+        with _lock:
+            delay = REPLAY_LATENCY * _rng.uniform(0.5, 1.5)
+        time.sleep(delay)
+
+def _save_clock():
+    global _clock_saved
+    if not _clock_saved:
+        _save(_fixture_path("meta", "clock"), pd.Timestamp.now(tz="UTC"))
+        _clock_saved = True
+
+def now():
+    """
+    Wall clock in UTC. When replaying, the clock of the recording instead, so
+    windows like "last 1y" select exactly the recorded bars on any day.
+    Override with ORACLE_REPLAY_NOW.
+    """
+    if MODE == "replay":
+        override = os.environ.get("ORACLE_REPLAY_NOW")
+        if override:
+            ts = pd.Timestamp(override)
+            return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+        try:
+            return _load(_fixture_path("meta", "clock"))
+        except FixtureMissing:
+            pass
+    return pd.Timestamp.now(tz="UTC")
+
+# --- BAR STORE (one growing frame per kind / interval / symbol) ---
+def _record_bars(kind, symbol, interval, frame):
+    if frame is None or frame.empty:
+        return
+    path = _fixture_path(kind, interval, symbol)
+    with _lock:
+        _save_clock()
+        try:
+            stored = _load(path)
+            frame = pd.concat([stored, frame])
+            frame = frame[~frame.index.duplicated(keep="last")].sort_index()
+        except FixtureMissing:
+            pass
+        _save(path, frame)
+
+def _align(ts, index):
+    ts = pd.Timestamp(ts)
+    if index.tz is not None and ts.tzinfo is None:
+        return ts.tz_localize(index.tz)
+    if index.tz is None and ts.tzinfo is not None:
+        return ts.tz_convert("UTC").tz_localize(None)
+    return ts
+
+def _replay_bars(kind, symbol, interval, start=None, end=None, period=None):
+    """Slices the recorded bars the same way Yahoo would have. Periods count back
+    from the last recorded bar, so replays are identical on any day."""
+    frame = _load(_fixture_path(kind, interval, symbol))
+    if frame.empty:
+        return frame
+    if start is None and end is None and period not in (None, "max"):
+        start = frame.index[-1] - pd.Timedelta(days=PERIODS.get(period, 366))
+    if start is not None:
+        frame = frame[frame.index >= _align(start, frame.index)]
+    if end is not None:
+        frame = frame[frame.index < _align(end, frame.index)]
+    return frame
+
+def _split_download(raw, symbols):
+    if raw is None or raw.empty:
+        return {}
+    if not isinstance(raw.columns, pd.MultiIndex):
+        return {symbols[0]: raw}
+    present = set(raw.columns.get_level_values(1))
+    return {s: raw.xs(s, axis=1, level=1) for s in symbols if s in present}
+
+# --- yfinance-compatible API ---
+def download(tickers, start=None, end=None, period=None, interval="1d", **kwargs):
+    symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+    if MODE == "live":
+        return yfinance.download(tickers, start=start, end=end, period=period, interval=interval, **kwargs)
+
+    if MODE == "record":
+        raw = yfinance.download(tickers, start=start, end=end, period=period, interval=interval, **kwargs)
+        for symbol, frame in _split_download(raw, symbols).items():
+            _record_bars("download", symbol, interval, frame.dropna(how="all"))
+        return raw
+
+    # replay: rebuild yfinance's (Price, Ticker) column layout
+    _simulate_latency()
+    frames = {}
+    for symbol in symbols:
+        try:
+            frame = _replay_bars("download", symbol, interval, start, end, period)
+        except FixtureMissing:
+            continue
+        if not frame.empty:
+            frames[symbol] = frame
+    if not frames:
+        return pd.DataFrame()
+    out = pd.concat(frames, axis=1).swaplevel(0, 1, axis=1)
+    out.columns.names = ["Price", "Ticker"]
+    return out.sort_index(axis=1, level=0, sort_remaining=False)
+
+class Ticker:
+    """Record/replay wrapper around yfinance.Ticker (statements, info, news, history)."""
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self._remote = None
+
+    def _live(self):
+        if self._remote is None:
+            self._remote = yfinance.Ticker(self.ticker)
+        return self._remote
+
+    def _attribute(self, name):
+        if MODE == "live":
+            return getattr(self._live(), name)
+        path = _fixture_path("ticker", self.ticker, name)
+        if MODE == "replay":
+            _simulate_latency()
+            return _load(path)
+        value = getattr(self._live(), name)
+        with _lock:
+            _save_clock()
+        _save(path, value)
+        return value
+
+    @property
+    def info(self): return self._attribute("info")
+
+    @property
+    def news(self): return self._attribute("news")
+
+    @property
+    def financials(self): return self._attribute("financials")
+
+    @property
+    def balance_sheet(self): return self._attribute("balance_sheet")
+
+    @property
+    def cashflow(self): return self._attribute("cashflow")
+
+    def history(self, period="1mo", interval="1d", start=None, end=None, **kwargs):
+        if MODE == "live":
+            return self._live().history(period=period, interval=interval, start=start, end=end, **kwargs)
+        if MODE == "record":
+            frame = self._live().history(period=period, interval=interval, start=start, end=end, **kwargs)
+            _record_bars("history", self.ticker, interval, frame)
+            return frame
+        _simulate_latency()
+        try:
+            return _replay_bars("history", self.ticker, interval, start, end, period)
+        except FixtureMissing:
+            return pd.DataFrame()
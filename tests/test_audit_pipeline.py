@@ -0,0 +1,55 @@
+import time
+
+import pandas as pd
+
+import predict_daily
+from rate_limit import TokenBucket
+from scan_checkpoint import ScanCheckpoint
+
+# Scaled-down scan: 16 workers queue for a bucket that is the bottleneck, and a
+# stage's timeout is far shorter than the whole scan takes.
+N_TICKERS = 120
+LATENCY = 0.01
+RATE = 200.0
+
+class FakeTicker:
+    def __init__(self, ticker):
+        self.ticker = ticker
+
+    @property
+    def financials(self):
+        time.sleep(LATENCY)
+        return pd.DataFrame({pd.Timestamp("2024-03-31"): [1.0]}, index=['Net Income'])
+
+    @property
+    def news(self):
+        time.sleep(LATENCY)
+        return [{'uuid': f"{self.ticker}-1", 'title': "steady quarter"}]
+
+class FakeEngine:
+    def score_articles(self, news):
+        return 0.1, len(news), news[0]['title']
+
+def _fake_valuation(ticker, stock=None, financials=None, raise_errors=False):
+    time.sleep(2 * LATENCY)   # info + cashflow
+    return 150.0
+
+def test_audit_under_rate_limit_contention_has_no_timeouts(monkeypatch, tmp_path, capsys):
+    monkeypatch.setattr(predict_daily.yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(predict_daily, "get_intrinsic_value", _fake_valuation)
+    monkeypatch.setattr(predict_daily, "STAGE_TIMEOUTS", {'valuation': 0.25, 'sentiment': 0.25})
+    tickers = [f"T{i:03d}.NS" for i in range(N_TICKERS)]
+    prices = pd.DataFrame({'Data_Error': False, 'Close': 100.0, 'Momentum_Raw': 0.1,
+                           'Downside_Risk_Raw': 0.2}, index=tickers)
+
+    t0 = time.monotonic()
+    rows = predict_daily.audit_universe(tickers, prices, FakeEngine(), limiter=TokenBucket(RATE, 4),
+                                        checkpoint=ScanCheckpoint(str(tmp_path / "ck.jsonl"), fresh=True))
+    elapsed = time.monotonic() - t0
+
+    # The scan must actually have been limiter-bound for the test to mean anything
+    assert elapsed > 4 * predict_daily.STAGE_TIMEOUTS['valuation']
+    assert "timed out" not in capsys.readouterr().out
+    assert len(rows) == N_TICKERS
+    assert all(r['Fair_Value'] == 150.0 for r in rows)
+    assert all(r['Status'] == 'Active' for r in rows)
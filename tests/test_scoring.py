@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from scoring import oracle_scores, composite_scores
+
+def calculate_composite_score(row, regime_status):
+    """The row-wise scorer predict_daily used before scoring.py (reference)."""
+    if row['Status'] != 'Active': return 0.0
+
+    mom_rank = row.get('Momentum_Rank', 0.5)
+    safe_rank = row.get('Safety_Rank', 0.5)
+    val_rank = np.clip((row.get('Upside_Pct', 0) + 0.2), 0, 1)
+
+    if regime_status == "BULLISH":
+        w_mom, w_safe, w_val = 0.18, 0.36, 0.36
+        base_score = (mom_rank * w_mom) + (safe_rank * w_safe) + (val_rank * w_val)
+    else:
+        w_safe = 0.90
+        base_score = (safe_rank * w_safe)
+
+    return round(base_score * 100, 1)
+
+def _candidates(n=400, seed=7):
+    rng = np.random.default_rng(seed)
+    table = pd.DataFrame({
+        'symbol': [f"S{i}" for i in range(n)],
+        'Status': rng.choice(['Active', 'Active', 'Active', 'Rejected: Sentiment', 'Data Error'], n),
+        'Momentum_Rank': rng.uniform(0, 1, n),
+        'Safety_Rank': rng.uniform(0, 1, n),
+        'Upside_Pct': rng.uniform(-0.5, 0.8, n),
+    })
+    # Active names with 100-126 bars have no Momentum (it needs 127)
+    table.loc[rng.uniform(0, 1, n) < 0.2, 'Momentum_Rank'] = np.nan
+    table.loc[rng.uniform(0, 1, n) < 0.05, 'Safety_Rank'] = np.nan
+    return table
+
+@pytest.mark.parametrize("regime", ["BULLISH", "BEARISH", "NEUTRAL"])
+def test_oracle_scores_match_row_wise_scorer(regime):
+    table = _candidates()
+    expected = table.apply(lambda r: calculate_composite_score(r, regime), axis=1)
+    np.testing.assert_array_equal(oracle_scores(table, regime).to_numpy(), expected.to_numpy())
+
+def test_nan_factor_only_counts_where_weighted():
+    factors = np.array([[np.nan, 0.5, 0.2]])
+    weights = np.array([[0.0, 0.9, 0.0], [0.18, 0.36, 0.36]])
+    scores = composite_scores(factors, weights)
+    assert scores[0, 0] == pytest.approx(0.45)
+    assert np.isnan(scores[0, 1])